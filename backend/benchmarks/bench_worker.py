@@ -0,0 +1,79 @@
+# backend/benchmarks/bench_worker.py
+"""
+RQ worker for the offline pipeline benchmark.
+
+Listens on every queue (live classes first) in one process. With
+--fake-models, Kokoro and Whisper are replaced by stand-ins that sleep for
+audio_seconds * RTF, so the pipeline can be measured without the models:
+
+    python -m benchmarks.bench_worker --fake-models --tts-rtf 0.25 --whisper-rtf 0.3
+"""
+
+import argparse
+import os
+import time
+import wave
+import numpy as np
+import redis
+from rq import SimpleWorker
+from services.scheduler import JOB_KINDS, PRIORITY_CLASSES, queue_name
+
+CHARS_PER_AUDIO_SECOND = 14  # rough speaking rate used to size fake TTS output
+
+
+def bench_queue_names() -> list[str]:
+    names = [queue_name(kind, p) for p in PRIORITY_CLASSES for kind in JOB_KINDS]
+    return names + [f"{kind}_queue" for kind in JOB_KINDS]
+
+
+class FakeWhisperModel:
+    """Mimics faster_whisper.WhisperModel.transcribe for WAV uploads."""
+
+    def __init__(self, rtf: float):
+        self.rtf = rtf
+
+    def transcribe(self, file_path: str, beam_size: int = 5):
+        try:
+            with wave.open(file_path, "rb") as wav:
+                duration = wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError):
+            duration = os.path.getsize(file_path) / 16000  # ~128 kbit/s compressed audio
+
+        time.sleep(duration * self.rtf)
+        segment = type("Segment", (), {"text": f"Synthetic answer covering {duration:.1f} seconds of speech."})()
+        info = type("Info", (), {"duration": duration})()
+        return iter([segment]), info
+
+
+def install_fake_models(tts_rtf: float, whisper_rtf: float):
+    import kokoro_local
+    import tasks.whisper_task as whisper_task
+
+    def _bench_pcm(text: str, voice: str) -> np.ndarray:
+        audio_seconds = max(len(text) / CHARS_PER_AUDIO_SECOND, 0.3)
+        time.sleep(audio_seconds * tts_rtf)
+        return np.zeros(int(audio_seconds * kokoro_local.SAMPLE_RATE), dtype=np.float32)
+
+    kokoro_local.TTS_BACKENDS["bench"] = _bench_pcm
+    kokoro_local.TTS_BACKEND = "bench"
+
+    fake_whisper = FakeWhisperModel(whisper_rtf)
+    whisper_task.get_whisper_model = lambda: fake_whisper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake-models", action="store_true")
+    parser.add_argument("--tts-rtf", type=float, default=0.25)
+    parser.add_argument("--whisper-rtf", type=float, default=0.3)
+    args = parser.parse_args()
+
+    if args.fake_models:
+        install_fake_models(args.tts_rtf, args.whisper_rtf)
+
+    connection = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    SimpleWorker(bench_queue_names(), connection=connection).work(logging_level="WARNING")
+
+
+if __name__ == "__main__":
+    main()
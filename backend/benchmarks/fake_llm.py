@@ -0,0 +1,146 @@
+# backend/benchmarks/fake_llm.py
+"""
+Local OpenAI-compatible chat completions server standing in for Groq.
+
+Answers by recognising the repo's own prompts (question generation, scoring,
+feedback, PDF chunk metadata), with configurable latency and failure rate:
+
+    python -m benchmarks.fake_llm --port 8101 --latency-ms 400 --jitter-ms 150 --failure-rate 0.02
+
+Point the app at it with GROQ_BASE_URL=http://127.0.0.1:8101.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOPICS = ["Caching", "Concurrency", "Databases", "Networking", "APIs", "Testing", "Security", "Queues"]
+STREAM_CHUNK_CHARS = 24
+
+
+def _questions(n: int, rng: random.Random) -> list[dict]:
+    difficulties = ["easy", "medium", "hard"]
+    out = []
+    for i in range(n):
+        topic = rng.choice(TOPICS)
+        token = uuid.uuid4().hex[:8]
+        out.append({
+            "question": f"How would you approach {topic.lower()} problem {token} in a production service?",
+            "difficulty": difficulties[min(i * 3 // max(n, 1), 2)],
+            "category": rng.choice(["concept", "coding", "scenario"]),
+            "topic": topic,
+            "ideal_answer": f"A solid answer explains the trade-offs of {topic.lower()} and names concrete techniques.",
+            "key_points": [f"{topic} basics", "Trade-offs", "Failure modes"],
+        })
+    return out
+
+
+def reply_for(prompt: str, rng: random.Random) -> str:
+    """Content the real model would be asked to produce for this prompt."""
+    if "strict scoring engine" in prompt:
+        scores = {k: rng.randint(8, 24) for k in ("clarity", "relevance", "depth", "structure")}
+        scores["final_score"] = sum(scores.values())
+        return json.dumps(scores)
+    if "Extract the main topics" in prompt:
+        return json.dumps({"chunk_preview": "", "topics": rng.sample(TOPICS, 2), "key_points": ["Point one", "Point two"]})
+    match = re.search(r"Generate exactly (\d+)", prompt)
+    if match:
+        return json.dumps(_questions(int(match.group(1)), rng))
+    return (
+        "You communicated your ideas clearly and covered the fundamentals. "
+        "Go deeper on trade-offs and failure modes, and structure answers as context, approach, result."
+    )
+
+
+def create_app(latency_ms: float = 300, jitter_ms: float = 100, failure_rate: float = 0.0,
+               tokens_per_second: float = 0, seed: int = None) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.stats = {"requests": 0, "failures": 0}
+
+    async def _delay(extra_tokens: int = 0):
+        delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000
+        if tokens_per_second:
+            delay += extra_tokens / tokens_per_second
+        await asyncio.sleep(delay)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.stats["requests"] += 1
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str))
+        content = reply_for(prompt, rng)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+
+        if rng.random() < failure_rate:
+            app.state.stats["failures"] += 1
+            await _delay()
+            if rng.random() < 0.5:
+                return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "1"})
+            return JSONResponse({"error": {"message": "upstream error"}}, status_code=500)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake")
+
+        if body.get("stream"):
+            async def events():
+                await _delay()
+                for i in range(0, len(content), STREAM_CHUNK_CHARS):
+                    piece = content[i:i + STREAM_CHUNK_CHARS]
+                    if tokens_per_second:
+                        await asyncio.sleep(len(piece) / 4 / tokens_per_second)
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await _delay(completion_tokens)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    def stats():
+        return app.state.stats
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.failure_rate, args.tokens_per_second, args.seed),
+                host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,200 @@
+# backend/benchmarks/fake_postgrest.py
+"""
+In-memory stand-in for Supabase's PostgREST API (/rest/v1), covering the
+query shapes this backend uses: select with eq/neq/in/is filters, order,
+limit, insert, upsert (on_conflict + merge-duplicates), update and delete,
+plus the attempt_snapshot view from sql/attempt_snapshot.sql.
+
+    python -m benchmarks.fake_postgrest --port 8102 --latency-ms 15
+
+Point the app at it with SUPABASE_URL=http://127.0.0.1:8102 (any SUPABASE_KEY).
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import uuid
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _attempt_snapshot(tables: dict) -> list[dict]:
+    answers = {(a.get("attempt_id"), a.get("question_id")): a for a in tables.get("answers", [])}
+    rows = []
+    for q in tables.get("questions", []):
+        a = answers.get((q.get("attempt_id"), q.get("id")), {})
+        rows.append({
+            "question_id": q.get("id"),
+            "attempt_id": q.get("attempt_id"),
+            "interview_id": q.get("interview_id"),
+            "question": q.get("question"),
+            "ideal_answer": q.get("ideal_answer"),
+            "created_at": q.get("created_at"),
+            "transcript": a.get("transcript"),
+            "has_audio": a.get("has_audio"),
+            "key_points": q.get("key_points"),
+        })
+    return rows
+
+
+VIEWS = {"attempt_snapshot": _attempt_snapshot}
+
+
+def _matches(row: dict, column: str, expr: str) -> bool:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, raw = expr.partition(".")
+    value = row.get(column)
+
+    if op == "eq":
+        ok = str(value) == raw if value is not None else False
+    elif op == "neq":
+        ok = str(value) != raw
+    elif op == "in":
+        ok = str(value) in [v.strip().strip('"') for v in raw.strip("()").split(",")]
+    elif op == "is":
+        ok = (value is None) if raw == "null" else (str(value).lower() == raw)
+    elif op in ("gt", "gte", "lt", "lte"):
+        try:
+            left, right = float(value), float(raw)
+        except (TypeError, ValueError):
+            left, right = str(value), raw
+        ok = {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+    else:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    return not ok if negate else ok
+
+
+def _project(row: dict, select: str) -> dict:
+    if not select or select.strip() == "*":
+        return dict(row)
+    columns = [c.strip() for c in select.split(",") if c.strip()]
+    return {c: row.get(c) for c in columns}
+
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0, seed: int = None) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    tables: dict[str, list[dict]] = {}
+    lock = threading.Lock()
+    app.state.tables = tables
+    app.state.stats = {"requests": 0}
+
+    async def _delay():
+        app.state.stats["requests"] += 1
+        if latency_ms:
+            await asyncio.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000)
+
+    def _filtered(table: str, params) -> list[dict]:
+        rows = VIEWS[table](tables) if table in VIEWS else tables.get(table, [])
+        for column, expr in params.multi_items():
+            if column not in RESERVED_PARAMS:
+                rows = [r for r in rows if _matches(r, column, expr)]
+        return rows
+
+    def _respond(request: Request, rows: list[dict], status: int = 200):
+        prefer = request.headers.get("prefer", "")
+        if request.method != "GET" and "return=minimal" in prefer:
+            return Response(status_code=204)
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"},
+                                    status_code=406)
+            return JSONResponse(rows[0], status_code=status)
+        return JSONResponse(rows, status_code=status)
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        await _delay()
+        params = request.query_params
+        with lock:
+            rows = list(_filtered(table, params))
+
+        for part in reversed((params.get("order") or "").split(",")):
+            if not part:
+                continue
+            column, *mods = part.split(".")
+            rows.sort(key=lambda r: (r.get(column) is None, str(r.get(column) or "")), reverse="desc" in mods)
+
+        offset = int(params.get("offset") or 0)
+        rows = rows[offset:]
+        if params.get("limit"):
+            rows = rows[:int(params["limit"])]
+        return _respond(request, [_project(r, params.get("select")) for r in rows])
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        await _delay()
+        body = await request.json()
+        records = body if isinstance(body, list) else [body]
+        prefer = request.headers.get("prefer", "")
+        conflict_cols = [c for c in (request.query_params.get("on_conflict") or "").split(",") if c]
+        upsert = "resolution=merge-duplicates" in prefer or "resolution=ignore-duplicates" in prefer
+
+        written = []
+        with lock:
+            rows = tables.setdefault(table, [])
+            for record in records:
+                record = dict(record)
+                record.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+                if not conflict_cols:
+                    record.setdefault("id", str(uuid.uuid4()))
+
+                existing = None
+                if upsert:
+                    keys = conflict_cols or ["id"]
+                    existing = next((r for r in rows if all(r.get(k) == record.get(k) for k in keys)), None)
+                if existing is not None:
+                    if "resolution=merge-duplicates" in prefer:
+                        created = existing.get("created_at")
+                        existing.update(record)
+                        existing["created_at"] = created
+                    written.append(dict(existing))
+                else:
+                    rows.append(record)
+                    written.append(dict(record))
+        return _respond(request, written, status=201)
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        await _delay()
+        changes = await request.json()
+        with lock:
+            rows = _filtered(table, request.query_params)
+            for row in rows:
+                row.update(changes)
+            updated = [dict(r) for r in rows]
+        return _respond(request, updated)
+
+    @app.delete("/rest/v1/{table}")
+    async def delete(table: str, request: Request):
+        await _delay()
+        with lock:
+            doomed = _filtered(table, request.query_params)
+            ids = {id(r) for r in doomed}
+            tables[table] = [r for r in tables.get(table, []) if id(r) not in ids]
+        return _respond(request, [dict(r) for r in doomed])
+
+    @app.get("/stats")
+    def stats():
+        with lock:
+            return {**app.state.stats, "rows": {t: len(r) for t, r in tables.items()}}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms), host="127.0.0.1", port=args.port, log_level="warning")
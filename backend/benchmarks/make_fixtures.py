@@ -0,0 +1,132 @@
+# backend/benchmarks/make_fixtures.py
+"""
+Regenerates the checked-in model benchmark fixtures in benchmarks/fixtures/.
+
+Output is deterministic (fixed seeds, no timestamps), so re-running this
+must not change the files in git:
+
+    python -m benchmarks.make_fixtures
+
+    answer_5s.wav / answer_20s.wav   speech-like 16 kHz mono audio (voiced
+                                     harmonics with syllable envelopes and pauses)
+    silence_3s.wav                   near-silent room tone
+    sample_short.pdf                 first section of sample_notes.txt, one page
+    sample_notes.pdf                 all of sample_notes.txt (several topics)
+"""
+
+import os
+import textwrap
+import wave
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+AUDIO_SAMPLE_RATE = 16000
+
+PDF_LINE_CHARS = 92
+PDF_LINES_PER_PAGE = 60
+SHORT_PDF_PARAGRAPHS = 5  # heading + the caching section
+
+
+# -------------------------------
+# Audio
+# -------------------------------
+def speech_like(seconds: float, seed: int, sample_rate: int = AUDIO_SAMPLE_RATE) -> np.ndarray:
+    """
+    Voiced harmonics with a gliding pitch, ~4 syllables/s and short pauses
+    between phrases. Not intelligible, but it keeps Whisper's decoder busy
+    the way real answers do rather than bailing out on pure noise.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+
+    f0 = 140 + 25 * np.sin(2 * np.pi * 0.3 * t) + 10 * np.sin(2 * np.pi * 1.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+
+    envelope = np.zeros(n)
+    pos = 0
+    while pos < n:
+        phrase = int(rng.uniform(1.2, 3.0) * sample_rate)
+        for start in range(pos, min(pos + phrase, n), int(sample_rate / 4)):
+            length = min(int(rng.uniform(0.12, 0.22) * sample_rate), n - start)
+            envelope[start:start + length] = np.hanning(length) * rng.uniform(0.5, 1.0)
+        pos += phrase + int(rng.uniform(0.3, 0.7) * sample_rate)
+
+    noise = rng.normal(0, 0.01, n)
+    signal = 0.25 * voiced * envelope + noise
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def room_tone(seconds: float, seed: int, sample_rate: int = AUDIO_SAMPLE_RATE) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.normal(0, 0.002, int(seconds * sample_rate)) * 32767).astype(np.int16)
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE):
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+# -------------------------------
+# PDF (plain Helvetica text, no dependencies)
+# -------------------------------
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, text: str):
+    lines = []
+    for paragraph in text.split("\n"):
+        lines += textwrap.wrap(paragraph, PDF_LINE_CHARS) or [""]
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a (page, content) pair per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 790 Td"] + [f"({_pdf_escape(l)}) '" for l in page_lines] + ["ET"]
+        content = "\n".join(ops).encode("latin-1")
+        page_num, content_num = len(objects) + 1, len(objects) + 2
+        kids.append(f"{page_num} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {content_num} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def main():
+    write_wav(os.path.join(FIXTURES_DIR, "answer_5s.wav"), speech_like(5, seed=5))
+    write_wav(os.path.join(FIXTURES_DIR, "answer_20s.wav"), speech_like(20, seed=20))
+    write_wav(os.path.join(FIXTURES_DIR, "silence_3s.wav"), room_tone(3, seed=3))
+
+    with open(os.path.join(FIXTURES_DIR, "sample_notes.txt"), encoding="utf-8") as f:
+        notes = f.read()
+    first_section = "\n\n".join(notes.split("\n\n")[:SHORT_PDF_PARAGRAPHS])
+    write_text_pdf(os.path.join(FIXTURES_DIR, "sample_short.pdf"), first_section)
+    write_text_pdf(os.path.join(FIXTURES_DIR, "sample_notes.pdf"), notes)
+
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        print(f"{name:<20} {os.path.getsize(os.path.join(FIXTURES_DIR, name)):>9,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# backend/benchmarks/model_bench.py
+"""
+CPU-only inference micro-benchmarks for the worker models, over the fixed
+fixtures in benchmarks/fixtures/ (regenerate with benchmarks.make_fixtures):
+
+    whisper  transcribe_with_model on answer_5s / answer_20s / silence_3s
+    kokoro   tts_to_wav on a short, a median and a long question
+    embed    encode_texts on questions.json and the pdf_parser
+             embedding + agglomerative clustering path on the sample PDFs
+
+Every cell of the parameter matrix runs in a fresh subprocess, so cold start
+(import + model load) and peak RSS are measured per configuration:
+
+    python -m benchmarks.model_bench --suites whisper --only model_size=tiny,base --runs 3 --out models.json
+    python -m benchmarks.model_bench --suites whisper --only model_size=tiny,base --compare models.json
+
+Results are written with sorted keys so two runs can be diffed directly;
+--compare exits non-zero when latency, cold start or peak RSS regress past
+--tolerance.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import wave
+from services.latency import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures")
+RESULT_MARKER = "MODEL_BENCH_RESULT "
+
+MATRIX = {
+    "whisper": {"model_size": ["tiny", "base", "small"], "compute_type": ["int8", "float32"], "threads": [1, 4]},
+    "kokoro": {"backend": ["torch", "onnx"], "threads": [1, 4]},
+    "embed": {"batch_size": [16, 64], "threads": [1, 4]},
+}
+
+AUDIO_FIXTURES = ["answer_5s.wav", "answer_20s.wav", "silence_3s.wav"]
+PDF_FIXTURES = ["sample_short.pdf", "sample_notes.pdf"]
+
+
+# -------------------------------
+# Matrix
+# -------------------------------
+def expand_matrix(suites: list[str], only: dict) -> list[tuple[str, dict]]:
+    """(suite, params) for every combination, narrowed by --only axis=v1,v2 filters."""
+    cells = []
+    for suite in suites:
+        axes = {}
+        for axis, values in MATRIX[suite].items():
+            if axis in only:
+                values = [type(values[0])(v) for v in only[axis]]
+            axes[axis] = values
+        for combo in itertools.product(*axes.values()):
+            cells.append((suite, dict(zip(axes.keys(), combo))))
+    return cells
+
+
+def cell_id(suite: str, params: dict) -> str:
+    return suite + "/" + ",".join(f"{k}={v}" for k, v in params.items())
+
+
+def cell_env(suite: str, params: dict) -> dict:
+    """Environment for one cell: the repo's own config knobs plus BLAS/OpenMP thread caps."""
+    threads = str(params["threads"])
+    env = {
+        **os.environ,
+        "CUDA_VISIBLE_DEVICES": "",
+        "OMP_NUM_THREADS": threads,
+        "MKL_NUM_THREADS": threads,
+        "TRACE_EXPORT": "off",
+        "EMBED_CACHE_ENABLED": "0",  # every run must actually encode
+    }
+    if suite == "whisper":
+        env.update(WHISPER_MODEL_SIZE=params["model_size"], WHISPER_COMPUTE_TYPE=params["compute_type"],
+                   WHISPER_CPU_THREADS=threads, WHISPER_DEVICE="cpu")
+    elif suite == "kokoro":
+        env.update(TTS_BACKEND=params["backend"], KOKORO_ONNX_THREADS=threads, KOKORO_DEVICE="cpu")
+    elif suite == "embed":
+        env.update(EMBED_BATCH_SIZE=str(params["batch_size"]), EMBED_THREADS=threads)
+    return env
+
+
+# -------------------------------
+# Measurements (run inside the cell subprocess)
+# -------------------------------
+def _peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _summary(latencies: list[float], audio_seconds: float = None) -> dict:
+    values = sorted(latencies)
+    out = {
+        "runs": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "mean_ms": round(sum(values) / len(values) * 1000, 1),
+    }
+    if audio_seconds:
+        out["audio_seconds"] = round(audio_seconds, 3)
+        out["rtf_p50"] = round(percentile(values, 50) / audio_seconds, 4)
+    return out
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _questions() -> list[str]:
+    with open(os.path.join(FIXTURES_DIR, "questions.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def bench_whisper(params: dict, runs: int) -> dict:
+    _, import_seconds = _timed(__import__, "faster_whisper")
+    from faster_whisper import WhisperModel
+    from services.WhisperModel import transcribe_with_model
+
+    # Same arguments as tasks.whisper_task.get_whisper_model, without importing the DB layer
+    model, load_seconds = _timed(WhisperModel, params["model_size"], device="cpu",
+                                 compute_type=params["compute_type"], cpu_threads=params["threads"])
+    _, first_call = _timed(transcribe_with_model, model, os.path.join(FIXTURES_DIR, AUDIO_FIXTURES[0]))
+
+    fixtures = {}
+    for name in AUDIO_FIXTURES:
+        path = os.path.join(FIXTURES_DIR, name)
+        latencies, stats = [], {}
+        for _ in range(runs):
+            text, seconds = _timed(transcribe_with_model, model, path, stats)
+            latencies.append(seconds)
+        fixtures[name] = {**_summary(latencies, stats.get("audio_seconds")), "transcript_chars": len(text)}
+    return {"import_seconds": import_seconds, "load_seconds": load_seconds, "first_call_seconds": first_call, "fixtures": fixtures}
+
+
+def bench_kokoro(params: dict, runs: int) -> dict:
+    import kokoro_local
+
+    heavy = "kokoro_onnx" if params["backend"] == "onnx" else "kokoro"
+    _, import_seconds = _timed(__import__, heavy)
+    loader = kokoro_local.get_onnx_model if params["backend"] == "onnx" else kokoro_local.get_pipeline
+    _, load_seconds = _timed(loader)
+
+    by_length = sorted(_questions(), key=len)
+    texts = {"short": by_length[0], "median": by_length[len(by_length) // 2], "long": by_length[-1]}
+    _, first_call = _timed(kokoro_local.tts_to_wav, texts["short"])
+
+    fixtures = {}
+    for label, text in texts.items():
+        latencies = []
+        for _ in range(runs):
+            wav_bytes, seconds = _timed(kokoro_local.tts_to_wav, text)
+            latencies.append(seconds)
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wav:
+            audio_seconds = wav.getnframes() / wav.getframerate()
+        fixtures[f"question_{label}"] = {**_summary(latencies, audio_seconds), "chars": len(text)}
+    return {"import_seconds": import_seconds, "load_seconds": load_seconds, "first_call_seconds": first_call, "fixtures": fixtures}
+
+
+def bench_embed(params: dict, runs: int) -> dict:
+    _, import_seconds = _timed(__import__, "sentence_transformers")
+    from services import pdf_parser
+
+    _, load_seconds = _timed(pdf_parser.get_embed_model)
+    questions = _questions()
+    _, first_call = _timed(pdf_parser.encode_texts, questions[:1])
+
+    latencies = [_timed(pdf_parser.encode_texts, questions)[1] for _ in range(runs)]
+    fixtures = {"questions_encode": {**_summary(latencies), "texts": len(questions),
+                                     "texts_per_second": round(len(questions) / (sum(latencies) / len(latencies)), 1)}}
+
+    for name in PDF_FIXTURES:
+        path = os.path.join(FIXTURES_DIR, name)
+        latencies, stats = [], {}
+        for _ in range(runs):
+            chunks, seconds = _timed(pdf_parser.parse_pdf_to_chunks_agglomerative, path, stats=stats)
+            latencies.append(seconds)
+        fixtures[f"{name}_chunk_cluster"] = {
+            **_summary(latencies),
+            "chunks": len(chunks),
+            "encode_ms_per_run": round(stats.get("encode_seconds", 0.0) / runs * 1000, 1),
+        }
+    return {"import_seconds": import_seconds, "load_seconds": load_seconds, "first_call_seconds": first_call, "fixtures": fixtures}
+
+
+SUITES = {"whisper": bench_whisper, "kokoro": bench_kokoro, "embed": bench_embed}
+
+
+def run_cell(suite: str, params: dict, runs: int) -> dict:
+    rss_before = _peak_rss_mb()
+    result = SUITES[suite](params, runs)
+    return {
+        "cold_start_seconds": round(result.pop("import_seconds") + result["load_seconds"], 3),
+        "load_seconds": round(result.pop("load_seconds"), 3),
+        "first_call_seconds": round(result.pop("first_call_seconds"), 3),
+        "baseline_rss_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+        **result,
+    }
+
+
+# -------------------------------
+# Driver
+# -------------------------------
+def spawn_cell(suite: str, params: dict, runs: int, timeout: float) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.model_bench", "--cell", json.dumps({"suite": suite, "params": params, "runs": runs})]
+    print(f"[ModelBench] {cell_id(suite, params)}")
+    try:
+        proc = subprocess.run(cmd, cwd=BACKEND_DIR, env=cell_env(suite, params), capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout:.0f}s"}
+
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    stderr = proc.stderr.strip().splitlines()
+    return {"error": stderr[-1] if stderr else f"exit code {proc.returncode}"}
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Cells whose per-fixture p50, cold start or peak RSS grew by more than `tolerance`."""
+    regressions = []
+    for cid, now in current["results"].items():
+        before = baseline["results"].get(cid)
+        if not before or "error" in before or "error" in now:
+            continue
+        checks = [("cold_start_seconds", before["cold_start_seconds"], now["cold_start_seconds"]),
+                  ("peak_rss_mb", before["peak_rss_mb"], now["peak_rss_mb"])]
+        for name, fixture in now["fixtures"].items():
+            if name in before["fixtures"]:
+                checks.append((f"{name} p50_ms", before["fixtures"][name]["p50_ms"], fixture["p50_ms"]))
+
+        for metric, old, new in checks:
+            change = (new - old) / max(old, 1e-6)
+            print(f"  {cid:<48} {metric:<36} {old:>10.1f} -> {new:>10.1f} ({change:+.1%})")
+            if change > tolerance:
+                regressions.append(f"{cid} {metric} {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", nargs="+", choices=list(MATRIX), default=list(MATRIX))
+    parser.add_argument("--only", action="append", default=[], metavar="AXIS=V1,V2",
+                        help="restrict a matrix axis, e.g. --only model_size=tiny --only threads=4")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds per matrix cell")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", default=None, help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--cell", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cell:
+        spec = json.loads(args.cell)
+        print(RESULT_MARKER + json.dumps(run_cell(spec["suite"], spec["params"], spec["runs"])), flush=True)
+        return
+
+    only = {}
+    for item in args.only:
+        axis, _, values = item.partition("=")
+        only[axis] = values.split(",")
+
+    results = {cell_id(s, p): {"suite": s, "params": p, **spawn_cell(s, p, args.runs, args.timeout)}
+               for s, p in expand_matrix(args.suites, only)}
+
+    report = {
+        "benchmark": "models",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {"runs": args.runs, "suites": args.suites, "only": only},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"[ModelBench] Comparing against {args.compare} (tolerance {args.tolerance:.0%})")
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print("[ModelBench] Regressions: " + "; ".join(regressions))
+            sys.exit(1)
+        print("[ModelBench] No regressions")
+
+
+if __name__ == "__main__":
+    main()
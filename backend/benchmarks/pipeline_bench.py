@@ -0,0 +1,336 @@
+# backend/benchmarks/pipeline_bench.py
+"""
+Offline end-to-end benchmark of the interview pipeline.
+
+Starts local stand-ins for every external service, then the real API and
+RQ workers against them, and drives complete interview flows at a fixed
+concurrency:
+
+    question generation -> start_attempt -> per answered question:
+    TTS over /ws -> GET /audio -> POST /answer -> Whisper -> complete_attempt -> scoring job (SSE)
+
+    python -m benchmarks.pipeline_bench --flows 20 --concurrency 4 --out pipeline.json
+    python -m benchmarks.pipeline_bench --flows 20 --concurrency 4 --compare pipeline.json
+
+Stand-ins: benchmarks.fake_llm (Groq), benchmarks.fake_postgrest (Supabase)
+and fakeredis's TCP server (or --redis-url for a real Redis). Models are
+faked by default (see bench_worker); --real-models uses Kokoro/Whisper.
+
+fakeredis is a benchmark-only dependency: pip install -r benchmarks/requirements.txt
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+import httpx
+import numpy as np
+import websockets
+from services.latency import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ["generate_questions", "start_attempt", "tts_ready", "get_audio", "answer_upload",
+          "transcripts_persisted", "complete_attempt_ack", "complete_attempt", "flow_total"]
+
+
+# -------------------------------
+# Stand-in services
+# -------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    return server
+
+
+def start_fake_redis(port: int):
+    # Only needed without --redis-url, so it stays out of the app requirements
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise SystemExit("fakeredis is not installed: pip install -r benchmarks/requirements.txt, or pass --redis-url")
+
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True  # client connections (workers, API) must not block exit
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_for_http(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def answer_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Synthetic spoken-answer stand-in: low-level noise in a 16 kHz mono WAV."""
+    rng = np.random.default_rng(0)
+    samples = (rng.normal(0, 0.05, int(seconds * sample_rate)) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+# -------------------------------
+# One interview flow
+# -------------------------------
+async def run_flow(client: httpx.AsyncClient, api: str, postgrest: str, answers: int, audio: bytes, timings: dict) -> bool:
+    ids = {"userId": str(uuid.uuid4()), "interviewId": str(uuid.uuid4()), "attemptId": str(uuid.uuid4())}
+    flow_start = time.perf_counter()
+
+    async def timed(stage, coro):
+        start = time.perf_counter()
+        result = await coro
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    res = await timed("generate_questions", client.post(f"{api}/interview/manual-questions", json={
+        **ids, "role": "Backend Engineer", "techstack": ["Python", "Redis", "PostgreSQL"], "type": "technical",
+    }))
+    res.raise_for_status()
+    questions = res.json()["questions"][:answers]
+
+    res = await timed("start_attempt", client.post(f"{api}/interview/start_attempt", json=ids))
+    res.raise_for_status()
+
+    ws_url = api.replace("http", "ws", 1) + "/interview/ws"
+    async with websockets.connect(ws_url) as ws:
+        for q in questions:
+            start = time.perf_counter()
+            await ws.send(json.dumps({
+                "action": "start_question", "interviewId": ids["interviewId"], "questionId": q["id"], "text": q["question"],
+            }))
+            while True:
+                event = json.loads(await asyncio.wait_for(ws.recv(), 120))
+                if event.get("event") == "ready" and event.get("questionId") == q["id"]:
+                    break
+            timings["tts_ready"].append(time.perf_counter() - start)
+
+            res = await timed("get_audio", client.get(f"{api}/interview/audio",
+                                                      params={"interviewId": ids["interviewId"], "questionId": q["id"]}))
+            res.raise_for_status()
+
+            res = await timed("answer_upload", client.post(
+                f"{api}/interview/answer",
+                files={"file": ("answer.wav", audio, "audio/wav")},
+                data={"questionId": q["id"], "interviewId": ids["interviewId"], "userId": ids["userId"], "attemptId": ids["attemptId"]},
+            ))
+            res.raise_for_status()
+
+    # Transcripts are buffered and flushed in bulk, so this includes the write-behind delay
+    start = time.perf_counter()
+    deadline = start + 120
+    while time.perf_counter() < deadline:
+        rows = (await client.get(f"{postgrest}/rest/v1/answers", params={
+            "attempt_id": f"eq.{ids['attemptId']}", "transcript": "not.is.null", "select": "question_id",
+        })).json()
+        if len(rows) >= len(questions):
+            break
+        await asyncio.sleep(0.05)
+    timings["transcripts_persisted"].append(time.perf_counter() - start)
+
+    # Scoring runs as a job: time the 202, then until the "done" event arrives over SSE
+    start = time.perf_counter()
+    res = await timed("complete_attempt_ack", client.post(f"{api}/interview/complete_attempt", json=ids))
+    res.raise_for_status()
+    async with client.stream("GET", f"{api}{res.json()['eventsUrl']}", timeout=300) as stream:
+        stream.raise_for_status()
+        async for line in stream.aiter_lines():
+            if line == "event: error":
+                raise RuntimeError(f"Scoring failed for attempt {ids['attemptId']}")
+            if line == "event: done":
+                break
+    timings["complete_attempt"].append(time.perf_counter() - start)
+    res = await client.get(f"{api}{res.json()['resultUrl']}")
+    res.raise_for_status()
+
+    timings["flow_total"].append(time.perf_counter() - flow_start)
+    return True
+
+
+async def drive(api: str, postgrest: str, flows: int, concurrency: int, answers: int, audio: bytes) -> dict:
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        async def one():
+            async with semaphore:
+                try:
+                    await run_flow(client, api, postgrest, answers, audio, timings)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                    print(f"[Bench] Flow failed: {e!r}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(flows)))
+        wall = time.perf_counter() - start
+
+    completed = len(timings["flow_total"])
+    return {
+        "wall_seconds": round(wall, 3),
+        "flows_completed": completed,
+        "flows_failed": sum(errors.values()),
+        "errors": dict(errors),
+        "throughput_flows_per_min": round(completed / wall * 60, 3) if wall else 0.0,
+        "stages": {stage: summarize(timings[stage]) for stage in STAGES},
+    }
+
+
+def summarize(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+# -------------------------------
+# Regression check
+# -------------------------------
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Stages whose p95 (or overall throughput) got worse than `tolerance`."""
+    regressions = []
+    for stage, now in current["results"]["stages"].items():
+        before = baseline["results"]["stages"].get(stage, {})
+        if not before.get("count") or not now.get("count"):
+            continue
+        change = (now["p95_ms"] - before["p95_ms"]) / max(before["p95_ms"], 1e-6)
+        print(f"  {stage:<24} p95 {before['p95_ms']:>9.1f} -> {now['p95_ms']:>9.1f} ms ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(f"{stage} p95 {change:+.1%}")
+
+    before_tp = baseline["results"]["throughput_flows_per_min"]
+    now_tp = current["results"]["throughput_flows_per_min"]
+    if before_tp:
+        change = (now_tp - before_tp) / before_tp
+        print(f"  {'throughput':<24} {before_tp:>9.2f} -> {now_tp:>9.2f} flows/min ({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(f"throughput {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--answers", type=int, default=3, help="questions answered per flow")
+    parser.add_argument("--answer-seconds", type=float, default=8.0)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=10)
+    parser.add_argument("--tts-rtf", type=float, default=0.25)
+    parser.add_argument("--whisper-rtf", type=float, default=0.3)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--redis-url", default=None, help="use this Redis instead of a fakeredis server")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", default=None, help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    from benchmarks import fake_llm, fake_postgrest
+
+    llm_port, db_port, api_port = free_port(), free_port(), free_port()
+    serve_in_thread(fake_llm.create_app(args.llm_latency_ms, args.llm_jitter_ms, args.llm_failure_rate, seed=args.seed), llm_port)
+    serve_in_thread(fake_postgrest.create_app(args.db_latency_ms, args.db_latency_ms / 4, seed=args.seed), db_port)
+
+    redis_url = args.redis_url
+    if redis_url is None:
+        redis_port = free_port()
+        start_fake_redis(redis_port)
+        redis_url = f"redis://127.0.0.1:{redis_port}/0"
+
+    env = {
+        **os.environ,
+        "REDIS_URL": redis_url,
+        "SUPABASE_URL": f"http://127.0.0.1:{db_port}",
+        "SUPABASE_KEY": os.getenv("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.bench"),
+        "GROQ_BASE_URL": f"http://127.0.0.1:{llm_port}",
+        "GROQ_API_KEY": "bench",
+        "TRACE_EXPORT": "off",
+    }
+    api_url = f"http://127.0.0.1:{api_port}"
+    postgrest_url = env["SUPABASE_URL"]
+
+    procs = [subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )]
+    worker_cmd = [sys.executable, "-m", "benchmarks.bench_worker", "--tts-rtf", str(args.tts_rtf), "--whisper-rtf", str(args.whisper_rtf)]
+    if not args.real_models:
+        worker_cmd.append("--fake-models")
+    procs += [subprocess.Popen(worker_cmd, cwd=BACKEND_DIR, env=env) for _ in range(args.workers)]
+
+    try:
+        wait_for_http(f"{api_url}/startup-report")
+        results = asyncio.run(drive(api_url, postgrest_url, args.flows, args.concurrency, args.answers,
+                                    answer_wav(args.answer_seconds)))
+        results["llm_server"] = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+        results["db_server"] = httpx.get(f"{postgrest_url}/stats").json()
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=30)
+
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+    print(json.dumps(report["results"], indent=2))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparison against {args.compare}:")
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/benchmarks/tts_rtf.py
+"""
+Real-time factor benchmark for the Kokoro TTS backends on CPU.
+
+    python -m benchmarks.tts_rtf --backends torch onnx --runs 3 --out tts_rtf.json
+
+RTF = synthesis seconds / seconds of audio produced (lower is better, < 1 is faster than real time).
+"""
+
+import argparse
+import json
+import os
+import time
+import statistics
+
+SAMPLE_TEXTS = [
+    "Explain the difference between a process and a thread.",
+    "Walk me through how you would design a rate limiter for a public API. "
+    "Consider burst traffic, multiple servers, and how clients should be told to back off.",
+    "What happens, step by step, when you type a URL into the browser and press enter? "
+    "Cover DNS resolution, the TCP and TLS handshakes, the HTTP request, and how the page is rendered.",
+]
+
+
+def bench_backend(backend: str, runs: int) -> dict:
+    import kokoro_local
+
+    loader = kokoro_local.get_onnx_model if backend == "onnx" else kokoro_local.get_pipeline
+    start = time.perf_counter()
+    loader()
+    load_seconds = time.perf_counter() - start
+
+    # warm-up so the first timed run doesn't include graph/kernel setup
+    kokoro_local.tts_to_pcm(SAMPLE_TEXTS[0], backend=backend)
+
+    rtfs = []
+    per_text = []
+    for text in SAMPLE_TEXTS:
+        for _ in range(runs):
+            start = time.perf_counter()
+            audio = kokoro_local.tts_to_pcm(text, backend=backend)
+            synth_seconds = time.perf_counter() - start
+            audio_seconds = len(audio) / kokoro_local.SAMPLE_RATE
+            rtf = synth_seconds / audio_seconds if audio_seconds else float("inf")
+            rtfs.append(rtf)
+            per_text.append({
+                "chars": len(text),
+                "audio_seconds": round(audio_seconds, 3),
+                "synth_seconds": round(synth_seconds, 3),
+                "rtf": round(rtf, 4),
+            })
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "rtf_mean": round(statistics.mean(rtfs), 4),
+        "rtf_median": round(statistics.median(rtfs), 4),
+        "rtf_max": round(max(rtfs), 4),
+        "runs": per_text,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kokoro TTS real-time factor benchmark")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args()
+
+    results = {
+        "cpu_count": os.cpu_count(),
+        "onnx_threads": os.getenv("KOKORO_ONNX_THREADS", "0"),
+        "backends": [bench_backend(b, args.runs) for b in args.backends],
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
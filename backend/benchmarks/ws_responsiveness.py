@@ -0,0 +1,122 @@
+# backend/benchmarks/ws_responsiveness.py
+"""
+Load test: /ws round-trip latency while question generations are in flight.
+
+Run against a dev server (it creates real attempts/questions rows):
+
+    uvicorn main:app --port 8000
+    python -m benchmarks.ws_responsiveness --generations 8 --out ws_load.json
+
+A cached TTS entry is seeded in Redis so every /ws probe is a pure cache-hit
+round trip; any latency growth under load is the event loop being blocked.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+import httpx
+import redis
+import websockets
+from services.latency import percentile
+
+PROBE_INTERVAL = 0.05  # seconds between /ws probes
+
+
+async def probe_ws(ws_url: str, interview_id: str, question_id: str, stop: asyncio.Event) -> list:
+    rtts = []
+    async with websockets.connect(ws_url) as ws:
+        while not stop.is_set():
+            start = time.perf_counter()
+            await ws.send(json.dumps({
+                "action": "start_question",
+                "interviewId": interview_id,
+                "questionId": question_id,
+                "text": "probe",
+            }))
+            await ws.recv()
+            rtts.append(time.perf_counter() - start)
+            await asyncio.sleep(PROBE_INTERVAL)
+    return rtts
+
+
+async def run_generation(client: httpx.AsyncClient, base_url: str) -> dict:
+    payload = {
+        "userId": str(uuid.uuid4()),
+        "interviewId": str(uuid.uuid4()),
+        "attemptId": str(uuid.uuid4()),
+        "role": "Backend Engineer",
+        "techstack": ["Python", "FastAPI", "PostgreSQL"],
+        "type": "technical",
+    }
+    start = time.perf_counter()
+    res = await client.post(f"{base_url}/interview/manual-questions", json=payload)
+    return {"status": res.status_code, "seconds": time.perf_counter() - start}
+
+
+def summarize(rtts: list) -> dict:
+    values = sorted(rtts)
+    return {
+        "probes": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+    }
+
+
+async def measure(base_url: str, generations: int, idle_seconds: float) -> dict:
+    ws_url = base_url.replace("http", "ws", 1) + "/interview/ws"
+    interview_id, question_id = "bench-ws", "bench-ws"
+
+    # Seed a cache hit so probes never enqueue TTS work
+    redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")).setex(
+        f"tts:{interview_id}:{question_id}", 3600, b"RIFF"
+    )
+
+    # Baseline: no generations running
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_ws(ws_url, interview_id, question_id, stop))
+    await asyncio.sleep(idle_seconds)
+    stop.set()
+    idle_rtts = await probe
+
+    # Under load: N concurrent generations
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_ws(ws_url, interview_id, question_id, stop))
+    async with httpx.AsyncClient(timeout=300) as client:
+        gen_results = await asyncio.gather(*(run_generation(client, base_url) for _ in range(generations)))
+    stop.set()
+    loaded_rtts = await probe
+
+    gen_seconds = sorted(r["seconds"] for r in gen_results)
+    return {
+        "generations": generations,
+        "generation_status_codes": sorted({r["status"] for r in gen_results}),
+        "generation_p50_s": round(percentile(gen_seconds, 50), 2),
+        "generation_max_s": round(gen_seconds[-1], 2),
+        "ws_idle": summarize(idle_rtts),
+        "ws_under_load": summarize(loaded_rtts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/ws responsiveness under concurrent question generation")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--generations", type=int, default=8)
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--out", help="write JSON results to this path")
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args.base_url, args.generations, args.idle_seconds))
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
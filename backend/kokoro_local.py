@@ -1,34 +1,103 @@
 # backend/kokoro_local.py
 
-import torch
+import os
 import numpy as np
-from kokoro import KPipeline
 import soundfile as sf
 import io
+from services.startup import lazy_resource
 
-print("🔊 Loading Kokoro TTS model...")
-device = "cuda" if torch.cuda.is_available() else "cpu"
-pipeline = KPipeline(lang_code="a", device=device)
-print(f"✅ Kokoro loaded using {device}")
+SAMPLE_RATE = 24000
 
+# "torch" runs the PyTorch KPipeline, "onnx" runs kokoro-onnx on ONNX Runtime (CPU)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "torch")
 
-def tts_to_wav(text: str, voice="af_heart") -> bytes:
-    """
-    Run Kokoro TTS and return WAV bytes (playable by browser <audio>).
-    """
+KOKORO_ONNX_MODEL = os.getenv("KOKORO_ONNX_MODEL", "models/kokoro-v1.0.int8.onnx")
+KOKORO_ONNX_VOICES = os.getenv("KOKORO_ONNX_VOICES", "models/voices-v1.0.bin")
+KOKORO_ONNX_THREADS = int(os.getenv("KOKORO_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+KOKORO_DEVICE = os.getenv("KOKORO_DEVICE", "auto")  # "auto" picks CUDA when available
+
+
+@lazy_resource("model:kokoro")
+def get_pipeline():
+    """Loads the Kokoro pipeline on first use (TTS workers only)."""
+    import torch
+    from kokoro import KPipeline
+
+    print("🔊 Loading Kokoro TTS model...")
+    device = KOKORO_DEVICE
+    if device == "auto":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    pipeline = KPipeline(lang_code="a", device=device)
+    print(f"✅ Kokoro loaded using {device}")
+    return pipeline
 
+
+@lazy_resource("model:kokoro-onnx")
+def get_onnx_model():
+    """Loads Kokoro on ONNX Runtime with a tuned CPU session."""
+    import onnxruntime as ort
+    from kokoro_onnx import Kokoro
+
+    print(f"🔊 Loading Kokoro ONNX model ({KOKORO_ONNX_MODEL})...")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if KOKORO_ONNX_THREADS > 0:
+        options.intra_op_num_threads = KOKORO_ONNX_THREADS
+        options.inter_op_num_threads = 1
+
+    session = ort.InferenceSession(
+        KOKORO_ONNX_MODEL,
+        sess_options=options,
+        providers=["CPUExecutionProvider"],
+    )
+    model = Kokoro.from_session(session, KOKORO_ONNX_VOICES)
+    print(f"✅ Kokoro ONNX loaded (intra-op threads: {KOKORO_ONNX_THREADS or 'default'})")
+    return model
+
+
+def _torch_pcm(text: str, voice: str) -> np.ndarray:
     # Kokoro returns segmented output: (start_time, end_time, audio_chunk)
-    segments = pipeline(text, voice=voice)
+    segments = get_pipeline()(text, voice=voice)
 
     audio = []
     for _, _, segment_audio in segments:
         audio.extend(segment_audio)
 
-    # Convert to numpy float32 array
-    audio_np = np.array(audio, dtype=np.float32)
-    sample_rate = 24000  
+    return np.array(audio, dtype=np.float32)
+
+
+def _onnx_pcm(text: str, voice: str) -> np.ndarray:
+    samples, sample_rate = get_onnx_model().create(text, voice=voice, speed=1.0, lang="en-us")
+    if sample_rate != SAMPLE_RATE:
+        raise ValueError(f"Unexpected Kokoro ONNX sample rate: {sample_rate}")
+    return np.asarray(samples, dtype=np.float32)
 
-    # Encode into WAV container
+
+TTS_BACKENDS = {
+    "torch": _torch_pcm,
+    "onnx": _onnx_pcm,
+}
+
+
+def tts_to_pcm(text: str, voice="af_heart", backend: str = None) -> np.ndarray:
+    """
+    Run Kokoro TTS and return mono float32 samples at SAMPLE_RATE.
+    """
+    backend = backend or TTS_BACKEND
+    if backend not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS_BACKEND '{backend}', expected one of {list(TTS_BACKENDS)}")
+    return TTS_BACKENDS[backend](text, voice)
+
+
+def pcm_to_wav(audio_np: np.ndarray) -> bytes:
+    """Encode float32 samples into a WAV container."""
     buf = io.BytesIO()
-    sf.write(buf, audio_np, sample_rate, format="WAV")
+    sf.write(buf, audio_np, SAMPLE_RATE, format="WAV")
     return buf.getvalue()
+
+
+def tts_to_wav(text: str, voice="af_heart") -> bytes:
+    """
+    Run Kokoro TTS and return WAV bytes (playable by browser <audio>).
+    """
+    return pcm_to_wav(tts_to_pcm(text, voice))
@@ -1,20 +1,11 @@
-from langchain_groq import ChatGroq
-from groq import Groq
 import os
 
 import dotenv
 dotenv.load_dotenv()
 
-# LLM for cleaning/correction
-llm_cleaner = ChatGroq(
-    model="llama-3.1-8b-instant",
-    groq_api_key=os.getenv("GROQ_API_KEY")
-)
+# Overridable so benchmarks can point every client at a local OpenAI-compatible server
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
 
-# LLM for interviewing / question generation
-llm_interviewer = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    groq_api_key=os.getenv("GROQ_API_KEY")
-)
-
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
\ No newline at end of file
+# Models behind each role; every call goes through services/llm_gateway.py
+INTERVIEWER_MODEL = os.getenv("INTERVIEWER_MODEL", "llama-3.3-70b-versatile")  # question generation
+FAST_MODEL = os.getenv("FAST_MODEL", "llama-3.1-8b-instant")                    # scoring, feedback, chunk metadata
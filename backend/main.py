@@ -1,9 +1,22 @@
-from fastapi import FastAPI
+import time
+import secrets
+from services.startup import record_timing, startup_report, PROCESS_START
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, PlainTextResponse
 from routes.question_endpoint import router as question_router
 from routes.Interview_endpoint import router as interview_router
 from routes.pdf_upload_endpoint import router as pdf_router
+from services.db import db_latency
+from services.scheduler import scheduler_stats
+from worker_supervisor import read_state as worker_pool_state
+from services.answer_buffer import start_flusher
+from services.tracing import span, current_trace_id, valid_trace_id, load_spans, stage_percentiles
+from services.metrics import render_metrics
+from services.profiling import request_profile, load_profile
+
+record_timing("api:imports", time.perf_counter() - PROCESS_START)
 
 # -------------------------------
 # FastAPI setup
@@ -15,10 +28,84 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+
+# Root span per request; workers continue it through the job meta.
+# Clients may pass X-Trace-Id to join an existing trace, and X-Profile: 1
+# to record sampling profiles of the request and the jobs it submits.
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    profile = request.headers.get("x-profile") == "1"
+    # A client trace id, or a profiled request, is always exported rather than sampled
+    trace_id = (request.headers.get("x-trace-id") or "").lower()
+    if not valid_trace_id(trace_id):
+        # Ends up in file paths (profiles), so only well-formed ids are accepted
+        trace_id = secrets.token_hex(16) if profile else None
+    with span(f"{request.method} {request.url.path}", trace_id=trace_id) as attrs, request_profile(trace_id if profile else None):
+        response = await call_next(request)
+        attrs["status_code"] = response.status_code
+        # The span's id, or for a profiled request the id its profiles are filed under
+        trace_id = current_trace_id() or (trace_id if profile else None)
+        if trace_id:  # None when TRACE_EXPORT=off or the trace was not sampled
+            response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
 app.include_router(question_router, prefix="/interview")
 app.include_router(interview_router, prefix="/interview")
 app.include_router(pdf_router, prefix="/interview")
 
 
+@app.on_event("startup")
+async def log_startup_time():
+    record_timing("api:ready", time.perf_counter() - PROCESS_START)
+    # Drains answer writes buffered by this or any (possibly restarted) worker
+    start_flusher()
+    report = startup_report()
+    if report["heavy_modules_loaded"]:
+        print(f"[Startup] WARNING: API process imported {report['heavy_modules_loaded']}")
+
+
+# --- Startup / import-time report ---
+@app.get("/startup-report")
+def get_startup_report():
+    return startup_report()
+
+
+# --- Supabase call latency per operation ---
+@app.get("/db-stats")
+def get_db_stats():
+    return db_latency.summary()
+
+
+# --- Queue depth and per-class queue wait ---
+@app.get("/queue-stats")
+def get_queue_stats():
+    return scheduler_stats()
+
+
+# --- Worker pool sizes and the supervisor's recent scaling decisions ---
+@app.get("/worker-pool")
+def get_worker_pool():
+    return worker_pool_state()
+
+
+# --- Per-stage latency percentiles from exported spans ---
+@app.get("/trace-stats")
+def get_trace_stats(root: str = None):
+    return stage_percentiles(load_spans(), root)
+
+
+# --- Folded stacks (flamegraph input) recorded for one trace ---
+@app.get("/profiles/{trace_id}", response_class=PlainTextResponse)
+def get_profile(trace_id: str):
+    folded = load_profile(trace_id)
+    if not folded:
+        return PlainTextResponse("", status_code=404)
+    return PlainTextResponse(folded)
 
 
+# --- Prometheus scrape target (caches, queues, model inference, LLM, WebSockets) ---
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
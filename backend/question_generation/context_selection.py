@@ -0,0 +1,153 @@
+# backend/question_generation/context_selection.py
+"""
+Picks a fixed-size, diverse slice of a PDF for the question prompt.
+
+Chunk vectors come from the interview's vector index (stored embeddings),
+and chunks are ranked by maximal marginal relevance against the document's
+topics, so the prompt covers the whole document instead of its first
+30 chunks, and stays within CONTEXT_TOKEN_BUDGET however long the PDF is.
+
+The PDF worker pre-embeds the topic query (topic_query), so the API only
+reads cached vectors; without one it ranks against the document centroid.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+from collections import Counter
+import numpy as np
+import redis
+from services.embedding_cache import request_embeddings
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PDF_CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_CHUNK_CHARS = int(os.getenv("PDF_CONTEXT_CHUNK_CHARS", "1600"))  # per-chunk cap so more sections fit
+MMR_LAMBDA = float(os.getenv("PDF_CONTEXT_MMR_LAMBDA", "0.5"))           # 1 = pure relevance, 0 = pure diversity
+MAX_TOPICS = 25
+MAX_KEY_POINTS = 40
+SELECTION_TTL = 7 * 86400
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-8)
+
+
+def mmr_select(chunk_vecs: np.ndarray, query_vec: np.ndarray, costs: list[int], budget: int, lam: float = MMR_LAMBDA) -> list[int]:
+    """Greedy maximal-marginal-relevance selection under a token budget."""
+    chunk_vecs = _normalize_rows(chunk_vecs)
+    query_vec = query_vec / max(np.linalg.norm(query_vec), 1e-8)
+
+    relevance = chunk_vecs @ query_vec
+    pairwise = chunk_vecs @ chunk_vecs.T
+    max_sim = np.full(len(costs), -1.0)
+
+    selected = []
+    remaining = set(range(len(costs)))
+    spent = 0
+    while remaining:
+        candidates = [i for i in remaining if spent + costs[i] <= budget]
+        if not candidates:
+            break
+        idx = np.array(candidates)
+        redundancy = np.where(max_sim[idx] < 0, 0.0, max_sim[idx])
+        scores = lam * relevance[idx] - (1 - lam) * redundancy
+        best = int(idx[int(np.argmax(scores))])
+
+        selected.append(best)
+        remaining.discard(best)
+        spent += costs[best]
+        max_sim = np.maximum(max_sim, pairwise[best])
+
+    return selected
+
+
+def in_budget(costs: list[int], budget: int) -> list[int]:
+    """Leading indices whose summed cost fits the budget."""
+    selected, spent = [], 0
+    for i, cost in enumerate(costs):
+        if spent + cost > budget:
+            break
+        selected.append(i)
+        spent += cost
+    return selected
+
+
+def _top_items(structured_data: list[dict], field: str, limit: int) -> list[str]:
+    counts = Counter()
+    for struct in structured_data:
+        for item in struct.get(field) or []:
+            counts[str(item).strip()] += 1
+    counts.pop("", None)
+    # Ties broken by text, not row order: topic_query must match what the PDF worker pre-embedded
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [item for item, _ in ranked[:limit]]
+
+
+def topic_query(structured_data: list[dict]) -> str:
+    """The text chunks are ranked against."""
+    return " ; ".join(_top_items(structured_data, "topics", MAX_TOPICS) or ["general"])
+
+
+async def select_pdf_context(chunks_data: list[dict], structured_data: list[dict], interview_id: str):
+    """
+    Returns (context_text, topics, key_points) sized for one prompt.
+    The chunk selection is cached per interview and chunk set.
+    """
+    from services.vector_index import load_chunk_index
+
+    topics = _top_items(structured_data, "topics", MAX_TOPICS) or ["general"]
+    key_points = _top_items(structured_data, "key_points", MAX_KEY_POINTS)
+
+    texts = [(c.get("chunk_text") or "")[:CONTEXT_CHUNK_CHARS] for c in chunks_data]
+    ids = [str(c.get("id", i)) for i, c in enumerate(chunks_data)]
+    if not any(texts):
+        return "", topics, key_points
+
+    cache_key = "pdfctx:{}:{}:{}".format(
+        interview_id,
+        CONTEXT_TOKEN_BUDGET,
+        hashlib.sha1("|".join(sorted(ids)).encode("utf-8")).hexdigest(),
+    )
+    cached = redis_client.get(cache_key)
+    if cached:
+        wanted = set(json.loads(cached))
+        selected = [i for i, chunk_id in enumerate(ids) if chunk_id in wanted]
+    else:
+        # Chunk vectors come from the stored embeddings; the topic query is
+        # only encoded here when API_INLINE_EMBEDDINGS is on
+        index = await load_chunk_index(interview_id)
+        row_of = {chunk_id: i for i, chunk_id in enumerate(index["ids"])}
+        vectors = [index["matrix"][row_of[chunk_id]] if chunk_id in row_of else None for chunk_id in ids]
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+
+        found = await asyncio.to_thread(request_embeddings, [texts[i] for i in missing] + [topic_query(structured_data)])
+        for i, vec in zip(missing, found[:-1]):
+            vectors[i] = vec
+        query_vec = found[-1]
+
+        costs = [estimate_tokens(t) for t in texts]
+        known = [vec for vec in vectors if vec is not None]
+        if known:
+            dim = len(known[0])
+            chunk_vecs = np.vstack([np.zeros(dim, dtype=np.float32) if vec is None else vec for vec in vectors])
+            if query_vec is None:
+                # Topics not embedded: rank against the document centroid instead
+                query_vec = np.mean(known, axis=0)
+            selected = mmr_select(chunk_vecs, query_vec, costs, CONTEXT_TOKEN_BUDGET)
+            redis_client.setex(cache_key, SELECTION_TTL, json.dumps([ids[i] for i in selected]))
+        else:
+            # No stored vectors yet: leading chunks within the budget, not cached
+            selected = in_budget(costs, CONTEXT_TOKEN_BUDGET)
+
+    # Keep document order so the prompt reads like the source
+    context_text = "\n\n".join(texts[i] for i in sorted(selected))
+    print(f"[PDFContext] Selected {len(selected)}/{len(texts)} chunks (~{estimate_tokens(context_text)} tokens)")
+    return context_text, topics, key_points
@@ -0,0 +1,132 @@
+# backend/question_generation/dedup.py
+"""
+Embedding-based near-duplicate filtering for interview questions.
+
+Question embeddings are cached per interview, so reused questions from
+earlier attempts are never re-embedded. Pooled questions are embedded by the
+question worker when the pool is refilled. The API encodes misses itself only
+when API_INLINE_EMBEDDINGS is on; otherwise fresh questions are embedded by a
+short live job on the question worker, and only questions still without a
+vector after DEDUP_EMBED_TIMEOUT are compared by word overlap.
+"""
+
+import os
+import re
+import math
+import time
+import asyncio
+import hashlib
+from typing import List, Optional
+import numpy as np
+import redis
+from services.embedding_cache import request_embeddings, get_cached_embeddings, EMBED_MODEL_NAME
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", "0.88"))  # cosine similarity
+LEXICAL_DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_LEXICAL_DUPLICATE_THRESHOLD", "0.7"))  # word Jaccard
+QUESTION_EMBEDDING_TTL = 30 * 86400
+DEDUP_EMBED_TIMEOUT = float(os.getenv("QUESTION_DEDUP_EMBED_TIMEOUT", "2.0"))  # seconds to wait on the question worker
+DEDUP_EMBED_POLL = 0.05
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=False)
+
+_word_re = re.compile(r"[a-z0-9']+")
+
+
+def _interview_key(interview_id: str) -> str:
+    return f"qemb:{interview_id or 'none'}"
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+def _embed_on_worker(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """Embeds texts through a live question job, waiting up to DEDUP_EMBED_TIMEOUT. None where it ran out."""
+    from services.scheduler import submit
+    try:
+        # Past the timeout nobody is waiting for the vectors any more
+        submit("question", "live", "tasks.question_pool_task.embed_questions_task", texts,
+               ttl=max(1, math.ceil(DEDUP_EMBED_TIMEOUT)))
+    except Exception as e:
+        print(f"[Dedup] Could not enqueue embedding job: {e}")
+        return [None] * len(texts)
+
+    deadline = time.monotonic() + DEDUP_EMBED_TIMEOUT
+    while True:
+        vectors = get_cached_embeddings(EMBED_MODEL_NAME, texts)
+        if all(v is not None for v in vectors) or time.monotonic() >= deadline:
+            return vectors
+        time.sleep(DEDUP_EMBED_POLL)
+
+
+def _embed_questions(texts: List[str], interview_id: str) -> List[Optional[np.ndarray]]:
+    """Normalized embeddings aligned with `texts`, None where none is available."""
+    if not texts:
+        return []
+
+    key = _interview_key(interview_id)
+    hashes = [_text_hash(t) for t in texts]
+    cached = redis_client.hmget(key, hashes)
+
+    vectors = [np.frombuffer(raw, dtype=np.float16).astype(np.float32) if raw else None for raw in cached]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        fresh = request_embeddings([texts[i] for i in missing])
+        unembedded = [k for k, vec in enumerate(fresh) if vec is None]
+        if unembedded and DEDUP_EMBED_TIMEOUT > 0:
+            remote = _embed_on_worker([texts[missing[k]] for k in unembedded])
+            for k, vec in zip(unembedded, remote):
+                fresh[k] = vec
+        found = [(i, vec) for i, vec in zip(missing, fresh) if vec is not None]
+        if found:
+            pipe = redis_client.pipeline(transaction=True)
+            for i, vec in found:
+                vectors[i] = np.asarray(vec, dtype=np.float32)
+                pipe.hset(key, hashes[i], vectors[i].astype(np.float16).tobytes())
+            pipe.expire(key, QUESTION_EMBEDDING_TTL)
+            pipe.execute()
+
+    return [None if v is None else v / max(float(np.linalg.norm(v)), 1e-8) for v in vectors]
+
+
+def _word_overlap(a: str, b: str) -> float:
+    wa, wb = set(_word_re.findall(a.lower())), set(_word_re.findall(b.lower()))
+    return len(wa & wb) / len(wa | wb) if wa and wb else 0.0
+
+
+def filter_near_duplicates(candidates: list[dict], existing: list[dict], interview_id: str) -> list[dict]:
+    """
+    Keeps candidates (in order) that are not near-duplicates of `existing`
+    or of an earlier kept candidate.
+    """
+    if not candidates:
+        return []
+
+    texts = [q["question"] for q in existing] + [q["question"] for q in candidates]
+    vectors = _embed_questions(texts, interview_id)
+
+    def duplicate(i: int, j: int) -> bool:
+        if vectors[i] is not None and vectors[j] is not None:
+            return float(vectors[i] @ vectors[j]) >= DUPLICATE_THRESHOLD
+        return _word_overlap(texts[i], texts[j]) >= LEXICAL_DUPLICATE_THRESHOLD
+
+    accepted = list(range(len(existing)))
+    kept = []
+    for offset, question in enumerate(candidates):
+        idx = len(existing) + offset
+        if any(duplicate(a, idx) for a in accepted):
+            print(f"[Dedup] Dropped near-duplicate: {question['question'][:80]}")
+            continue
+        accepted.append(idx)
+        kept.append(question)
+    return kept
+
+
+async def drop_near_duplicates(candidates: list[dict], existing: list[dict], interview_id: str) -> list[dict]:
+    """Async wrapper; lookups run in a worker thread. Fails open so generation never breaks on it."""
+    try:
+        return await asyncio.to_thread(filter_near_duplicates, candidates, existing, interview_id)
+    except Exception as e:
+        print(f"[Dedup] Skipped, embedding failed: {e}")
+        return candidates
@@ -1,20 +1,69 @@
+import os
 import uuid
 import json
+import time
+import weakref
 from datetime import datetime
-from llm_clients import llm_interviewer  
+from llm_clients import INTERVIEWER_MODEL
 import re
 from services.storage import get_previous_attempt_id
-from supabase_client import supabase
+from services.db import aexecute
+from services.llm_gateway import chat, stream_chat
+from question_generation.question_pool import sample_from_pool, add_to_pool, mark_seen, request_refill_if_low
+from question_generation.stream_parser import JSONArrayStreamParser
+from question_generation.context_selection import select_pdf_context
+from question_generation.dedup import drop_near_duplicates
+import asyncio
 import random
 
-def generate_questions(role: str, techstack: list[str], interview_type: str, user_id: str = None, interview_id: str = None):
-    
-    previous_attempt_id = get_previous_attempt_id(interview_id, user_id)
+# Generations allowed in flight per event loop, and the deadline for one
+# generation including the time spent waiting for a slot.
+QUESTION_GEN_CONCURRENCY = int(os.getenv("QUESTION_GEN_CONCURRENCY", "4"))
+QUESTION_GEN_TIMEOUT = float(os.getenv("QUESTION_GEN_TIMEOUT", "60"))
+# Extra LLM calls allowed to replace questions dropped as near-duplicates
+DEDUP_TOP_UP_ROUNDS = int(os.getenv("DEDUP_TOP_UP_ROUNDS", "2"))
+
+_generation_slots = weakref.WeakKeyDictionary()
+
+
+def _slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _generation_slots:
+        _generation_slots[loop] = asyncio.Semaphore(QUESTION_GEN_CONCURRENCY)
+    return _generation_slots[loop]
+
+
+async def invoke_interviewer(prompt: str) -> str:
+    """Runs the interviewer LLM, bounded by slots and a deadline that includes the slot wait."""
+    deadline = time.monotonic() + QUESTION_GEN_TIMEOUT
+    await asyncio.wait_for(_slots().acquire(), QUESTION_GEN_TIMEOUT)
+    try:
+        return await chat(prompt, model=INTERVIEWER_MODEL, client="interviewer",
+                          deadline=max(deadline - time.monotonic(), 0.001))
+    finally:
+        _slots().release()
+
+
+async def stream_interviewer(prompt: str):
+    """Streaming counterpart of invoke_interviewer; yields text chunks."""
+    deadline = time.monotonic() + QUESTION_GEN_TIMEOUT
+    await asyncio.wait_for(_slots().acquire(), QUESTION_GEN_TIMEOUT)
+    try:
+        async for piece in stream_chat(prompt, model=INTERVIEWER_MODEL, client="interviewer_stream",
+                                       deadline=max(deadline - time.monotonic(), 0.001)):
+            yield piece
+    finally:
+        _slots().release()
+
+
+async def pick_reused_questions(interview_id: str, user_id: str) -> list[dict]:
+    """Two random questions from the user's previous attempt, with fresh IDs."""
+    previous_attempt_id = await get_previous_attempt_id(interview_id, user_id)
     reused_questions = []
 
     if previous_attempt_id:
         # Fetch previous questions
-        prev_res = supabase.table("questions").select("*").eq("attempt_id", previous_attempt_id).execute()
+        prev_res = await aexecute("questions.select_previous", lambda db: db.table("questions").select("*").eq("attempt_id", previous_attempt_id))
         prev_questions = prev_res.data if prev_res.data else []
 
         if len(prev_questions) >= 2:
@@ -24,10 +73,141 @@ def generate_questions(role: str, techstack: list[str], interview_type: str, use
             for q in reused_questions:
                 q["id"] = str(uuid.uuid4())
 
-    # --- STEP B: generate new LLM questions ---
+    return reused_questions
+
+
+async def generate_questions(role: str, techstack: list[str], interview_type: str, user_id: str = None, interview_id: str = None):
+    
+    reused_questions = await pick_reused_questions(interview_id, user_id)
+
+    # --- STEP B: serve new questions from the pool, generating only on a miss ---
     number_of_new_questions = 10 - len(reused_questions)
 
-    system_prompt = f"""
+    questions = sample_from_pool(role, techstack, interview_type, user_id, number_of_new_questions)
+    if questions is None:
+        questions = await llm_generate_questions(role, techstack, interview_type, number_of_new_questions)
+        add_to_pool(role, techstack, interview_type, questions)
+    else:
+        print(f"[QuestionPool] Served {len(questions)} questions from pool")
+
+    # --- STEP C: drop near-duplicates, then ask only for what is missing ---
+    questions = await drop_near_duplicates(questions, reused_questions, interview_id)
+    questions += await top_up_questions(
+        lambda n, avoid: llm_generate_questions(role, techstack, interview_type, n, avoid),
+        reused_questions + questions, number_of_new_questions - len(questions), interview_id,
+    )
+
+    mark_seen(role, techstack, interview_type, user_id, reused_questions + questions)
+    request_refill_if_low(role, techstack, interview_type)
+
+    final_questions = reused_questions + questions
+
+    return final_questions
+
+
+async def stream_questions(role: str, techstack: list[str], interview_type: str, user_id: str = None, interview_id: str = None):
+    """
+    Async generator version of generate_questions.
+    Yields each question as soon as it is available: reused and pooled
+    questions immediately, LLM questions as their JSON object completes.
+    """
+    reused_questions = await pick_reused_questions(interview_id, user_id)
+    for q in reused_questions:
+        yield q
+
+    number_of_new_questions = 10 - len(reused_questions)
+    questions = sample_from_pool(role, techstack, interview_type, user_id, number_of_new_questions)
+
+    if questions is not None:
+        print(f"[QuestionPool] Served {len(questions)} questions from pool")
+        questions = await drop_near_duplicates(questions, reused_questions, interview_id)
+        for q in questions:
+            yield q
+
+        extra = await top_up_questions(
+            lambda n, avoid: llm_generate_questions(role, techstack, interview_type, n, avoid),
+            reused_questions + questions, number_of_new_questions - len(questions), interview_id,
+        )
+        for q in extra:
+            questions.append(q)
+            yield q
+    else:
+        questions = []
+        parser = JSONArrayStreamParser()
+        system_prompt = build_manual_prompt(role, techstack, interview_type, number_of_new_questions)
+
+        async for text in stream_interviewer(system_prompt):
+            for obj in parser.feed(text):
+                record = to_question_record(obj, interview_type)
+                if not record or len(questions) >= number_of_new_questions:
+                    continue
+                if await drop_near_duplicates([record], reused_questions + questions, interview_id):
+                    questions.append(record)
+                    yield record
+
+        add_to_pool(role, techstack, interview_type, questions)
+
+        extra = await top_up_questions(
+            lambda n, avoid: llm_generate_questions(role, techstack, interview_type, n, avoid),
+            reused_questions + questions, number_of_new_questions - len(questions), interview_id,
+        )
+        for q in extra:
+            questions.append(q)
+            yield q
+
+    mark_seen(role, techstack, interview_type, user_id, reused_questions + questions)
+    request_refill_if_low(role, techstack, interview_type)
+
+
+async def top_up_questions(generate, accepted: list[dict], missing: int, interview_id: str) -> list[dict]:
+    """
+    Requests only the `missing` number of questions via `generate(n, avoid)`,
+    keeping those that are not near-duplicates of `accepted` or each other.
+    """
+    extra = []
+    for _ in range(DEDUP_TOP_UP_ROUNDS):
+        if missing - len(extra) <= 0:
+            break
+        avoid = [q["question"] for q in accepted + extra]
+        candidates = await generate(missing - len(extra), avoid)
+        if not candidates:
+            break
+        kept = await drop_near_duplicates(candidates, accepted + extra, interview_id)
+        extra += kept[:missing - len(extra)]
+        print(f"[Dedup] Top-up kept {len(kept)}/{len(candidates)} questions")
+    return extra
+
+
+def avoid_clause(avoid: list[str] = None) -> str:
+    if not avoid:
+        return ""
+    listed = "\n".join(f"- {q}" for q in avoid)
+    return f"\n    Do NOT repeat or paraphrase any of these questions:\n{listed}\n"
+
+
+async def llm_generate_questions(role: str, techstack: list[str], interview_type: str, number_of_new_questions: int, avoid: list[str] = None):
+    """Asks the interviewer LLM for a fresh set of questions."""
+    system_prompt = build_manual_prompt(role, techstack, interview_type, number_of_new_questions, avoid)
+
+    # LLM access goes through services/llm_gateway.py
+    raw_output = await invoke_interviewer(system_prompt)
+
+    try:
+        question_list = json.loads(raw_output)
+    except json.JSONDecodeError:
+        question_list = []
+    
+    questions = []
+    for q in question_list:
+        record = to_question_record(q, interview_type)
+        if record:
+            questions.append(record)
+
+    return questions
+
+
+def build_manual_prompt(role: str, techstack: list[str], interview_type: str, number_of_new_questions: int, avoid: list[str] = None) -> str:
+    return f"""
         You are a senior technical interviewer conducting a realistic, structured interview.
 
         Candidate role: {role}
@@ -70,78 +250,69 @@ def generate_questions(role: str, techstack: list[str], interview_type: str, use
             "key_points": ["Pointer manipulation", "Iterative or recursive approach", "Head node reassignment"]
         }}
         ]
-        """
+        """ + avoid_clause(avoid)
 
-    # llm is defined in llm_clients.py
-    raw_output = llm_interviewer.invoke(system_prompt)  
-   
-    if hasattr(raw_output, "content"):
-        raw_output = raw_output.content.strip()
-    else:
-        raw_output = str(raw_output).strip()
 
-    try:
-        question_list = json.loads(raw_output)
-    except json.JSONDecodeError:
-        question_list = []
-    
-    questions = []
-    for q in question_list:
-        if "question" in q and q["question"].strip():
-            questions.append({
-                "id": str(uuid.uuid4()),
-                "question": q["question"].strip(),
-                "difficulty": q.get("difficulty", "medium"),
-                "topic": q.get("topic", "concept"),
-                "type": interview_type,
-                "ideal_answer": q.get("ideal_answer", None),    
-                "key_points": q.get("key_points", []), 
-            })
-            
-    final_questions = reused_questions + questions
+def to_question_record(q: dict, interview_type: str):
+    """Normalizes one LLM question object; returns None if it has no question text."""
+    if not isinstance(q, dict) or not str(q.get("question", "")).strip():
+        return None
+    return {
+        "id": str(uuid.uuid4()),
+        "question": q["question"].strip(),
+        "difficulty": q.get("difficulty", "medium"),
+        "topic": q.get("topic", "concept"),
+        "type": interview_type,
+        "ideal_answer": q.get("ideal_answer", None),    
+        "key_points": q.get("key_points", []), 
+    }
 
-    return final_questions
 
 
-
-def generate_questions_from_pdf(chunks_data: list[dict], structured_data: list[dict],user_id: str = None, interview_id: str = None):
+async def generate_questions_from_pdf(chunks_data: list[dict], structured_data: list[dict],user_id: str = None, interview_id: str = None):
     """
     Generates exactly 10 interview questions from PDF chunks and structured data.
     Always ensures 10 questions are returned, with placeholders if necessary.
     """
-    # Combine all text for context
-    combined_text = "\n".join(chunk.get("chunk_text", "") for chunk in chunks_data[:30])
-    combined_text += "\n" + "\n".join(struct.get("chunk_preview", "") for struct in structured_data[:30])
-
-    # Extract topics and key points safely
-    topics_list = []
-    key_points_list = []
-    for struct in structured_data:
-        topics_list.extend(struct.get("topics", []))
-        key_points_list.extend(struct.get("key_points", []))
-
-    topics_list = topics_list or ["general"]
-    key_points_list = key_points_list or []
+    # Fixed-size, diverse slice of the whole document (see context_selection)
+    combined_text, topics_list, key_points_list = await select_pdf_context(chunks_data, structured_data, interview_id)
     
-    previous_attempt_id = get_previous_attempt_id(interview_id, user_id)
-    reused_questions = []
-
-    if previous_attempt_id:
-        # Fetch previous questions
-        prev_res = supabase.table("questions").select("*").eq("attempt_id", previous_attempt_id).execute()
-        prev_questions = prev_res.data if prev_res.data else []
-
-        if len(prev_questions) >= 2:
-            reused_questions = random.sample(prev_questions, 2)
-
-            # Assign new IDs
-            for q in reused_questions:
-                q["id"] = str(uuid.uuid4())
+    reused_questions = await pick_reused_questions(interview_id, user_id)
 
     # --- STEP B: generate new LLM questions ---
     number_of_new_questions = 10 - len(reused_questions)
     
 
+    questions = await pdf_llm_questions(combined_text, topics_list, key_points_list, number_of_new_questions)
+
+    # --- STEP C: drop near-duplicates, then ask only for what is missing ---
+    questions = await drop_near_duplicates(questions, reused_questions, interview_id)
+    questions += await top_up_questions(
+        lambda n, avoid: pdf_llm_questions(combined_text, topics_list, key_points_list, n, avoid),
+        reused_questions + questions, number_of_new_questions - len(questions), interview_id,
+    )
+
+    final_questions = reused_questions + questions
+
+    # Ensure exactly 10 questions
+    while len(final_questions) < 10:
+        final_questions.append({
+            "id": str(uuid.uuid4()),
+            "question": f"Placeholder question {len(final_questions)+1} based on PDF content",
+            "difficulty": "medium",
+            "topic": "general",
+            "type": "pdf",
+            "ideal_answer": "No ideal answer available.",
+            "key_points": [],
+        })
+
+    final_questions = final_questions[:10]
+
+    return final_questions
+
+
+async def pdf_llm_questions(combined_text: str, topics_list: list[str], key_points_list: list[str], number_of_new_questions: int, avoid: list[str] = None):
+    """Asks the interviewer LLM for questions grounded in the selected PDF context."""
     # System prompt with **example**
     system_prompt = f"""
     You are a senior technical interviewer generating exactly 10 questions from structured PDF content.
@@ -184,14 +355,10 @@ def generate_questions_from_pdf(chunks_data: list[dict], structured_data: list[d
             "key_points": ["Linked list", "Iteration or recursion", "Pointer manipulation"]
         }}
     ]
-    """
+    """ + avoid_clause(avoid)
 
     # Invoke LLM
-    raw_output = llm_interviewer.invoke(system_prompt)
-    if hasattr(raw_output, "content"):
-        raw_output = raw_output.content.strip()
-    else:
-        raw_output = str(raw_output).strip()
+    raw_output = await invoke_interviewer(system_prompt)
 
     # Extract JSON array
     match = re.search(r"\[.*\]", raw_output, re.DOTALL)
@@ -215,21 +382,5 @@ def generate_questions_from_pdf(chunks_data: list[dict], structured_data: list[d
                 "ideal_answer": q.get("ideal_answer", None),
                 "key_points": q.get("key_points", []),
             })
-            
-    final_questions = reused_questions + questions
-
-    # Ensure exactly 10 questions
-    while len(final_questions) < 10:
-        final_questions.append({
-            "id": str(uuid.uuid4()),
-            "question": f"Placeholder question {len(final_questions)+1} based on PDF content",
-            "difficulty": "medium",
-            "topic": "general",
-            "type": "pdf",
-            "ideal_answer": "No ideal answer available.",
-            "key_points": [],
-        })
-
-    final_questions = final_questions[:10]
 
-    return final_questions
\ No newline at end of file
+    return questions
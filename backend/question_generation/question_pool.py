@@ -0,0 +1,117 @@
+# backend/question_generation/question_pool.py
+"""
+Pool of generated question sets keyed by (role, sorted techstack, interview type).
+
+Most manual interviews ask for the same handful of combinations, so instead of
+a 70B generation per request we sample from previously generated questions,
+skipping the ones this user has already seen, and refill in the background.
+"""
+
+import os
+import json
+import uuid
+import random
+import hashlib
+import redis
+from services.scheduler import submit, QueueFull
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+POOL_MIN_SIZE = int(os.getenv("QUESTION_POOL_MIN_SIZE", "40"))    # refill below this
+POOL_MAX_SIZE = int(os.getenv("QUESTION_POOL_MAX_SIZE", "200"))   # stop adding above this
+POOL_TTL = int(os.getenv("QUESTION_POOL_TTL", str(14 * 86400)))
+SEEN_TTL = int(os.getenv("QUESTION_POOL_SEEN_TTL", str(30 * 86400)))
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+DIFFICULTY_ORDER = {"easy": 0, "medium": 1, "hard": 2}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def pool_id(role: str, techstack: list[str], interview_type: str) -> str:
+    key = [_normalize(role), sorted({_normalize(t) for t in techstack}), _normalize(interview_type)]
+    return hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def question_hash(question: dict) -> str:
+    return hashlib.sha1(_normalize(question["question"]).encode("utf-8")).hexdigest()
+
+
+def _pool_key(pid: str) -> str:
+    return f"qpool:{pid}"
+
+
+def _seen_key(pid: str, user_id: str) -> str:
+    return f"qpool:seen:{pid}:{user_id or 'anonymous'}"
+
+
+def add_to_pool(role: str, techstack: list[str], interview_type: str, questions: list[dict]):
+    pid = pool_id(role, techstack, interview_type)
+    if redis_client.hlen(_pool_key(pid)) >= POOL_MAX_SIZE:
+        return
+
+    entries = {
+        question_hash(q): json.dumps({k: v for k, v in q.items() if k != "id"})
+        for q in questions
+    }
+    if entries:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.hset(_pool_key(pid), mapping=entries)
+        pipe.expire(_pool_key(pid), POOL_TTL)
+        pipe.execute()
+
+
+def sample_from_pool(role: str, techstack: list[str], interview_type: str, user_id: str, count: int):
+    """
+    Random unseen questions from the pool, ordered easy → hard.
+    Returns None when the pool can't supply `count` questions for this user.
+    """
+    pid = pool_id(role, techstack, interview_type)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(_pool_key(pid))
+    pipe.smembers(_seen_key(pid, user_id))
+    pool, seen = pipe.execute()
+
+    unseen = [h for h in pool if h not in seen]
+    if len(unseen) < count:
+        return None
+
+    picked = [json.loads(pool[h]) for h in random.sample(unseen, count)]
+    picked.sort(key=lambda q: DIFFICULTY_ORDER.get(q.get("difficulty"), 1))
+    for q in picked:
+        q["id"] = str(uuid.uuid4())
+    return picked
+
+
+def mark_seen(role: str, techstack: list[str], interview_type: str, user_id: str, questions: list[dict]):
+    if not questions:
+        return
+    pid = pool_id(role, techstack, interview_type)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.sadd(_seen_key(pid, user_id), *(question_hash(q) for q in questions))
+    pipe.expire(_seen_key(pid, user_id), SEEN_TTL)
+    pipe.execute()
+
+
+def request_refill_if_low(role: str, techstack: list[str], interview_type: str):
+    """Enqueues one background refill per pool while it is below POOL_MIN_SIZE."""
+    pid = pool_id(role, techstack, interview_type)
+    if redis_client.hlen(_pool_key(pid)) >= POOL_MIN_SIZE:
+        return
+
+    if redis_client.set(f"qpool:refill:{pid}", "1", nx=True, ex=600):
+        try:
+            submit("question", "bulk", "tasks.question_pool_task.refill_question_pool_task",
+                   role, techstack, interview_type)
+        except QueueFull as e:
+            # Requests keep being served from generation; a later one retries the refill
+            refill_done(role, techstack, interview_type)
+            print(f"[QuestionPool] Refill skipped for pool {pid}: {e}")
+            return
+        print(f"[QuestionPool] Refill queued for pool {pid}")
+
+
+def refill_done(role: str, techstack: list[str], interview_type: str):
+    redis_client.delete(f"qpool:refill:{pool_id(role, techstack, interview_type)}")
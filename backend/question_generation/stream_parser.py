@@ -0,0 +1,60 @@
+# backend/question_generation/stream_parser.py
+
+import json
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally parses a streamed JSON array of objects.
+
+    feed() takes the next chunk of LLM output and returns the objects whose
+    closing brace has arrived, so each question can be used as soon as it is
+    complete. Text before the opening '[' (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf = []
+
+    def feed(self, chunk: str) -> list:
+        completed = []
+        for ch in chunk:
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._depth > 0:
+                self._buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0:
+                    if ch != "{":
+                        continue
+                    self._buf = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    continue  # closing bracket of the top-level array
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads("".join(self._buf)))
+                    except json.JSONDecodeError:
+                        pass  # skip a malformed element, keep streaming the rest
+                    self._buf = []
+        return completed
@@ -1,17 +1,23 @@
 import os
 import tempfile
 from typing import Optional
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException
-from fastapi.responses import Response
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from typing import Dict
 import asyncio
 import redis
-import rq
 from uuid import UUID
 import uuid
 from pydantic import BaseModel
-from services.storage import  get_cached_audio,create_attempt_record_in_db, update_attempt_status_to_completed,mark_question_as_answered
-from services.scoring_service import run_full_scoring
+from services.storage import  get_cached_audio,create_attempt_record_in_db, update_attempt_status_to_completed,mark_question_as_answered, tts_job_id
+from services.scheduler import submit, promote
+from services.metrics import WS_ACTIVE
+from services.tracing import span
+from services.scoring_progress import (
+    claim_scoring, release_claim, current_job_id, scoring_status, read_events, last_event, load_result, FINAL_EVENTS,
+    SCORING_JOB_TIMEOUT,
+)
+from services.sse import sse_event, SSE_HEADERS
 
 
 
@@ -39,13 +45,13 @@ class StartAttemptRequest(BaseModel):
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 redis_conn = redis.Redis.from_url(REDIS_URL)
-tts_queue = rq.Queue("tts_queue", connection=redis_conn)
-whisper_queue = rq.Queue("whisper_queue", connection=redis_conn)
+SCORING_EVENTS_POLL = 0.25  # seconds between Redis reads of a scoring run's events
+SCORING_STALE_CHECK_POLLS = 20  # polls without events between checks for a dead run
 
 
 # --- Upload & Transcribe Endpoint ---
 @router.post("/answer")
-def save_answer(
+async def save_answer(
     file: UploadFile = File(...),
     questionId: str = Form(...),
     interviewId: str = Form(...),
@@ -56,24 +62,27 @@ def save_answer(
     try:
         # Save uploaded audio to a temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-            tmp.write(file.file.read())
+            tmp.write(await file.read())
             temp_path = tmp.name
 
         
-        mark_question_as_answered(attemptId, questionId, interviewId, userId)
+        await mark_question_as_answered(attemptId, questionId, interviewId, userId)
 
         print(f"[AI] Queuing Whisper transcription for question {questionId}...")
 
         # ---------------------------------------------------
         # 🚀 ENQUEUE WHISPER TRANSCRIPTION TO RQ WORKER
         # ---------------------------------------------------
-        whisper_queue.enqueue(
+        # The user is mid-interview, so transcription runs in the live class
+        submit(
+            "whisper", "live",
             "tasks.whisper_task.whisper_transcribe_task",
             temp_path,      
             interviewId,
             questionId,
             userId,
-            attemptId
+            attemptId,
+            owner=userId or interviewId,
         )
 
         # DO NOT delete the file here — worker needs it.
@@ -104,7 +113,7 @@ async def start_attempt(request: StartAttemptRequest):
     try:
         try:
             print("📌 Calling create_attempt_record_in_db()...")
-            create_attempt_record_in_db(
+            await create_attempt_record_in_db(
                 attempt_id=request.attemptId,
                 interview_id=request.interviewId,
                 user_id=request.userId
@@ -136,6 +145,7 @@ async def start_attempt(request: StartAttemptRequest):
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
+    WS_ACTIVE.inc(endpoint="/ws")
     try:
         while True:
             data = await ws.receive_json()
@@ -158,13 +168,17 @@ async def websocket_endpoint(ws: WebSocket):
                         print(f"[WS] Acquired lock for {i_id}:{q_id}. Enqueuing job.")
                         try:
                             if not get_cached_audio(i_id, q_id):
-                                tts_queue.enqueue("tasks.tts_task.generate_audio_task", text, i_id, q_id)
+                                submit("tts", "live", "tasks.tts_task.generate_audio_task", text, i_id, q_id,
+                                       owner=i_id, job_id=tts_job_id(i_id, q_id))
                         finally:
                             if redis_conn.get(lock_key) == lock_value.encode('utf-8'):
                                 redis_conn.delete(lock_key)
                                 
                     else:
                         print(f"[WS] Lock already held for {i_id}:{q_id}. Waiting for completion.")
+                        # A prefetch job (or the sentence jobs it fanned out into) may still be
+                        # queued behind other work; the user is waiting now
+                        promote(tts_job_id(i_id, q_id), "live")
 
 
                     await ws.send_json({"event": "processing", "questionId": q_id})
@@ -173,22 +187,29 @@ async def websocket_endpoint(ws: WebSocket):
 
     except WebSocketDisconnect:
         print("[WS] Client disconnected")
+    finally:
+        WS_ACTIVE.dec(endpoint="/ws")
         
 
 # --- Audio Notification Endpoint ---
 async def notify_when_ready(ws: WebSocket, interview_id: str, question_id: str):
     """
     Poll Redis every 1 second and notify frontend when audio is ready.
+    The whole wait is one span, not one per poll.
     """
-    while True:
-        if get_cached_audio(interview_id, question_id):
-            try:
-                await ws.send_json({"event": "ready", "questionId": question_id})
-                print(f"[WS] Notified client: {interview_id}:{question_id} is ready.")
-            except Exception:
-                pass 
-            break
-        await asyncio.sleep(1)
+    with span("tts.wait_audio", question_id=question_id) as attrs:
+        polls = 0
+        while True:
+            polls += 1
+            if get_cached_audio(interview_id, question_id):
+                try:
+                    await ws.send_json({"event": "ready", "questionId": question_id})
+                    print(f"[WS] Notified client: {interview_id}:{question_id} is ready.")
+                except Exception:
+                    pass 
+                break
+            await asyncio.sleep(1)
+        attrs["polls"] = polls
 
 
 # ---Audio Retrieval Endpoint ---
@@ -201,7 +222,10 @@ def get_audio_endpoint(interviewId: str, questionId: str):
 
 
 # --- Complete Attempt Endpoint ---
-@router.post("/complete_attempt")
+# Marks the attempt completed and queues its scoring; the request returns at once.
+# Progress streams from /complete_attempt/{attemptId}/events, the result is at
+# /complete_attempt/{attemptId}. Repeated calls return the same run.
+@router.post("/complete_attempt", status_code=202)
 async def complete_interview_attempt(request: CompleteAttemptRequest):
 
     print("\n==============================")
@@ -213,59 +237,80 @@ async def complete_interview_attempt(request: CompleteAttemptRequest):
     print("👤 userId:", request.userId)
 
     attempt_id = request.attemptId
+    job_id, created = claim_scoring(attempt_id)
 
-    print(f"\n--- Finalizing Attempt: {attempt_id} ---")
-
-    try:
-        print("\n🔧 Step 1: Updating attempt status to COMPLETED...")
-
-        await asyncio.to_thread(update_attempt_status_to_completed, attempt_id)
-
-        print("✅ Attempt status updated.\n")
-        
-        
-        # -----------------------------
-        # 2️⃣ Wait for required transcripts
-        # -----------------------------
-        print("⏳ Step 2: Waiting for required Whisper transcripts...")
-        from services.wait_utils import wait_for_required_transcripts
-        await wait_for_required_transcripts(attempt_id, timeout=60)
-        print("✅ Transcript wait finished (or timeout reached).")
-
-        
-        print("🔍 Step 2: Running full scoring pipeline...")
-        print("⏳ Calling run_full_scoring() ...")
-
-        llm_results = await run_full_scoring(
-            attempt_id=request.attemptId,
-            user_id=request.userId,
-            interview_id=request.interviewId
-        )
-
-        print("\n🎯 Scoring completed successfully!")
-        print("📊 Overall:", llm_results["overall_score"])
-        print("📝 Feedback length:", len(llm_results["feedback"]))
-        print("🧩 Questions scored:", len(llm_results["questions"]))
-
-    except Exception as e:
-        import traceback
-        print("\n❌ ERROR inside complete_attempt:")
-        print("Error message:", e)
-        print("\n--- TRACEBACK ---")
-        print(traceback.format_exc())
-        print("--- END TRACEBACK ---\n")
-
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to finalize attempt: {e}"
-        )
-
-    print("\n🚀 Returning final response...\n")
+    if created:
+        try:
+            await update_attempt_status_to_completed(attempt_id)
+            submit(
+                "scoring", "live",
+                "tasks.scoring_task.complete_attempt_task",
+                attempt_id,
+                request.userId,
+                request.interviewId,
+                owner=request.userId or request.interviewId,
+                job_id=job_id,
+                job_timeout=SCORING_JOB_TIMEOUT,
+            )
+        except Exception as e:
+            release_claim(attempt_id, job_id)
+            print(f"❌ Could not queue scoring for {attempt_id}: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to finalize attempt: {e}")
+        print(f"✅ Scoring queued for {attempt_id} as {job_id}")
+    else:
+        print(f"↩ Scoring already started for {attempt_id} ({job_id})")
 
     return {
-        "message": "Scoring Complete",
-        "attemptId": attempt_id,
-        "overall_score": llm_results["overall_score"],
-        "feedback": llm_results["feedback"],
-        "questions": llm_results["questions"]
+        "message": "Scoring queued" if created else "Scoring already started",
+        **scoring_status(attempt_id),
+        "eventsUrl": f"/interview/complete_attempt/{attempt_id}/events",
+        "resultUrl": f"/interview/complete_attempt/{attempt_id}",
     }
+
+
+# --- Scoring progress (SSE): stage events, then one "question" event per scored answer ---
+@router.get("/complete_attempt/{attempt_id}/events")
+async def stream_attempt_scoring(attempt_id: str, request: Request):
+    if current_job_id(attempt_id) is None and last_event(attempt_id) is None:
+        raise HTTPException(status_code=404, detail="No scoring run for this attempt")
+
+    # Events are kept in Redis, so a reconnecting client resumes after the last id it saw
+    last_id = request.headers.get("last-event-id")
+    cursor = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+
+    async def event_stream():
+        nonlocal cursor
+        polls = 0
+        while not await request.is_disconnected():
+            events = read_events(attempt_id, cursor)
+            for event in events:
+                yield sse_event(event["event"], event, event_id=cursor)
+                cursor += 1
+                if event["event"] in FINAL_EVENTS:
+                    return
+            polls += 1
+            if not events and polls % SCORING_STALE_CHECK_POLLS == 0 and scoring_status(attempt_id)["stage"] == "stale":
+                yield sse_event("error", {"event": "error", "detail": "Scoring run was lost, complete the attempt again"})
+                return
+            await asyncio.sleep(SCORING_EVENTS_POLL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+# --- Scoring result (status while the run is in progress) ---
+@router.get("/complete_attempt/{attempt_id}")
+async def get_attempt_scoring(attempt_id: str):
+    status = scoring_status(attempt_id)
+    if status["status"] == "unknown":
+        raise HTTPException(status_code=404, detail="No scoring run for this attempt")
+    if status["status"] != "done":
+        return status
+
+    result = load_result(attempt_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Scoring result expired")
+    return {"message": "Scoring Complete", **status, **result}
@@ -6,8 +6,9 @@ import asyncio
 from fastapi import APIRouter, UploadFile, Form, WebSocket, HTTPException
 from fastapi.responses import JSONResponse
 import redis
-import rq
 from urllib.parse import unquote
+from services.scheduler import submit, QueueFull
+from services.metrics import WS_ACTIVE
 
 
 router = APIRouter()
@@ -15,7 +16,6 @@ router = APIRouter()
 # Redis connection
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/1")
 redis_conn = redis.Redis.from_url(REDIS_URL)
-pdf_queue = rq.Queue("pdf_queue", connection=redis_conn)
 
 
 # --- PDF Upload Endpoint ---
@@ -49,15 +49,22 @@ async def upload_pdf(
         redis_key = f"pdf_parse:{uuid.uuid4()}"
         print(f"[DEBUG] Redis key for tracking: {redis_key}")
 
-        # Enqueue background task
-        pdf_queue.enqueue("tasks.pdf_task.pdf_parsing_task",temp_file.name, redis_key, userId, pdf_upload_id, interviewId)
+        # Enqueue background task (bulk class: never ahead of live interview work)
+        try:
+            submit("pdf", "bulk", "tasks.pdf_task.pdf_parsing_task", temp_file.name, redis_key, userId, pdf_upload_id, interviewId,
+                   owner=userId)
+        except QueueFull as e:
+            os.remove(temp_file.name)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
 
-        print(f"[DEBUG] Enqueued pdf_parsing_task in pdf_queue")
+        print(f"[DEBUG] Enqueued pdf_parsing_task in pdf_queue_bulk")
 
         # Return WebSocket URL for progress tracking
         ws_url = f"ws://localhost:8000/ws/pdf-status/{redis_key}"  # adjust host/port
         return JSONResponse(content={"websocketUrl": ws_url, "redisKey": redis_key})
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Error in /upload-pdf endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -69,6 +76,7 @@ async def websocket_pdf_status(ws: WebSocket, redis_key: str):
     redis_key = unquote(redis_key)
     print(f"[DEBUG] WebSocket connection opened for Redis key: {redis_key}")
     await ws.accept()
+    WS_ACTIVE.inc(endpoint="/ws/pdf-status")
     try:
         while True:
             data = redis_conn.get(redis_key)
@@ -84,5 +92,6 @@ async def websocket_pdf_status(ws: WebSocket, redis_key: str):
         print(f"[ERROR] WebSocket error for {redis_key}: {e}")
         await ws.send_json({"status": "error", "error": str(e)})
     finally:
+        WS_ACTIVE.dec(endpoint="/ws/pdf-status")
         await ws.close()
         print(f"[DEBUG] WebSocket closed for Redis key: {redis_key}")
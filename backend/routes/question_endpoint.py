@@ -1,12 +1,22 @@
+import os
+import asyncio
+import redis
 from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List
-from supabase_client import supabase  
-from question_generation.generate_questions import generate_questions, generate_questions_from_pdf
+from services.db import aexecute
+from services.storage import tts_job_id
+from services.scheduler import submit, QueueFull
+from services.sse import sse_event, SSE_HEADERS
+from question_generation.generate_questions import generate_questions, generate_questions_from_pdf, stream_questions
 
 
 router = APIRouter()
 
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+redis_conn = redis.Redis.from_url(REDIS_URL)
+
 class QuestionRequest(BaseModel):
     userId: str
     interviewId: str
@@ -21,37 +31,29 @@ async def create_questions(req: QuestionRequest = Body(...)):
         raise HTTPException(status_code=400, detail="Techstack is required")
 
     try:
-        attempt_insert = supabase.table("interview_attempts").insert({
+        attempt_insert = await aexecute("interview_attempts.insert", lambda db: db.table("interview_attempts").insert({
             "user_id": req.userId,
             "interview_id": req.interviewId,
             "attempt_id": req.attemptId
-        }).execute()
+        }))
 
         if not attempt_insert.data:
                 raise HTTPException(status_code=500, detail="Failed to create attempt record")
 
-        questions =  generate_questions(req.role, req.techstack, req.type, req.userId, req.interviewId)
+        try:
+            questions = await generate_questions(req.role, req.techstack, req.type, req.userId, req.interviewId)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Question generation timed out")
 
         if not questions:
             raise HTTPException(status_code=500, detail="No questions generated")
         
         # Supabase insert
-        records = [{
-            "id": q["id"],
-            "interview_id": req.interviewId,
-            "user_id": req.userId,
-            "question": q["question"],
-            "difficulty": q["difficulty"],  
-            "topic": q["topic"],             
-            "type": q["type"],
-            "ideal_answer": q["ideal_answer"],
-            "key_points": q["key_points"],
-            "attempt_id": req.attemptId
-        } for q in questions]
+        records = [question_db_record(q, req) for q in questions]
 
 
         try:
-            res = supabase.table("questions").insert(records).execute()
+            res = await aexecute("questions.insert", lambda db: db.table("questions").insert(records))
             
             if res.data:
                 print("Insert successful:", res.data)
@@ -68,12 +70,91 @@ async def create_questions(req: QuestionRequest = Body(...)):
             "questions": questions,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("[ERROR] /questions crashed:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
+def question_db_record(q: dict, req: QuestionRequest) -> dict:
+    return {
+        "id": q["id"],
+        "interview_id": req.interviewId,
+        "user_id": req.userId,
+        "question": q["question"],
+        "difficulty": q.get("difficulty", "medium"),  
+        "topic": q.get("topic", ""),             
+        "type": q.get("type", req.type),
+        "ideal_answer": q.get("ideal_answer"),
+        "key_points": q.get("key_points", []),
+        "attempt_id": req.attemptId
+    }
+
+
+def enqueue_question_tts(interview_id: str, question: dict, priority: str = "prefetch"):
+    """Starts TTS for a question ahead of time; the lock stops /ws from queuing it twice."""
+    lock_key = f"lock:tts:{interview_id}:{question['id']}"
+    if redis_conn.set(lock_key, "prefetch", nx=True, ex=300):
+        try:
+            submit("tts", priority, "tasks.tts_task.generate_audio_task", question["question"], interview_id, question["id"],
+                   owner=interview_id, job_id=tts_job_id(interview_id, question["id"]))
+        except QueueFull as e:
+            # Skip the prefetch; /ws enqueues it as live work when the question is reached
+            redis_conn.delete(lock_key)
+            print(f"[TTS] Prefetch skipped: {e}")
+
+
+# --- Streaming variant: questions are pushed (SSE) as soon as each one is complete ---
+@router.post("/manual-questions/stream")
+async def stream_manual_questions(req: QuestionRequest = Body(...)):
+    if not req.techstack:
+        raise HTTPException(status_code=400, detail="Techstack is required")
+
+    try:
+        attempt_insert = await aexecute("interview_attempts.insert", lambda db: db.table("interview_attempts").insert({
+            "user_id": req.userId,
+            "interview_id": req.interviewId,
+            "attempt_id": req.attemptId
+        }))
+    except Exception as e:
+        print("[ERROR] /manual-questions/stream attempt insert failed:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not attempt_insert.data:
+        raise HTTPException(status_code=500, detail="Failed to create attempt record")
+
+    async def event_stream():
+        created = 0
+        try:
+            async for q in stream_questions(req.role, req.techstack, req.type, req.userId, req.interviewId):
+                record = question_db_record(q, req)
+                await aexecute("questions.insert", lambda db: db.table("questions").insert(record))
+                # The first question is asked next; the rest are plain prefetch
+                enqueue_question_tts(req.interviewId, q, "next" if created == 0 else "prefetch")
+
+                created += 1
+                yield sse_event("question", {"index": created, "question": q})
+
+            if not created:
+                yield sse_event("error", {"detail": "No questions generated"})
+                return
+
+            yield sse_event("done", {"questions_created": created, "interview_id": req.interviewId})
+
+        except Exception as e:
+            print("[ERROR] /manual-questions/stream crashed:", e)
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+
 class PDFQuestionRequest(BaseModel):
     userId: str
     interviewId: str
@@ -83,31 +164,40 @@ class PDFQuestionRequest(BaseModel):
 async def create_pdf_questions(req: PDFQuestionRequest = Body(...)):
     try:
         # 1. Fetch PDF chunks
-        chunks_res = supabase.table("pdf_chunks").select("*").eq("interview_id", req.interviewId).execute()
+        chunks_res = await aexecute(
+            "pdf_chunks.select_interview",
+            lambda db: db.table("pdf_chunks").select("*").eq("interview_id", req.interviewId),
+        )
         chunks_data = chunks_res.data if chunks_res.data else []
 
         if not chunks_data:
             raise HTTPException(status_code=404, detail="No PDF chunks found for this interview")
 
         # 2. Fetch structured data
-        struct_res = supabase.table("pdf_structured_data").select("*").eq("interview_id", req.interviewId).execute()
+        struct_res = await aexecute(
+            "pdf_structured_data.select_interview",
+            lambda db: db.table("pdf_structured_data").select("*").eq("interview_id", req.interviewId),
+        )
         struct_data = struct_res.data if struct_res.data else []
 
         if not struct_data:
             raise HTTPException(status_code=404, detail="No structured data found for this interview")
         
-        attempt_insert = supabase.table("interview_attempts").insert({
+        attempt_insert = await aexecute("interview_attempts.insert", lambda db: db.table("interview_attempts").insert({
             "user_id": req.userId,
             "interview_id": req.interviewId,
             "attempt_id": req.attemptId
-        }).execute()
+        }))
 
         if not attempt_insert.data:
                 raise HTTPException(status_code=500, detail="Failed to create attempt record")
         
 
         # 3. Generate questions from both chunks and structured data
-        questions = generate_questions_from_pdf(chunks_data, struct_data,req.userId, req.interviewId)
+        try:
+            questions = await generate_questions_from_pdf(chunks_data, struct_data,req.userId, req.interviewId)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Question generation timed out")
 
         if not questions:
             raise HTTPException(status_code=500, detail="No questions generated from PDF/structured data")
@@ -129,7 +219,7 @@ async def create_pdf_questions(req: PDFQuestionRequest = Body(...)):
 
         # 5. Insert into Supabase
         try:
-            res = supabase.table("questions").insert(records).execute()
+            res = await aexecute("questions.insert", lambda db: db.table("questions").insert(records))
             if res.data:
                 print("PDF insert successful:", res.data)
             else:
@@ -145,6 +235,8 @@ async def create_pdf_questions(req: PDFQuestionRequest = Body(...)):
             "questions": questions
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("[ERROR] /pdf-questions crashed:", e)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,90 @@
+# backend/run_worker.py
+"""
+Starts one RQ worker for a job kind with its model already loaded.
+
+    python run_worker.py tts|whisper|pdf|scoring|question
+
+RQ forks a work horse per job, so a model loaded here is shared
+copy-on-write by every job instead of being reloaded on first use.
+"""
+
+import os
+import sys
+import time
+import redis
+from rq import Worker
+from services.startup import record_timing, PROCESS_START
+from services.scheduler import worker_queue_names
+from services.metrics import start_metrics_server
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))  # 0 = no exporter
+
+
+def _preload_tts():
+    import kokoro_local
+    if kokoro_local.TTS_BACKEND == "onnx":
+        kokoro_local.get_onnx_model()
+    else:
+        kokoro_local.get_pipeline()
+
+
+def _preload_whisper():
+    from tasks.whisper_task import get_whisper_model
+    get_whisper_model()
+
+
+def _preload_pdf():
+    from services.pdf_parser import get_embed_model
+    get_embed_model()
+
+
+def _preload_scoring():
+    # Coverage pre-scoring and the fallback scorer embed with the same model
+    from services.pdf_parser import get_embed_model
+    from services.fallback_scorer import get_weights
+    get_embed_model()
+    get_weights()
+
+
+def _preload_question():
+    # Pool refills call the LLM and embed the new questions for dedup
+    import question_generation.generate_questions  # noqa: F401
+    from services.pdf_parser import get_embed_model
+    get_embed_model()
+
+
+PRELOADERS = {
+    "tts": _preload_tts,
+    "whisper": _preload_whisper,
+    "pdf": _preload_pdf,
+    "scoring": _preload_scoring,
+    "question": _preload_question,
+}
+
+
+def main(kind: str):
+    if kind not in PRELOADERS:
+        raise SystemExit(f"Unknown worker kind '{kind}', expected one of {list(PRELOADERS)}")
+
+    PRELOADERS[kind]()
+    record_timing(f"worker:{kind}:ready", time.perf_counter() - PROCESS_START)
+
+    if WORKER_METRICS_PORT:
+        try:
+            start_metrics_server(WORKER_METRICS_PORT)
+        except OSError as e:
+            # Several workers on one host share the port; one exporter is enough
+            print(f"[Metrics] Exporter not started on :{WORKER_METRICS_PORT}: {e}")
+
+    # The supervisor names its workers so it can tell idle ones from busy ones
+    worker = Worker(
+        worker_queue_names(kind),
+        name=os.getenv("RQ_WORKER_NAME") or None,
+        connection=redis.Redis.from_url(REDIS_URL),
+    )
+    worker.work()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "")
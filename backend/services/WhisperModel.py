@@ -1,3 +1,5 @@
+import time
+
 # from faster_whisper import WhisperModel
 # from supabase_client import WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE
 
@@ -13,11 +15,17 @@
 #     text = " ".join([segment.text for segment in segments]).strip()
 #     return text
 
-def transcribe_with_model(model, file_path: str) -> str:
+def transcribe_with_model(model, file_path: str, stats: dict = None) -> str:
     """
     Takes a loaded Whisper model and a file path.
     Returns transcription text.
+    Audio duration and decode time are written into `stats` when given.
     """
-    segments, _ = model.transcribe(file_path, beam_size=5)
+    start = time.perf_counter()
+    segments, info = model.transcribe(file_path, beam_size=5)
+    # Segments are decoded lazily, so the timing has to include the join
     text = " ".join([segment.text for segment in segments]).strip()
+    if stats is not None:
+        stats["audio_seconds"] = float(getattr(info, "duration", 0.0) or 0.0)
+        stats["transcribe_seconds"] = time.perf_counter() - start
     return text
\ No newline at end of file
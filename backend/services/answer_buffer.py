@@ -0,0 +1,324 @@
+# backend/services/answer_buffer.py
+"""
+Write-behind buffer for `answers` upserts.
+
+Every answer produces two tiny writes (has_audio from /answer, transcript
+from the Whisper worker). Instead of one PostgREST round trip each, writes
+are merged per (attempt_id, question_id) in Redis and flushed in bulk.
+Redis holds the buffer, so pending rows survive API/worker restarts.
+
+A group upsert that PostgREST rejects is retried row by row, so one bad row
+(FK or constraint violation) can't hold back everyone else's. A row that
+keeps being rejected is moved to DEAD_LETTER_HASH after
+ANSWER_FLUSH_MAX_ATTEMPTS. Connection errors, timeouts and 5xx answers say
+nothing about a row: the pass stops and its rows stay inflight, uncounted,
+until the database is back.
+
+Only the holder of FLUSH_LOCK touches inflight rows. The lock is extended
+before every upsert, and a flusher that lost it stops without cleaning up.
+"""
+
+import os
+import json
+import uuid
+import atexit
+import threading
+from collections import defaultdict
+import redis
+from postgrest.exceptions import APIError
+from services.db import execute
+from services.metrics import ANSWER_FLUSH_FAILURES
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+ANSWER_FLUSH_INTERVAL = float(os.getenv("ANSWER_FLUSH_INTERVAL", "0.5"))  # seconds
+ANSWER_FLUSH_BATCH = int(os.getenv("ANSWER_FLUSH_BATCH", "200"))
+ANSWER_FLUSH_MAX_ATTEMPTS = int(os.getenv("ANSWER_FLUSH_MAX_ATTEMPTS", "5"))  # per row, then dead-lettered
+FLUSH_LOCK_TTL = 30  # seconds; extended before every upsert
+
+# SQLSTATE classes PostgREST answers with a 5xx (connection, resources,
+# cancelled statements...); everything else is a 4xx about the row itself
+SERVER_ERROR_SQLSTATES = ("08", "09", "25", "2D", "38", "39", "3B", "40", "53", "55", "57", "58", "P0", "XX")
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+DIRTY_SET = "answers:wb:dirty"        # members with unflushed writes
+INFLIGHT_SET = "answers:wb:inflight"  # members moved out for a flush that hasn't confirmed yet
+FLUSH_LOCK = "answers:wb:lock"
+ATTEMPTS_HASH = "answers:wb:attempts"  # member -> failed flush attempts
+DEAD_LETTER_HASH = "answers:wb:dead"   # member -> row and last error, for rows that never wrote
+
+
+def _row_key(member: str) -> str:
+    return f"answers:wb:row:{member}"
+
+
+def _flushing_key(member: str) -> str:
+    return f"answers:wb:flushing:{member}"
+
+
+def _attempt_key(attempt_id: str) -> str:
+    return f"answers:wb:attempt:{attempt_id}"
+
+
+# Atomically merge each pending row into its flushing hash (newer fields win)
+# and mark it inflight, so writes arriving mid-flush land in a fresh row.
+_claim_script = redis_client.register_script("""
+for _, member in ipairs(ARGV) do
+    local row = 'answers:wb:row:' .. member
+    local data = redis.call('HGETALL', row)
+    if #data > 0 then
+        redis.call('HSET', 'answers:wb:flushing:' .. member, unpack(data))
+    end
+    redis.call('DEL', row)
+    redis.call('SREM', KEYS[1], member)
+    redis.call('SADD', KEYS[2], member)
+end
+return #ARGV
+""")
+
+
+# Compare-and-expire / compare-and-delete on the flush lock token
+_extend_lock_script = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+""")
+_release_lock_script = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+class _LockLost(Exception):
+    pass
+
+
+class _DatabaseUnavailable(Exception):
+    pass
+
+
+def buffer_answer_update(attempt_id: str, question_id: str, **fields):
+    """
+    Queues an `answers` upsert. Fields for the same (attempt_id, question_id)
+    are merged, so has_audio and transcript become a single row write.
+    """
+    member = f"{attempt_id}|{question_id}"
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hset(_row_key(member), mapping={k: json.dumps(v) for k, v in fields.items()})
+    pipe.sadd(DIRTY_SET, member)
+    pipe.sadd(_attempt_key(attempt_id), question_id)
+    pipe.expire(_attempt_key(attempt_id), 86400)
+    pipe.scard(DIRTY_SET)
+    dirty_count = pipe.execute()[-1]
+
+    start_flusher()
+    if dirty_count >= ANSWER_FLUSH_BATCH:
+        _flush_event.set()
+
+
+def pending_answer_fields(attempt_id: str) -> dict:
+    """
+    Unflushed answer fields for an attempt, keyed by question_id.
+    Readers overlay these on DB rows to get read-your-writes.
+    """
+    question_ids = list(redis_client.smembers(_attempt_key(attempt_id)))
+    if not question_ids:
+        return {}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for qid in question_ids:
+        member = f"{attempt_id}|{qid}"
+        pipe.hgetall(_flushing_key(member))
+        pipe.hgetall(_row_key(member))
+    raw = pipe.execute()
+
+    pending = {}
+    for i, qid in enumerate(question_ids):
+        merged = {**raw[2 * i], **raw[2 * i + 1]}
+        if merged:
+            pending[qid] = {k: json.loads(v) for k, v in merged.items()}
+    return pending
+
+
+def _rejected_by_postgrest(error: Exception) -> bool:
+    """True for a 4xx answer about the rows; False for outages, timeouts and 5xx."""
+    if not isinstance(error, APIError):
+        return False
+    code = error.code
+    if isinstance(code, int):  # non-JSON error body: the HTTP status
+        return 400 <= code < 500
+    code = str(code or "")
+    if code.startswith("PGRST"):
+        return not code.startswith("PGRST0")  # PGRST0xx: PostgREST can't reach the database
+    if code == "P0001":  # raise_exception
+        return True
+    return bool(code) and not code.startswith(SERVER_ERROR_SQLSTATES)
+
+
+def _hold_lock(token: str):
+    """Extends the flush lock if `token` still holds it, else raises _LockLost."""
+    if not _extend_lock_script(keys=[FLUSH_LOCK], args=[token, FLUSH_LOCK_TTL]):
+        raise _LockLost()
+
+
+def _upsert(rows: list, token: str):
+    """Writes rows while holding the flush lock; raises _LockLost / _DatabaseUnavailable to end the pass."""
+    _hold_lock(token)
+    try:
+        execute("answers.bulk_upsert", lambda db: db.table("answers").upsert(
+            rows,
+            on_conflict="attempt_id,question_id"
+        ))
+    except Exception as e:
+        if not _rejected_by_postgrest(e):
+            raise _DatabaseUnavailable(str(e)) from e
+        raise
+
+
+def _record_failures(failed: dict) -> list:
+    """
+    Counts one more failed attempt for each {member: (row, error)}.
+    Returns the members that reached ANSWER_FLUSH_MAX_ATTEMPTS and were dead-lettered.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for member in failed:
+        pipe.hincrby(ATTEMPTS_HASH, member, 1)
+    attempts = pipe.execute()
+
+    dead = []
+    for (member, (row, error)), count in zip(failed.items(), attempts):
+        ANSWER_FLUSH_FAILURES.inc(outcome="retry" if count < ANSWER_FLUSH_MAX_ATTEMPTS else "dead_letter")
+        if count >= ANSWER_FLUSH_MAX_ATTEMPTS:
+            redis_client.hset(DEAD_LETTER_HASH, member, json.dumps({"row": row, "error": error, "attempts": count}))
+            print(f"[AnswerBuffer] Dead-lettered answer {member} after {count} failed flushes: {error}")
+            dead.append(member)
+    return dead
+
+
+def flush_answers() -> int:
+    """Flushes up to ANSWER_FLUSH_BATCH buffered rows. Returns the number of rows written."""
+    token = str(uuid.uuid4())
+    if not redis_client.set(FLUSH_LOCK, token, nx=True, ex=FLUSH_LOCK_TTL):
+        return 0  # another process is flushing
+
+    try:
+        # Rows left inflight by an earlier failed or crashed flush count against the batch
+        room = ANSWER_FLUSH_BATCH - redis_client.scard(INFLIGHT_SET)
+        members = redis_client.srandmember(DIRTY_SET, room) if room > 0 else []
+        if members:
+            _claim_script(keys=[DIRTY_SET, INFLIGHT_SET], args=members)
+
+        inflight = redis_client.srandmember(INFLIGHT_SET, ANSWER_FLUSH_BATCH)
+        if not inflight:
+            return 0
+
+        pipe = redis_client.pipeline(transaction=False)
+        for member in inflight:
+            pipe.hgetall(_flushing_key(member))
+        rows_data = pipe.execute()
+
+        # PostgREST bulk upserts need identical keys on every object
+        groups = defaultdict(list)
+        done = []
+        for member, data in zip(inflight, rows_data):
+            if not data:
+                done.append(member)
+                continue
+            attempt_id, question_id = member.split("|", 1)
+            row = {"attempt_id": attempt_id, "question_id": question_id}
+            row.update({k: json.loads(v) for k, v in data.items()})
+            groups[tuple(sorted(row))].append((member, row))
+
+        written = 0
+        failed = {}
+        try:
+            try:
+                for entries in groups.values():
+                    try:
+                        _upsert([row for _, row in entries], token)
+                        done += [member for member, _ in entries]
+                        written += len(entries)
+                        continue
+                    except APIError as e:
+                        print(f"[AnswerBuffer] Bulk upsert of {len(entries)} rows rejected, retrying row by row: {e}")
+
+                    for member, row in entries:
+                        try:
+                            _upsert([row], token)
+                            done.append(member)
+                            written += 1
+                        except APIError as e:
+                            failed[member] = (row, str(e))
+            except _DatabaseUnavailable as e:
+                # Not the rows' fault: everything not yet written stays inflight, uncounted
+                print(f"[AnswerBuffer] Database unavailable, pausing flush: {e}")
+            _hold_lock(token)
+        except _LockLost:
+            # Another process owns the inflight rows now; cleaning up could drop its merges
+            print("[AnswerBuffer] Flush lock expired mid-flush, leaving cleanup to the next holder")
+            return written
+
+        if failed:
+            done += _record_failures(failed)
+
+        if done:
+            pipe = redis_client.pipeline(transaction=True)
+            for member in done:
+                pipe.delete(_flushing_key(member))
+            pipe.srem(INFLIGHT_SET, *done)
+            pipe.hdel(ATTEMPTS_HASH, *done)
+            pipe.execute()
+
+            # Cached snapshots relied on the overlay we just removed
+            from services.attempt_snapshot import invalidate_attempt_snapshot
+            invalidate_attempt_snapshot(*{m.split("|", 1)[0] for m in done})
+
+        if written:
+            print(f"[AnswerBuffer] Flushed {written} answer rows in {len(groups)} upserts")
+        return written
+
+    finally:
+        _release_lock_script(keys=[FLUSH_LOCK], args=[token])
+
+
+# -------------------------------
+# Background flusher (one daemon thread per process)
+# -------------------------------
+_flush_event = threading.Event()
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+
+
+def _flusher_loop():
+    while True:
+        _flush_event.wait(ANSWER_FLUSH_INTERVAL)
+        _flush_event.clear()
+        try:
+            while flush_answers() >= ANSWER_FLUSH_BATCH:
+                pass
+        except Exception as e:
+            # Rows stay in Redis and are retried on the next tick
+            print(f"[AnswerBuffer] Flush failed: {e}")
+
+
+def start_flusher():
+    global _flusher_thread
+    if _flusher_thread is not None:
+        return
+    with _flusher_lock:
+        if _flusher_thread is None:
+            _flusher_thread = threading.Thread(target=_flusher_loop, name="answer-flusher", daemon=True)
+            _flusher_thread.start()
+
+
+@atexit.register
+def _flush_on_exit():
+    if _flusher_thread is None:
+        return
+    try:
+        flush_answers()
+    except Exception as e:
+        print(f"[AnswerBuffer] Final flush failed, rows remain buffered in Redis: {e}")
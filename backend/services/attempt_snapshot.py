@@ -0,0 +1,68 @@
+# backend/services/attempt_snapshot.py
+
+import os
+import json
+from typing import List, Dict
+import redis
+from services.db import aexecute
+from services.answer_buffer import pending_answer_fields
+from services.coverage import normalize_key_points
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SNAPSHOT_TTL = int(os.getenv("ATTEMPT_SNAPSHOT_TTL", "15"))  # seconds; also bounds any invalidation race
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+SNAPSHOT_COLUMNS = "question_id, attempt_id, interview_id, question, ideal_answer, key_points, transcript, has_audio"
+
+
+def snapshot_key(attempt_id: str) -> str:
+    return f"snapshot:{attempt_id}"
+
+
+def invalidate_attempt_snapshot(*attempt_ids: str):
+    if attempt_ids:
+        redis_client.delete(*(snapshot_key(a) for a in attempt_ids))
+
+
+async def fetch_attempt_snapshot(attempt_id: str) -> List[Dict]:
+    """
+    Questions and answers of an attempt, already joined (sql/attempt_snapshot.sql).
+    Served from Redis until a transcript write invalidates it; unflushed
+    answer writes are overlaid on every read.
+    """
+    cached = redis_client.get(snapshot_key(attempt_id))
+    if cached:
+        rows = json.loads(cached)
+    else:
+        res = await aexecute("attempt_snapshot.select", lambda db: (
+            db.table("attempt_snapshot")
+            .select(SNAPSHOT_COLUMNS)
+            .eq("attempt_id", attempt_id)
+            .order("created_at", desc=False)
+        ))
+        rows = res.data or []
+        redis_client.setex(snapshot_key(attempt_id), SNAPSHOT_TTL, json.dumps(rows))
+
+    pending = pending_answer_fields(attempt_id)
+    for row in rows:
+        fields = pending.get(row["question_id"])
+        if fields:
+            row.update({k: v for k, v in fields.items() if k in ("transcript", "has_audio")})
+
+    return rows
+
+
+def snapshot_to_scoring_items(rows: List[Dict]) -> List[Dict]:
+    """Shape snapshot rows into the items the scoring pipeline works on."""
+    return [
+        {
+            "attempt_id": row["attempt_id"],
+            "question_id": row["question_id"],
+            "question_text": row["question"],
+            "ideal_answer": row.get("ideal_answer") or "",
+            "key_points": normalize_key_points(row.get("key_points")),
+            "user_transcript": row.get("transcript") or "",
+        }
+        for row in rows
+    ]
@@ -0,0 +1,206 @@
+# backend/services/coverage.py
+"""
+Key-point coverage pre-scoring.
+
+Before any answer goes to the LLM, one MiniLM batch embeds every transcript,
+its sentences, the questions, ideal answers and key points of the attempt.
+NumPy then computes, per answer, a key point x sentence similarity matrix;
+a key point counts as covered when some sentence is close enough to it.
+
+Transcripts are first triaged as text: empty and silence-only answers (what
+Whisper emits for a silent recording) get zero scores and are never embedded
+or sent to the LLM. Short answers are judged like any other, since a few
+words can be a complete, correct answer.
+
+The result is attached to each item as item["coverage"] and is used to:
+  - score trivial answers without the LLM (unanswered, near-verbatim ideal answer)
+  - give the LLM a compact coverage summary instead of long raw text
+  - feed the local fallback scorer (services/fallback_scorer.py)
+"""
+
+import os
+import re
+import json
+from typing import Dict, List, Optional
+import numpy as np
+
+KEYPOINT_MATCH_THRESHOLD = float(os.getenv("KEYPOINT_MATCH_THRESHOLD", "0.45"))
+VERBATIM_SIMILARITY = float(os.getenv("VERBATIM_SIMILARITY", "0.95"))
+VERBATIM_WORD_OVERLAP = 0.8
+PROMPT_MAX_WORDS = int(os.getenv("SCORING_PROMPT_MAX_WORDS", "150"))  # per transcript / ideal answer
+SENTENCE_WINDOW_WORDS = 18
+
+CATEGORIES = ["clarity", "relevance", "depth", "structure"]
+CATEGORY_MAX = 25
+
+_sentence_re = re.compile(r"(?<=[.!?])\s+")
+_word_re = re.compile(r"[a-z0-9']+")
+_tag_re = re.compile(r"\[[^\]]*\]|\([^)]*\)")  # [BLANK_AUDIO], (music), ...
+
+# What Whisper tends to produce for silence or room noise, plus fillers
+SILENCE_PHRASES = [
+    "thanks for watching", "thank you for watching", "please subscribe", "subtitles by the amara org community",
+    "thank you", "thanks", "bye", "you",
+]
+FILLER_WORDS = {"um", "uh", "erm", "hmm", "mm", "ah", "oh", "okay", "ok", "so", "yeah", "well", "like"}
+
+# Fixed scores for answers there is nothing to judge in
+UNANSWERED_SCORES = {"clarity": 0, "relevance": 0, "depth": 0, "structure": 0}
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = [s.strip() for s in _sentence_re.split(text.strip()) if s.strip()]
+    if len(sentences) == 1 and len(text.split()) > 2 * SENTENCE_WINDOW_WORDS:
+        # Unpunctuated transcript: fall back to fixed-size word windows
+        words = text.split()
+        sentences = [" ".join(words[i:i + SENTENCE_WINDOW_WORDS]) for i in range(0, len(words), SENTENCE_WINDOW_WORDS)]
+    return sentences
+
+
+def normalize_key_points(value) -> List[str]:
+    """key_points arrive as a list, a JSON string or (old rows) nothing."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            value = [value]
+    return [str(k).strip() for k in (value or []) if str(k).strip()]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _word_overlap(a: str, b: str) -> float:
+    wa, wb = set(_word_re.findall(a.lower())), set(_word_re.findall(b.lower()))
+    return len(wa & wb) / len(wa | wb) if wa and wb else 0.0
+
+
+# -------------------------------
+# Coverage
+# -------------------------------
+def compute_coverage(items: List[Dict]) -> List[Dict]:
+    """Coverage of every item, with all texts embedded in a single batch."""
+    from services.pdf_parser import encode_texts
+
+    texts, index = [], {}
+
+    def ref(text: str) -> int:
+        if text not in index:
+            index[text] = len(texts)
+            texts.append(text)
+        return index[text]
+
+    plans = []
+    for item in items:
+        # Skipped / silent answers are never embedded
+        answered = classify_transcript(item.get("user_transcript")) is None
+        transcript = item["user_transcript"].strip() if answered else ""
+        key_points = normalize_key_points(item.get("key_points"))
+        plans.append({
+            "transcript": ref(transcript) if answered else None,
+            "ideal": ref(item.get("ideal_answer") or item.get("question_text") or "") if answered else None,
+            "question": ref(item.get("question_text") or "") if answered else None,
+            "sentences": [ref(s) for s in split_sentences(transcript)] if answered else [],
+            "key_points": key_points,
+            "key_point_refs": [ref(k) for k in key_points] if answered else [],
+        })
+
+    vectors = _unit(np.asarray(encode_texts(texts), dtype=np.float32)) if texts else None
+
+    results = []
+    for item, plan in zip(items, plans):
+        coverage = {
+            "sim_ideal": 0.0,
+            "sim_question": 0.0,
+            "ratio": None,  # None when the question has no stored key points
+            "mean_similarity": None,
+            "key_points": [{"point": k, "similarity": 0.0, "covered": False} for k in plan["key_points"]],
+        }
+        if plan["transcript"] is not None:
+            answer = vectors[plan["transcript"]]
+            coverage["sim_ideal"] = round(max(float(answer @ vectors[plan["ideal"]]), 0.0), 3)
+            coverage["sim_question"] = round(max(float(answer @ vectors[plan["question"]]), 0.0), 3)
+            if plan["key_point_refs"]:
+                # key points x sentences; each key point's best-matching sentence
+                best = (vectors[plan["key_point_refs"]] @ vectors[plan["sentences"]].T).max(axis=1)
+                best = np.clip(best, 0, 1)
+                for entry, sim in zip(coverage["key_points"], best):
+                    entry["similarity"] = round(float(sim), 3)
+                    entry["covered"] = bool(sim >= KEYPOINT_MATCH_THRESHOLD)
+                coverage["ratio"] = round(float((best >= KEYPOINT_MATCH_THRESHOLD).mean()), 3)
+                coverage["mean_similarity"] = round(float(best.mean()), 3)
+        elif plan["key_points"]:
+            coverage["ratio"] = coverage["mean_similarity"] = 0.0
+        coverage["deterministic"] = triage(item, coverage)
+        results.append(coverage)
+    return results
+
+
+def attach_coverage(items: List[Dict]) -> List[Dict]:
+    """Sets item["coverage"] on every item that doesn't have it yet."""
+    missing = [item for item in items if "coverage" not in item]
+    for item, coverage in zip(missing, compute_coverage(missing) if missing else []):
+        item["coverage"] = coverage
+    return items
+
+
+# -------------------------------
+# Trivial cases
+# -------------------------------
+def classify_transcript(transcript: str) -> Optional[str]:
+    """"empty" or "silence" for answers with nothing to score, else None."""
+    text = _tag_re.sub(" ", (transcript or "").lower()).strip()
+    if not text:
+        return "empty" if not (transcript or "").strip() else "silence"
+    leftover = " ".join(w for w in _word_re.findall(text) if w not in FILLER_WORDS)
+    for phrase in SILENCE_PHRASES:
+        leftover = re.sub(rf"\b{phrase}\b", " ", leftover)
+    # Silence only when nothing but hallucinated phrases and fillers is left
+    return None if leftover.strip() else "silence"
+
+
+def _scores(per_category: Dict) -> Dict:
+    scores = dict(per_category)
+    scores["final_score"] = sum(scores[c] for c in CATEGORIES)
+    return scores
+
+
+def triage(item: Dict, coverage: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    {"reason", "scores"} for answers that need no judgement, or None.
+    The near-verbatim check needs the item's coverage; the rest is text only.
+    """
+    status = classify_transcript(item.get("user_transcript"))
+    if status:
+        return {"reason": status, "scores": _scores(UNANSWERED_SCORES)}
+
+    transcript = item["user_transcript"].strip()
+    ideal = (item.get("ideal_answer") or "").strip()
+    if (coverage and ideal and coverage["sim_ideal"] >= VERBATIM_SIMILARITY
+            and _word_overlap(transcript, ideal) >= VERBATIM_WORD_OVERLAP):
+        return {"reason": "matches_ideal", "scores": _scores(dict.fromkeys(CATEGORIES, CATEGORY_MAX))}
+    return None
+
+
+# -------------------------------
+# Prompt summary
+# -------------------------------
+def compact_text(text: str, max_words: int = PROMPT_MAX_WORDS) -> str:
+    words = (text or "").split()
+    if len(words) <= max_words:
+        return " ".join(words)
+    return " ".join(words[:max_words]) + f" … [{len(words) - max_words} more words]"
+
+
+def coverage_summary(coverage: Dict) -> str:
+    """A few lines the scoring prompt can use in place of long raw text."""
+    lines = [f"Similarity to ideal answer: {coverage['sim_ideal']:.2f}"]
+    if coverage["key_points"]:
+        covered = [k for k in coverage["key_points"] if k["covered"]]
+        missed = [k for k in coverage["key_points"] if not k["covered"]]
+        lines.append(f"Key points covered: {len(covered)}/{len(coverage['key_points'])}")
+        lines += [f"+ {k['point']} ({k['similarity']:.2f})" for k in covered]
+        lines += [f"- {k['point']} ({k['similarity']:.2f})" for k in missed]
+    return "\n".join(lines)
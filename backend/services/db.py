@@ -0,0 +1,59 @@
+# backend/services/db.py
+
+import os
+import time
+import asyncio
+import weakref
+from typing import Callable
+from supabase_client import supabase, create_async_supabase
+from services.latency import LatencyRecorder
+from services.tracing import span
+
+# Per-call deadline for async queries (the HTTP client timeout still applies underneath)
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+
+db_latency = LatencyRecorder()
+
+# One async client (and therefore one pooled HTTP connection set) per event loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+async def get_async_supabase():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = await create_async_supabase()
+        client = _async_clients.setdefault(loop, client)
+    return client
+
+
+async def aexecute(op: str, build: Callable, timeout: float = DB_TIMEOUT):
+    """
+    Runs a PostgREST query on the async client without blocking the event loop.
+
+    `build` receives the client and returns the query builder, e.g.
+        await aexecute("answers.select", lambda db: db.table("answers").select("*").eq("attempt_id", a))
+    """
+    client = await get_async_supabase()
+    start = time.perf_counter()
+    ok = False
+    try:
+        with span(f"db.{op}"):
+            res = await asyncio.wait_for(build(client).execute(), timeout)
+        ok = True
+        return res
+    finally:
+        db_latency.record(op, time.perf_counter() - start, ok)
+
+
+def execute(op: str, build: Callable):
+    """Sync counterpart of aexecute for RQ workers; shares the latency metrics."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        with span(f"db.{op}"):
+            res = build(supabase).execute()
+        ok = True
+        return res
+    finally:
+        db_latency.record(op, time.perf_counter() - start, ok)
@@ -0,0 +1,79 @@
+# backend/services/embedding_cache.py
+
+import os
+import hashlib
+from typing import List, Optional
+import numpy as np
+import redis
+
+# -------------------------------
+# EMBEDDING CACHE CONFIG
+# -------------------------------
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+EMBED_CACHE_TTL = int(os.getenv("EMBED_CACHE_TTL", str(7 * 86400)))  # 7 days
+EMBED_CACHE_DTYPE = np.dtype(os.getenv("EMBED_CACHE_DTYPE", "float16"))
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"  # benchmarks turn it off
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "all-MiniLM-L6-v2")
+# Off: the API never loads torch/the model; request-path embedding lookups
+# are served from vectors the workers stored (see request_embeddings)
+API_INLINE_EMBEDDINGS = os.getenv("API_INLINE_EMBEDDINGS", "0") == "1"
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=False)
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"emb:{model_name}:{digest}"
+
+
+def get_cached_embeddings(model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+    """
+    Looks up embeddings for all texts in one round trip.
+    Returns a list aligned with `texts`, None where the cache missed.
+    """
+    if not texts:
+        return []
+    if not EMBED_CACHE_ENABLED:
+        return [None] * len(texts)
+
+    keys = [embedding_key(model_name, t) for t in texts]
+    try:
+        raw_values = redis_client.mget(keys)
+    except redis.RedisError as e:
+        print(f"[EmbedCache] Lookup failed, treating as miss: {e}")
+        return [None] * len(texts)
+
+    return [
+        np.frombuffer(raw, dtype=EMBED_CACHE_DTYPE).astype(np.float32) if raw else None
+        for raw in raw_values
+    ]
+
+
+def cache_embeddings(model_name: str, texts: List[str], embeddings: np.ndarray):
+    """Stores embeddings as compact EMBED_CACHE_DTYPE byte strings."""
+    if not texts or not EMBED_CACHE_ENABLED:
+        return
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for text, vector in zip(texts, embeddings):
+            pipe.setex(
+                embedding_key(model_name, text),
+                EMBED_CACHE_TTL,
+                np.asarray(vector, dtype=EMBED_CACHE_DTYPE).tobytes(),
+            )
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[EmbedCache] Store failed: {e}")
+
+
+def request_embeddings(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """
+    Embeddings for code running in the API process, aligned with `texts`.
+    Misses are encoded in-process only when API_INLINE_EMBEDDINGS is on,
+    otherwise they stay None and the caller falls back.
+    """
+    if API_INLINE_EMBEDDINGS:
+        from services.pdf_parser import encode_texts
+        return list(encode_texts(texts)) if texts else []
+    return get_cached_embeddings(EMBED_MODEL_NAME, texts)
@@ -0,0 +1,282 @@
+# backend/services/fallback_scorer.py
+"""
+CPU-local scorer used when the LLM is too slow or unavailable.
+
+Clarity / relevance / depth / structure (0-25 each) are linear functions of
+a few features per answer:
+
+    sim_ideal, sim_question     MiniLM cosine similarity of the transcript to
+                                the ideal answer and to the question
+    keypoint_coverage           share of the question's key_points matched by
+    keypoint_mean_sim           some transcript sentence, and the mean best match
+    length, sentences, connectives, filler_ratio, sentence_shape
+                                simple structural features of the transcript
+
+The similarity and coverage features come from services/coverage.py, which
+the scoring pipeline has usually computed already for the whole attempt.
+
+The weights start hand-set and are calibrated against real LLM scores:
+every LLM-scored answer is kept in a capped Redis list, and
+
+    python -m services.fallback_scorer export --out scoring_samples.jsonl
+    python -m services.fallback_scorer calibrate [--dataset scoring_samples.jsonl]
+
+fits them by ridge regression into FALLBACK_CALIBRATION_PATH.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List
+import numpy as np
+import redis
+from services.startup import lazy_resource
+from services.coverage import (
+    CATEGORIES, CATEGORY_MAX, attach_coverage, classify_transcript, normalize_key_points, split_sentences,
+)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+FALLBACK_CALIBRATION_PATH = os.getenv("FALLBACK_CALIBRATION_PATH", "models/fallback_scorer.json")
+CALIBRATION_SAMPLES_KEY = "scoring:calibration_samples"
+CALIBRATION_MAX_SAMPLES = int(os.getenv("FALLBACK_CALIBRATION_MAX_SAMPLES", "5000"))
+
+FEATURES = [
+    "bias", "sim_ideal", "sim_question", "keypoint_coverage", "keypoint_mean_sim",
+    "length", "sentences", "connectives", "filler_ratio", "sentence_shape",
+]
+
+# Uncalibrated starting point; features not listed weigh 0
+DEFAULT_WEIGHTS = {
+    "clarity": {"bias": 3, "sim_ideal": 8, "length": 4, "sentence_shape": 6, "filler_ratio": -10},
+    "relevance": {"bias": 0, "sim_ideal": 14, "sim_question": 10},
+    "depth": {"bias": 0, "sim_ideal": 4, "keypoint_coverage": 10, "keypoint_mean_sim": 4, "length": 8},
+    "structure": {"bias": 3, "length": 3, "sentences": 6, "connectives": 8, "sentence_shape": 5},
+}
+
+LENGTH_TARGET_WORDS = 120
+SENTENCE_TARGET = 5
+CONNECTIVE_TARGET = 4
+IDEAL_SENTENCE_WORDS = 18
+
+CONNECTIVES = [
+    "first", "second", "third", "then", "next", "finally", "because", "therefore", "so that",
+    "for example", "for instance", "however", "on the other hand", "as a result", "which means",
+    "in summary", "overall", "in contrast",
+]
+FILLERS = ["um", "uh", "erm", "hmm", "like", "you know", "i mean", "kind of", "sort of", "basically"]
+
+_connective_re = re.compile(r"\b(" + "|".join(re.escape(c) for c in CONNECTIVES) + r")\b")
+_filler_re = re.compile(r"\b(" + "|".join(re.escape(f) for f in FILLERS) + r")\b")
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+
+# -------------------------------
+# Features
+# -------------------------------
+def structural_features(transcript: str) -> Dict[str, float]:
+    lowered = transcript.lower()
+    words = lowered.split()
+    sentences = split_sentences(transcript)
+    avg_words = len(words) / len(sentences) if sentences else 0.0
+    return {
+        "length": min(len(words) / LENGTH_TARGET_WORDS, 1.0),
+        "sentences": min(len(sentences) / SENTENCE_TARGET, 1.0),
+        "connectives": min(len(_connective_re.findall(lowered)) / CONNECTIVE_TARGET, 1.0),
+        "filler_ratio": len(_filler_re.findall(lowered)) / len(words) if words else 0.0,
+        "sentence_shape": max(0.0, 1 - abs(avg_words - IDEAL_SENTENCE_WORDS) / IDEAL_SENTENCE_WORDS) if words else 0.0,
+    }
+
+
+def feature_matrix(items: List[Dict]) -> np.ndarray:
+    """One row of FEATURES per scoring item; coverage is computed for items that lack it."""
+    attach_coverage(items)
+    rows = []
+    for item in items:
+        coverage = item["coverage"]
+        row = dict.fromkeys(FEATURES, 0.0)
+        row["bias"] = 1.0
+        if classify_transcript(item.get("user_transcript")) is None:
+            row["sim_ideal"] = coverage["sim_ideal"]
+            row["sim_question"] = coverage["sim_question"]
+            if coverage["ratio"] is not None:
+                row["keypoint_coverage"] = coverage["ratio"]
+                row["keypoint_mean_sim"] = coverage["mean_similarity"]
+            else:
+                # No key points stored for this question: lean on the ideal answer instead
+                row["keypoint_coverage"] = float(np.clip((coverage["sim_ideal"] - 0.3) / 0.4, 0, 1))
+                row["keypoint_mean_sim"] = coverage["sim_ideal"]
+            row.update(structural_features(item["user_transcript"]))
+        rows.append([row[f] for f in FEATURES])
+    return np.asarray(rows, dtype=np.float64).reshape(len(items), len(FEATURES))
+
+
+# -------------------------------
+# Scoring
+# -------------------------------
+def _weights_from(spec: Dict[str, Dict[str, float]]) -> np.ndarray:
+    return np.asarray([[spec[c].get(f, 0.0) for f in FEATURES] for c in CATEGORIES], dtype=np.float64)
+
+
+@lazy_resource("fallback:calibration")
+def get_weights() -> np.ndarray:
+    """(categories x features) weights: calibrated if a fit exists, else the defaults."""
+    try:
+        with open(FALLBACK_CALIBRATION_PATH, encoding="utf-8") as f:
+            calibration = json.load(f)
+        print(f"[Fallback] Using calibration fitted on {calibration.get('samples')} samples")
+        return _weights_from(calibration["weights"])
+    except (OSError, KeyError, json.JSONDecodeError):
+        return _weights_from(DEFAULT_WEIGHTS)
+
+
+def score_items(items: List[Dict]) -> List[Dict]:
+    """Category scores shaped like the LLM's (integers, final_score = sum)."""
+    if not items:
+        return []
+    raw = feature_matrix(items) @ get_weights().T
+    scores = np.clip(np.rint(raw), 0, CATEGORY_MAX).astype(int)
+
+    results = []
+    for item, row in zip(items, scores):
+        decided = item["coverage"]["deterministic"]
+        if decided:
+            # Unanswered / verbatim answers get the same fixed scores as the main pipeline
+            results.append(dict(decided["scores"]))
+            continue
+        result = {c: int(v) for c, v in zip(CATEGORIES, row)}
+        result["final_score"] = sum(result[c] for c in CATEGORIES)
+        results.append(result)
+    return results
+
+
+def fallback_feedback(overall_score: float, scored_items: List[Dict]) -> str:
+    """Plain feedback assembled from the scores when the LLM can't write it."""
+    totals = {c: sum(i["category_scores"][c] for i in scored_items) for c in CATEGORIES}
+    strongest = max(CATEGORIES, key=totals.get) if scored_items else "clarity"
+    weakest = min(CATEGORIES, key=totals.get) if scored_items else "depth"
+    low = [i["question_text"] for i in scored_items if i["category_scores"]["final_score"] < 40][:3]
+
+    unanswered = sum(1 for i in scored_items if i.get("answer_status", "answered") != "answered")
+
+    summary = (f"Your overall score was {overall_score} out of 100. Your strongest area was {strongest} "
+               f"and the area with the most room to grow was {weakest}.")
+    if unanswered:
+        summary += f" {unanswered} of {len(scored_items)} questions were skipped or had no usable answer."
+    lines = [
+        "SECTION 1 — Summary",
+        summary,
+        "",
+        "SECTION 2 — Detailed Analysis",
+    ]
+    for c in CATEGORIES:
+        lines.append(f"{c.capitalize()}: {totals[c]} points across {len(scored_items)} questions")
+    lines += ["", "SECTION 3 — Improvement Plan"]
+    lines.append(f"1. Practise answers that focus on {weakest}, using the ideal answers as a reference.")
+    if low:
+        lines.append("2. Revisit these questions: " + "; ".join(low))
+    else:
+        lines.append("2. Keep covering every key point the question asks about.")
+    lines.append("3. Structure answers as context, approach and result, with a concrete example.")
+    return "\n".join(lines)
+
+
+# -------------------------------
+# Calibration data
+# -------------------------------
+def record_llm_sample(item: Dict, category_scores: Dict):
+    """Keeps an LLM-scored answer for calibration (newest CALIBRATION_MAX_SAMPLES)."""
+    sample = {
+        "question_text": item.get("question_text"),
+        "ideal_answer": item.get("ideal_answer"),
+        "key_points": normalize_key_points(item.get("key_points")),
+        "user_transcript": item.get("user_transcript"),
+        "scores": {c: category_scores[c] for c in CATEGORIES},
+    }
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.lpush(CALIBRATION_SAMPLES_KEY, json.dumps(sample))
+        pipe.ltrim(CALIBRATION_SAMPLES_KEY, 0, CALIBRATION_MAX_SAMPLES - 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[Fallback] Could not store calibration sample: {e}")
+
+
+def load_samples(dataset: str = None) -> List[Dict]:
+    if dataset:
+        with open(dataset, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return [json.loads(s) for s in redis_client.lrange(CALIBRATION_SAMPLES_KEY, 0, -1)]
+
+
+def calibrate(samples: List[Dict], ridge: float = 1.0, holdout: float = 0.2, seed: int = 0) -> Dict:
+    """Ridge fit of each category on FEATURES; reports held-out MAE against the defaults."""
+    samples = [s for s in samples if classify_transcript(s.get("user_transcript")) is None]
+    if len(samples) < 20:
+        raise ValueError(f"Need at least 20 answered samples to calibrate, got {len(samples)}")
+
+    X = feature_matrix(samples)
+    Y = np.asarray([[s["scores"][c] for c in CATEGORIES] for s in samples], dtype=np.float64)
+
+    order = np.random.default_rng(seed).permutation(len(samples))
+    n_test = max(1, int(len(samples) * holdout))
+    test, train = order[:n_test], order[n_test:]
+
+    def fit(rows):
+        penalty = ridge * np.eye(len(FEATURES))
+        penalty[0, 0] = 0  # don't shrink the bias
+        return np.linalg.solve(X[rows].T @ X[rows] + penalty, X[rows].T @ Y[rows])
+
+    def mae(weights, rows):
+        predicted = np.clip(X[rows] @ weights, 0, CATEGORY_MAX)
+        return {c: round(float(v), 2) for c, v in zip(CATEGORIES, np.abs(predicted - Y[rows]).mean(axis=0))}
+
+    held_out = fit(train)
+    weights = fit(np.arange(len(samples)))  # final fit uses everything
+    return {
+        "samples": len(samples),
+        "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "features": FEATURES,
+        "weights": {c: dict(zip(FEATURES, map(float, weights[:, i]))) for i, c in enumerate(CATEGORIES)},
+        "holdout_mae": mae(held_out, test),
+        "default_holdout_mae": mae(_weights_from(DEFAULT_WEIGHTS).T, test),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fallback scorer calibration")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="dump the stored LLM-scored samples as JSON lines")
+    export.add_argument("--out", required=True)
+    fit = sub.add_parser("calibrate", help="fit weights against LLM scores")
+    fit.add_argument("--dataset", help="JSON lines from `export` (default: the Redis sample list)")
+    fit.add_argument("--out", default=FALLBACK_CALIBRATION_PATH)
+    fit.add_argument("--ridge", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        samples = load_samples()
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(s) + "\n" for s in samples)
+        print(f"[Fallback] Exported {len(samples)} samples to {args.out}")
+        return
+
+    try:
+        calibration = calibrate(load_samples(args.dataset), ridge=args.ridge)
+    except ValueError as e:
+        print(f"[Fallback] {e}")
+        sys.exit(1)
+    directory = os.path.dirname(args.out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    print(f"[Fallback] Held-out MAE {calibration['holdout_mae']} (defaults: {calibration['default_holdout_mae']})")
+    print(f"[Fallback] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
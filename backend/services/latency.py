@@ -0,0 +1,45 @@
+# backend/services/latency.py
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+class LatencyRecorder:
+    """Keeps the last `window` latencies per operation plus call/error counts."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._calls = defaultdict(int)
+        self._errors = defaultdict(int)
+
+    def record(self, name: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self._samples[name].append(seconds)
+            self._calls[name] += 1
+            if not ok:
+                self._errors[name] += 1
+
+    def summary(self, percentiles: Iterable[float] = (50, 95, 99)) -> Dict[str, dict]:
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._samples.items()}
+            calls = dict(self._calls)
+            errors = dict(self._errors)
+
+        result = {}
+        for name, values in snapshot.items():
+            stats = {"calls": calls.get(name, 0), "errors": errors.get(name, 0)}
+            for pct in percentiles:
+                stats[f"p{pct:g}_ms"] = round(percentile(values, pct) * 1000, 1)
+            stats["max_ms"] = round(values[-1] * 1000, 1) if values else 0.0
+            result[name] = stats
+        return result
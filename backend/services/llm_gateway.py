@@ -0,0 +1,557 @@
+# backend/services/llm_gateway.py
+"""
+One shared path to Groq's OpenAI-compatible chat completions API.
+
+    text = await chat(prompt, model=..., client="scoring", deadline=20, hedge=True)
+    async for piece in stream_chat(prompt, model=..., client="interviewer_stream"):
+        ...
+    text = chat_sync(prompt, model=..., client="chunk_metadata")   # sync callers
+
+Every call goes through, in order:
+  - a circuit breaker per model (fails fast with LLMUnavailable while open),
+  - request and token buckets per model, kept in step with Groq's
+    x-ratelimit-* headers and paused on 429 Retry-After,
+  - a pooled HTTP/2 client with an overall per-call deadline,
+  - jittered exponential backoff on 429/5xx/transport errors,
+  - optionally a hedged second request when the first is slower than the
+    recent p90 for that client (non-streaming calls only).
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import weakref
+from typing import AsyncIterator
+import httpx
+from llm_clients import GROQ_BASE_URL
+from services.latency import LatencyRecorder
+from services.tracing import span
+from services.metrics import (
+    LLM_LATENCY, LLM_TOKENS, LLM_RETRIES, LLM_HEDGES, LLM_CIRCUIT_OPENED, register_collector,
+)
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+CHAT_URL = f"{GROQ_BASE_URL}/openai/v1/chat/completions"
+
+LLM_DEFAULT_DEADLINE = float(os.getenv("LLM_DEFAULT_DEADLINE", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+# Per-model rate limits (Groq enforces requests and tokens per minute)
+LLM_RPM = float(os.getenv("LLM_RPM", "300"))
+LLM_TPM = float(os.getenv("LLM_TPM", "60000"))
+
+# Hedging: fire a duplicate once the first attempt is slower than the recent p90
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "2000"))
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "300"))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+# Circuit breaker per model
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """An LLM call failed after retries; `status` is the last HTTP status (if any)."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMUnavailable(LLMError):
+    """The circuit breaker for this model is open; the call was not attempted."""
+
+
+class LLMTimeout(LLMError, TimeoutError):
+    """The call's deadline passed (also an asyncio.TimeoutError for existing handlers)."""
+
+
+# -------------------------------
+# Token buckets
+# -------------------------------
+class TokenBucket:
+    """Refills `rate_per_minute` over a minute; callers wait (up to their deadline) for capacity."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available; takes it and returns 0 when it already is."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def sync(self, remaining: float, reset_seconds: float = None):
+        """Caps local tokens at what the server says is left (shared across all our processes)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_seconds:
+                self.paused_until = max(self.paused_until, time.monotonic() + reset_seconds)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# -------------------------------
+# Circuit breaker
+# -------------------------------
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open probe after the cooldown."""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def release(self):
+        """Ends a half-open probe whose outcome said nothing about upstream health."""
+        with self._lock:
+            self.probing = False
+
+    def record(self, ok: bool, model: str):
+        with self._lock:
+            self.probing = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold and (self.opened_at is None or self.state == "half_open"):
+                self.opened_at = time.monotonic()
+                LLM_CIRCUIT_OPENED.inc(model=model)
+                print(f"[LLM] Circuit opened for {model} after {self.failures} consecutive failures")
+
+
+_buckets: dict = {}
+_breakers: dict = {}
+_registry_lock = threading.Lock()
+latency = LatencyRecorder(window=200)
+
+
+def _limits(model: str):
+    with _registry_lock:
+        if model not in _buckets:
+            _buckets[model] = (TokenBucket(LLM_RPM), TokenBucket(LLM_TPM))
+            _breakers[model] = CircuitBreaker()
+        return _buckets[model], _breakers[model]
+
+
+def breaker_state(model: str) -> str:
+    return _limits(model)[1].state
+
+
+def _pause_requests(model: str, seconds: float):
+    (requests_bucket, _), _ = _limits(model)
+    requests_bucket.pause(seconds)
+
+
+@register_collector
+def _breaker_samples():
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return [("llm_circuit_state", "0 closed, 1 half-open, 2 open", {"model": m}, states[b.state]) for m, b in breakers.items()]
+
+
+# -------------------------------
+# HTTP client (one pool per event loop)
+# -------------------------------
+_clients = weakref.WeakKeyDictionary()
+
+
+def _http2_available() -> bool:
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("[LLM] h2 not installed, using HTTP/1.1")
+        return False
+
+
+def _client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose_client():
+    """
+    Closes the running loop's client. Jobs that wrap their work in
+    asyncio.run() call this before the loop ends, or its pool leaks.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _payload(prompt, model: str, max_tokens: int, temperature: float, stream: bool = False) -> dict:
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+    payload = {"model": model, "messages": messages, "temperature": temperature, "stream": stream}
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    return payload
+
+
+def _estimate_tokens(payload: dict) -> int:
+    chars = sum(len(m.get("content") or "") for m in payload["messages"])
+    return chars // 4 + (payload.get("max_tokens") or 512)
+
+
+def _retry_after(response: httpx.Response) -> float:
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _reset_seconds(value: str) -> float:
+    """Parses Groq's reset durations like '2m59.56s', '7.66s' or '120ms'."""
+    if not value:
+        return 0.0
+    total, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif value.startswith("ms", i):
+            total += float(number or 0) / 1000
+            number = ""
+            i += 1
+        else:
+            total += float(number or 0) * {"h": 3600, "m": 60, "s": 1}.get(ch, 0)
+            number = ""
+        i += 1
+    return total
+
+
+def _sync_rate_limits(model: str, response: httpx.Response):
+    (requests_bucket, tokens_bucket), _ = _limits(model)
+    headers = response.headers
+    try:
+        if "x-ratelimit-remaining-requests" in headers:
+            requests_bucket.sync(float(headers["x-ratelimit-remaining-requests"]),
+                                 _reset_seconds(headers.get("x-ratelimit-reset-requests")))
+        if "x-ratelimit-remaining-tokens" in headers:
+            tokens_bucket.sync(float(headers["x-ratelimit-remaining-tokens"]),
+                               _reset_seconds(headers.get("x-ratelimit-reset-tokens")))
+    except ValueError:
+        pass
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+async def _admit(model: str, payload: dict, deadline_at: float):
+    """Waits for request and token capacity, or raises LLMTimeout if it won't come in time."""
+    (requests_bucket, tokens_bucket), _ = _limits(model)
+    needed = _estimate_tokens(payload)
+    for bucket, amount in ((requests_bucket, 1), (tokens_bucket, needed)):
+        while True:
+            wait = bucket.wait_time(amount)
+            if wait == 0:
+                break
+            if time.monotonic() + wait > deadline_at:
+                raise LLMTimeout(f"Rate limit for {model} would exceed the call deadline")
+            await asyncio.sleep(min(wait, 1.0))
+
+
+async def _post_once(payload: dict, deadline_at: float) -> httpx.Response:
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise LLMTimeout("LLM call deadline exceeded")
+    timeout = httpx.Timeout(remaining, connect=min(LLM_CONNECT_TIMEOUT, remaining))
+    try:
+        return await asyncio.wait_for(_client().post(CHAT_URL, json=payload, timeout=timeout), remaining)
+    except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+        raise LLMTimeout(f"LLM call deadline exceeded: {e!r}") from None
+
+
+async def _hedged_post(payload: dict, deadline_at: float, client: str) -> httpx.Response:
+    """Sends the request, and a duplicate if the first is slower than this client's recent p90."""
+    stats = latency.summary(percentiles=(90,)).get(client)
+    if stats and stats["calls"] >= LLM_HEDGE_MIN_SAMPLES:
+        hedge_after = max(LLM_HEDGE_MIN_MS, stats["p90_ms"]) / 1000
+    else:
+        hedge_after = LLM_HEDGE_DEFAULT_MS / 1000
+
+    first = asyncio.ensure_future(_post_once(payload, deadline_at))
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    (requests_bucket, tokens_bucket), _ = _limits(payload["model"])
+    if requests_bucket.wait_time(1) or tokens_bucket.wait_time(_estimate_tokens(payload)):
+        return await first  # no spare capacity for a duplicate
+
+    LLM_HEDGES.inc(client=client)
+    second = asyncio.ensure_future(_post_once(payload, deadline_at))
+    pending = {first, second}
+    result, error = None, None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None and task.result().status_code < 500:
+                result = task.result()
+                break
+            error = error or task
+        if result is not None:
+            break
+    for task in pending:
+        task.cancel()
+    if result is not None:
+        return result
+    return error.result()  # re-raises the first failure
+
+
+def _record_usage(client: str, data: dict):
+    usage = data.get("usage") or {}
+    LLM_TOKENS.inc(usage.get("prompt_tokens", 0), client=client, direction="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens", 0), client=client, direction="completion")
+
+
+# -------------------------------
+# Public API
+# -------------------------------
+async def chat(prompt, model: str, client: str, max_tokens: int = None, temperature: float = 0,
+               deadline: float = LLM_DEFAULT_DEADLINE, hedge: bool = False) -> str:
+    """
+    Returns the completion text. `prompt` is a string or an OpenAI messages list.
+    Raises LLMUnavailable (breaker open), LLMTimeout (deadline) or LLMError.
+    """
+    payload = _payload(prompt, model, max_tokens, temperature)
+    _, breaker = _limits(model)
+    if not breaker.allow():
+        raise LLMUnavailable(f"Circuit open for {model}")
+
+    deadline_at = time.monotonic() + deadline
+    start = time.perf_counter()
+    status = "error"
+    with span(f"llm.{client}", model=model, max_tokens=max_tokens, hedge=hedge) as attrs:
+        try:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                attrs["attempts"] = attempt + 1
+                try:
+                    await _admit(model, payload, deadline_at)
+                except LLMTimeout:
+                    status = "throttled"
+                    raise
+                try:
+                    response = await (_hedged_post(payload, deadline_at, client) if hedge else _post_once(payload, deadline_at))
+                except LLMTimeout:
+                    status = "timeout"
+                    breaker.record(False, model)
+                    raise
+                except httpx.TransportError as e:
+                    response, error = None, LLMError(f"Transport error: {e!r}")
+                else:
+                    _sync_rate_limits(model, response)
+                    error = None
+
+                if response is not None and response.status_code < 400:
+                    try:
+                        data = response.json()
+                        text = (data["choices"][0]["message"]["content"] or "").strip()
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                        # A 200 without a completion is an upstream failure, not an empty answer
+                        status = "malformed"
+                        breaker.record(False, model)
+                        raise LLMError(f"Groq returned a malformed response: {response.text[:200]}") from None
+                    status = "ok"
+                    breaker.record(True, model)
+                    _record_usage(client, data)
+                    return text
+
+                if response is not None:
+                    status = str(response.status_code)
+                    error = LLMError(f"Groq returned {response.status_code}: {response.text[:200]}", response.status_code)
+                    if response.status_code not in RETRYABLE_STATUS:
+                        breaker.record(True, model)  # upstream is answering; the request itself is bad
+                        raise error
+                    if response.status_code == 429:
+                        _pause_requests(model, _retry_after(response))
+                    else:
+                        breaker.record(False, model)
+                else:
+                    breaker.record(False, model)
+
+                if attempt == LLM_MAX_RETRIES:
+                    raise error
+                delay = max(_backoff(attempt), _retry_after(response) if response is not None else 0.0)
+                if time.monotonic() + delay >= deadline_at:
+                    status = "timeout"
+                    raise LLMTimeout(f"No time left to retry after: {error}", error.status)
+                LLM_RETRIES.inc(client=client)
+                await asyncio.sleep(delay)
+        finally:
+            breaker.release()
+            elapsed = time.perf_counter() - start
+            attrs["status"] = status
+            LLM_LATENCY.observe(elapsed, client=client, status=status)
+            latency.record(client, elapsed, ok=status == "ok")
+
+
+async def stream_chat(prompt, model: str, client: str, max_tokens: int = None, temperature: float = 0,
+                      deadline: float = LLM_DEFAULT_DEADLINE) -> AsyncIterator[str]:
+    """
+    Yields completion text as it streams. Only the connection attempt is
+    retried: once text has been yielded, a failure is raised to the caller.
+    """
+    payload = _payload(prompt, model, max_tokens, temperature, stream=True)
+    _, breaker = _limits(model)
+    if not breaker.allow():
+        raise LLMUnavailable(f"Circuit open for {model}")
+
+    deadline_at = time.monotonic() + deadline
+    start = time.perf_counter()
+    status = "error"
+    yielded = False
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                await _admit(model, payload, deadline_at)
+            except LLMTimeout:
+                status = "throttled"
+                raise
+            remaining = deadline_at - time.monotonic()
+            timeout = httpx.Timeout(remaining, connect=min(LLM_CONNECT_TIMEOUT, remaining))
+            try:
+                async with _client().stream("POST", CHAT_URL, json=payload, timeout=timeout) as response:
+                    _sync_rate_limits(model, response)
+                    if response.status_code < 400:
+                        async for line in response.aiter_lines():
+                            if time.monotonic() > deadline_at:
+                                status = "timeout"
+                                raise LLMTimeout("LLM stream exceeded its deadline")
+                            if not line.startswith("data: ") or line == "data: [DONE]":
+                                continue
+                            try:
+                                chunk = json.loads(line[6:])
+                            except ValueError:
+                                status = "malformed"
+                                breaker.record(False, model)
+                                raise LLMError(f"Groq streamed a malformed chunk: {line[:200]}") from None
+                            if chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage"):
+                                _record_usage(client, chunk.get("x_groq") or chunk)
+                            for choice in chunk.get("choices") or []:
+                                piece = (choice.get("delta") or {}).get("content")
+                                if piece:
+                                    yielded = True
+                                    yield piece
+                        status = "ok"
+                        breaker.record(True, model)
+                        return
+
+                    await response.aread()
+                    status = str(response.status_code)
+                    error = LLMError(f"Groq returned {response.status_code}: {response.text[:200]}", response.status_code)
+                    retry_after = _retry_after(response)
+            except httpx.TimeoutException:
+                status = "timeout"
+                breaker.record(False, model)
+                raise LLMTimeout("LLM stream exceeded its deadline") from None
+            except httpx.TransportError as e:
+                breaker.record(False, model)
+                if yielded:
+                    raise LLMError(f"LLM stream broke off: {e!r}") from None
+                error, retry_after = LLMError(f"Transport error: {e!r}"), 0.0
+
+            if error.status is not None and error.status not in RETRYABLE_STATUS:
+                breaker.record(True, model)
+                raise error
+            if error.status == 429:
+                _pause_requests(model, retry_after)
+            elif error.status is not None:
+                breaker.record(False, model)  # transport errors were recorded above
+            delay = max(_backoff(attempt), retry_after)
+            if attempt == LLM_MAX_RETRIES or time.monotonic() + delay >= deadline_at:
+                raise error
+            LLM_RETRIES.inc(client=client)
+            await asyncio.sleep(delay)
+    finally:
+        breaker.release()
+        elapsed = time.perf_counter() - start
+        LLM_LATENCY.observe(elapsed, client=client, status=status)
+        latency.record(client, elapsed, ok=status == "ok")
+
+
+# -------------------------------
+# Sync bridge (RQ tasks)
+# -------------------------------
+_bridge = {"pid": None, "loop": None}
+_bridge_lock = threading.Lock()
+
+
+def _bridge_loop() -> asyncio.AbstractEventLoop:
+    """One background loop per process, so sync callers share a connection pool too."""
+    with _bridge_lock:
+        # A forked work horse inherits the dict but not the thread
+        if _bridge["pid"] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+            _bridge.update(pid=os.getpid(), loop=loop)
+        return _bridge["loop"]
+
+
+def chat_sync(prompt, model: str, client: str, **kwargs) -> str:
+    """Blocking form of `chat` for code that isn't running on an event loop."""
+    future = asyncio.run_coroutine_threadsafe(chat(prompt, model, client, **kwargs), _bridge_loop())
+    return future.result()
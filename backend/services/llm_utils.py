@@ -1,15 +1,10 @@
-import os
 import json
 from typing import Dict, Any, List
-from groq import Groq
-import dotenv
+from llm_clients import FAST_MODEL
+from services.llm_gateway import chat_sync
 
-# Load env vars
-dotenv.load_dotenv()
-
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
-GROQ_MODEL = "llama-3.1-8b-instant"
+GROQ_MODEL = FAST_MODEL
+CHUNK_METADATA_DEADLINE = 45  # seconds per chunk, including retries
 
 def generate_chunk_metadata(chunks: List[str]) -> List[Dict[str, Any]]:
     metadata_list = []
@@ -31,12 +26,7 @@ def generate_chunk_metadata(chunks: List[str]) -> List[Dict[str, Any]]:
 
         try:
             # --- Groq Inference ---
-            completion = groq_client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-            )
-
-            raw = completion.choices[0].message.content.strip()
+            raw = chat_sync(prompt, model=GROQ_MODEL, client="chunk_metadata", deadline=CHUNK_METADATA_DEADLINE)
             print(f"Raw completion:\n{raw}")
 
             chunk_metadata = json.loads(raw)
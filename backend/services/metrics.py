@@ -0,0 +1,308 @@
+# backend/services/metrics.py
+"""
+Prometheus text-format metrics without a client library.
+
+Counters and histograms are aggregated in memory and added to Redis hashes
+every METRICS_FLUSH_INTERVAL seconds by a background thread (and at the end
+of every RQ job, see scheduler._record_finished), so observations made in
+short-lived work horses and in the API land in the same series without a
+Redis round trip per observation. Only the API renders those shared series;
+gauges (e.g. open WebSockets) and collectors are process-local and rendered
+by the process that owns them.
+
+    GET /metrics                  (API: shared series + its own gauges)
+    WORKER_METRICS_PORT=9101      (run_worker.py: that worker's gauges only)
+"""
+
+import os
+import time
+import atexit
+import threading
+from typing import Callable, Dict, List, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import redis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+METRICS_PREFIX = "metrics:"
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))  # seconds
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], List[Tuple[str, str, Dict[str, str], float]]]] = []
+
+# Unflushed increments of shared series: {redis hash: {field: amount}}
+_pending: Dict[str, Dict[str, float]] = {}
+_pending_lock = threading.Lock()
+_pending_pid = None
+
+
+def _label_str(labels: dict) -> str:
+    return ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items()))
+
+
+def _series(name: str, label_str: str) -> str:
+    return f"{name}{{{label_str}}}" if label_str else name
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _flusher_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush_metrics()
+
+
+def _add_pending(hash_key: str, fields: Dict[str, float]):
+    global _pending, _pending_pid
+    with _pending_lock:
+        if _pending_pid != os.getpid():
+            # First write in this process, or a forked work horse whose copy
+            # of the parent's increments is the parent's to flush
+            _pending = {}
+            _pending_pid = os.getpid()
+            threading.Thread(target=_flusher_loop, name="metrics-flusher", daemon=True).start()
+        target = _pending.setdefault(hash_key, {})
+        for field, amount in fields.items():
+            target[field] = target.get(field, 0) + amount
+
+
+def flush_metrics():
+    """Adds this process's aggregated increments to Redis in one pipeline."""
+    global _pending
+    with _pending_lock:
+        if _pending_pid != os.getpid() or not _pending:
+            return
+        batch, _pending = _pending, {}
+    # Metrics must never take a request or job down with them
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for hash_key, fields in batch.items():
+            for field, amount in fields.items():
+                pipe.hincrbyfloat(hash_key, field, amount)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[Metrics] Flush failed, keeping increments for the next one: {e}")
+        with _pending_lock:
+            for hash_key, fields in batch.items():
+                target = _pending.setdefault(hash_key, {})
+                for field, amount in fields.items():
+                    target[field] = target.get(field, 0) + amount
+
+
+atexit.register(flush_metrics)
+
+
+class _Metric:
+    kind = ""
+    shared = True  # stored in Redis and rendered by the API only
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        _registry.append(self)
+
+    def _write(self, fields: Dict[str, float]):
+        _add_pending(METRICS_PREFIX + self.name, fields)
+
+    def _stored(self) -> Dict[str, str]:
+        try:
+            return redis_client.hgetall(METRICS_PREFIX + self.name)
+        except redis.RedisError:
+            return {}
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount:
+            self._write({_label_str(labels): amount})
+
+    def _samples(self):
+        return [f"{_series(self.name, k)} {_fmt(float(v))}" for k, v in sorted(self._stored().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_str(labels)
+        # Buckets are stored cumulatively, as the exposition format expects
+        fields = {f"{key}|{le}": 1 for le in self.buckets if value <= le}
+        fields[f"{key}|+Inf"] = 1
+        fields[f"{key}|sum"] = value
+        fields[f"{key}|count"] = 1
+        self._write(fields)
+
+    def _samples(self):
+        by_labels = {}
+        for field, value in self._stored().items():
+            key, _, part = field.rpartition("|")
+            by_labels.setdefault(key, {})[part] = float(value)
+
+        lines = []
+        for key, parts in sorted(by_labels.items()):
+            for le in [str(b) for b in self.buckets] + ["+Inf"]:
+                bucket_labels = f'{key},le="{le}"' if key else f'le="{le}"'
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {_fmt(parts.get(le, 0))}")
+            lines.append(f"{_series(self.name + '_sum', key)} {_fmt(parts.get('sum', 0))}")
+            lines.append(f"{_series(self.name + '_count', key)} {_fmt(parts.get('count', 0))}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Process-local gauge (not shared through Redis)."""
+    kind = "gauge"
+    shared = False
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_str(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_str(labels)] = value
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{_series(self.name, k)} {_fmt(v)}" for k, v in sorted(values.items())]
+
+
+def register_collector(collector: Callable[[], List[Tuple[str, str, Dict[str, str], float]]]):
+    """`collector()` returns (name, help, labels, value) gauge samples computed at scrape time."""
+    _collectors.append(collector)
+    return collector
+
+
+def render_metrics(shared: bool = True) -> str:
+    """
+    Exposition text. `shared` adds the Redis-backed counters and histograms;
+    only one process (the API) should, or every exporter repeats them.
+    """
+    lines = []
+    if shared:
+        flush_metrics()
+    for metric in _registry:
+        if metric.shared and not shared:
+            continue
+        lines += metric.render()
+
+    described = set()
+    for collector in _collectors:
+        try:
+            samples = collector()
+        except Exception as e:
+            print(f"[Metrics] Collector {collector.__name__} failed: {e}")
+            continue
+        for name, help_text, labels, value in samples:
+            if name not in described:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                described.add(name)
+            lines.append(f"{_series(name, _label_str(labels))} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------
+# Process collectors
+# -------------------------------
+@register_collector
+def _process_samples():
+    from services.startup import startup_report
+
+    report = startup_report()
+    samples = [
+        ("process_resident_memory_mb", "Resident set size of this process", {"pid": report["pid"]}, report["rss_mb"]),
+        ("process_uptime_seconds", "Seconds since this process started", {"pid": report["pid"]}, report["uptime_seconds"]),
+    ]
+    for name, seconds in report["timings"].items():
+        samples.append(("startup_load_seconds", "Time taken to import or load a resource", {"resource": name}, seconds))
+    return samples
+
+
+# -------------------------------
+# Worker-side exporter
+# -------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_metrics(shared=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the worker log
+
+
+def start_metrics_server(port: int):
+    """Serves this process's local /metrics from a daemon thread (for processes without FastAPI)."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    print(f"[Metrics] Exporter listening on :{port}/metrics")
+    return server
+
+
+# -------------------------------
+# Shared metric definitions
+# -------------------------------
+TTS_CACHE_REQUESTS = Counter("tts_audio_cache_requests_total", "Question audio cache lookups by result")
+TTS_CACHE_BYTES = Counter("tts_audio_cache_bytes_total", "Question audio bytes read from or written to the cache")
+
+RQ_QUEUE_WAIT = Histogram("rq_job_queue_wait_seconds", "Time jobs spent queued before a worker started them")
+RQ_JOB_DURATION = Histogram("rq_job_duration_seconds", "Job run time by queue and outcome")
+
+WHISPER_RTF = Histogram(
+    "whisper_real_time_factor", "Transcription seconds per second of audio (lower is faster)",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4),
+)
+WHISPER_AUDIO_SECONDS = Counter("whisper_audio_seconds_total", "Seconds of answer audio transcribed")
+
+TTS_AUDIO_SECONDS = Counter("tts_audio_seconds_total", "Seconds of audio synthesized by Kokoro")
+TTS_SYNTH_SECONDS = Counter("tts_synthesis_seconds_total", "Wall time spent in Kokoro synthesis")
+TTS_SPEED = Histogram(
+    "tts_audio_seconds_per_second", "Seconds of audio produced per second of synthesis, per sentence",
+    buckets=(0.5, 1, 2, 3, 5, 8, 12, 20, 40),
+)
+
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "LLM call latency by client and outcome")
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens by client and direction")
+LLM_RETRIES = Counter("llm_retries_total", "LLM calls retried by client")
+LLM_HEDGES = Counter("llm_hedged_requests_total", "Duplicate LLM requests sent because the first was slow")
+LLM_CIRCUIT_OPENED = Counter("llm_circuit_opened_total", "Times the LLM circuit breaker opened, by model")
+SCORING_DETERMINISTIC = Counter("scoring_deterministic_items_total", "Answers scored without the LLM or fallback model, by reason")
+SCORING_FALLBACKS = Counter("scoring_fallback_items_total", "Answers scored by the local fallback scorer, by reason")
+
+ANSWER_FLUSH_FAILURES = Counter("answer_buffer_flush_failures_total", "Buffered answer rows that failed to write, by outcome (retry / dead_letter)")
+
+WS_ACTIVE = Gauge("websocket_active_connections", "Open WebSocket connections in this API process")
+
@@ -1,11 +1,86 @@
+import os
 import re
-from typing import List
+import time
+from typing import List, Optional
 import fitz
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
-from sentence_transformers import SentenceTransformer
+from services.embedding_cache import EMBED_MODEL_NAME, get_cached_embeddings, cache_embeddings
+from services.startup import lazy_resource
+from services.tracing import span
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 = torch default
+EMBED_WINDOW_CHARS = int(os.getenv("EMBED_WINDOW_CHARS", "1000"))  # ~256 MiniLM tokens; the model truncates past that
+
+
+@lazy_resource(f"model:{EMBED_MODEL_NAME}")
+def get_embed_model():
+    """Loads the SentenceTransformer on first use so importers don't pay for it."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if EMBED_THREADS > 0:
+        torch.set_num_threads(EMBED_THREADS)
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+
+def encode_texts(texts: List[str], stats: Optional[dict] = None) -> np.ndarray:
+    """
+    Embeds texts, serving repeats from the embedding cache and encoding
+    only the misses in batches of EMBED_BATCH_SIZE.
+    Cache hits/misses and encode time are accumulated into `stats`.
+    """
+    cached = get_cached_embeddings(EMBED_MODEL_NAME, texts)
+    miss_idx = [i for i, vec in enumerate(cached) if vec is None]
+
+    encode_seconds = 0.0
+    if miss_idx:
+        miss_texts = [texts[i] for i in miss_idx]
+        model = get_embed_model()
+        start = time.perf_counter()
+        with span("embed.encode", texts=len(miss_texts)):
+            fresh = model.encode(miss_texts, batch_size=EMBED_BATCH_SIZE)
+        encode_seconds = time.perf_counter() - start
+
+        cache_embeddings(EMBED_MODEL_NAME, miss_texts, fresh)
+        for i, vec in zip(miss_idx, fresh):
+            cached[i] = np.asarray(vec, dtype=np.float32)
+
+    if stats is not None:
+        stats["cache_hits"] = stats.get("cache_hits", 0) + len(texts) - len(miss_idx)
+        stats["cache_misses"] = stats.get("cache_misses", 0) + len(miss_idx)
+        stats["encode_seconds"] = round(stats.get("encode_seconds", 0.0) + encode_seconds, 3)
+
+    return np.vstack(cached) if cached else np.empty((0, 0), dtype=np.float32)
+
+
+def _windows(text: str, size: int) -> List[str]:
+    """Splits text at whitespace into pieces of at most ~`size` characters."""
+    windows, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > size:
+            windows.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        windows.append(current)
+    return windows or [text]
+
 
-embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+def encode_documents(texts: List[str], stats: Optional[dict] = None) -> np.ndarray:
+    """
+    Embeds texts longer than the model's input window as the mean of their
+    EMBED_WINDOW_CHARS windows, so the whole chunk counts, not just its start.
+    """
+    windows = [_windows(t, EMBED_WINDOW_CHARS) for t in texts]
+    flat = encode_texts([w for ws in windows for w in ws], stats)
+
+    vectors, start = [], 0
+    for ws in windows:
+        vectors.append(flat[start:start + len(ws)].mean(axis=0))
+        start += len(ws)
+    return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
 
 
 def parse_pdf_to_text(file_path: str) -> str:
@@ -21,6 +96,7 @@ def parse_pdf_to_chunks_agglomerative(
     chunk_size: int = 2000,
     max_cluster_size: int = 8000,
     distance_threshold: float = 0.35, 
+    stats: Optional[dict] = None,
 ) -> List[str]:
 
     full_text = parse_pdf_to_text(file_path)
@@ -50,11 +126,13 @@ def parse_pdf_to_chunks_agglomerative(
         return rough_chunks
 
     # Step 3: embed all chunks
-    embeddings = embed_model.encode(rough_chunks)
+    embeddings = encode_texts(rough_chunks, stats)
 
     # Step 4: Agglomerative clustering
+    from sklearn.cluster import AgglomerativeClustering
+
     clustering = AgglomerativeClustering(
-        affinity="cosine",
+        metric="cosine",
         linkage="average",
         distance_threshold=distance_threshold,
         n_clusters=None
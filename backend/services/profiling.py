@@ -0,0 +1,212 @@
+# backend/services/profiling.py
+"""
+Opt-in sampling profiler for slow requests and jobs.
+
+A daemon thread samples Python stacks with sys._current_frames() while a
+`@profiled` function runs and writes them in the folded format that
+flamegraph.pl, speedscope and inferno read:
+
+    traces/profiles/<trace_id>/<name>.<pid>.folded
+
+Profiling is requested per HTTP request with an `X-Profile: 1` header (the
+request's trace id follows it into any job it submits, so profiles are filed
+under the X-Trace-Id returned to the client even with span export off) or
+per job with job.meta["profile"] = True. When nothing asked for it, the only cost is a
+contextvar and current-job lookup per call.
+
+    PROFILING=off|on-demand|always   (default on-demand)
+    GET /profiles/<trace_id>         merged stacks for one trace
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import Counter
+from typing import Optional
+from contextlib import contextmanager
+from services.tracing import current_trace_id, valid_trace_id
+
+PROFILING = os.getenv("PROFILING", "on-demand")  # off | on-demand | always
+PROFILE_DIR = os.getenv("PROFILE_DIR", "traces/profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+
+_requested = contextvars.ContextVar("profile_requested", default=None)  # trace id to file profiles under
+_active = contextvars.ContextVar("profile_active", default=False)
+
+
+@contextmanager
+def request_profile(trace_id: Optional[str]):
+    """Marks the enclosed work (and jobs it submits) as wanting a profile filed under `trace_id`."""
+    if not trace_id or PROFILING == "off":
+        yield
+        return
+    token = _requested.set(trace_id)
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+def profile_request():
+    """
+    The requesting trace id, True (profile without one) or False. This is
+    what scheduler.submit stores as job.meta["profile"].
+    """
+    if PROFILING == "off":
+        return False
+    if _requested.get():
+        return _requested.get()
+    if PROFILING == "always":
+        return True
+    from rq import get_current_job
+
+    job = get_current_job()
+    return (job.meta or {}).get("profile") or False if job is not None else False
+
+
+def profiling_requested() -> bool:
+    return bool(profile_request())
+
+
+# -------------------------------
+# Sampler
+# -------------------------------
+_labels: dict = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        for root in sys.path:
+            root = root or os.getcwd()
+            if path.startswith(root + os.sep):
+                path = os.path.relpath(path, root)
+                break
+        label = _labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+class SamplingProfiler:
+    """Samples one thread (or every thread but itself) every `interval` seconds."""
+
+    def __init__(self, thread_id: int = None, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()} if self.thread_id is None else {}
+            for tid, frame in sys._current_frames().items():
+                if tid == own or (self.thread_id is not None and tid != self.thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if self.thread_id is None:
+                    stack.append(f"thread:{names.get(tid, tid)}")
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def write_profile(name: str, profiler: SamplingProfiler, trace_id: str = None) -> str:
+    # Trace ids travel through headers and job meta; never let one leave PROFILE_DIR
+    directory = os.path.join(PROFILE_DIR, trace_id if valid_trace_id(trace_id) else "untraced")
+    path = os.path.join(directory, f"{name}.{os.getpid()}.folded")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+    except OSError as e:
+        print(f"[Profile] Could not write {path}: {e}")
+        return None
+    print(f"[Profile] {name}: {profiler.samples} samples -> {path}")
+    return path
+
+
+@contextmanager
+def profile(name: str, all_threads: bool = False):
+    """
+    Samples the calling thread (or all threads) for the duration of the block
+    when profiling was requested. Nested profiled calls join the outer profile.
+    """
+    if _active.get() or not profiling_requested():
+        yield
+        return
+
+    profiler = SamplingProfiler(None if all_threads else threading.get_ident()).start()
+    token = _active.set(True)
+    try:
+        yield
+    finally:
+        _active.reset(token)
+        # The span context is empty when TRACE_EXPORT is off or unsampled
+        requested = profile_request()
+        write_profile(name, profiler.stop(), current_trace_id() or (requested if isinstance(requested, str) else None))
+
+
+def profiled(name: str, all_threads: bool = None):
+    """
+    Decorator form of `profile`. Coroutines sample every thread by default,
+    since their blocking work is usually pushed to asyncio.to_thread.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with profile(name, all_threads=True if all_threads is None else all_threads):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile(name, all_threads=bool(all_threads)):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# -------------------------------
+# Reading profiles back
+# -------------------------------
+def load_profile(trace_id: str) -> str:
+    """Folded stacks of every profile recorded for `trace_id`, merged."""
+    directory = os.path.join(PROFILE_DIR, os.path.basename(trace_id))
+    if not os.path.isdir(directory):
+        return ""
+    merged = Counter()
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".folded"):
+            continue
+        profile_name = filename[:-len(".folded")].rsplit(".", 1)[0]
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack and count.isdigit():
+                    merged[f"{profile_name};{stack}"] += int(count)
+    return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
@@ -0,0 +1,320 @@
+# backend/services/scheduler.py
+"""
+Priority and fair-share scheduling on top of RQ.
+
+Every job kind (tts, whisper, pdf, scoring, question) has one queue per priority class, named
+"{kind}_queue_{class}". Workers list them highest class first, e.g.
+
+    rq worker tts_queue_live tts_queue_next tts_queue_prefetch tts_queue_bulk tts_queue
+
+so RQ drains live-interview work before prefetch and bulk PDF parsing.
+The bare "{kind}_queue" is listed last to drain jobs from older deploys.
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+import redis
+import rq
+from rq import Callback
+from rq.job import Job, JobStatus
+from rq.registry import DeferredJobRegistry
+from services.latency import percentile
+from services.tracing import current_context
+from services.profiling import profile_request
+from services.metrics import RQ_QUEUE_WAIT, RQ_JOB_DURATION, register_collector, flush_metrics
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+PRIORITY_CLASSES = ["live", "next", "prefetch", "bulk"]  # highest first
+JOB_KINDS = ["tts", "whisper", "pdf", "scoring", "question"]
+
+# In-flight jobs one user (or interview) may hold per kind before further
+# jobs are demoted one class, so a single burst cannot starve everyone else.
+USER_FAIR_SHARE = int(os.getenv("SCHEDULER_USER_FAIR_SHARE", "4"))
+
+# Total queued jobs of a kind above which a class is refused (0 = never refused).
+MAX_QUEUE_DEPTH = {
+    "live": 0,
+    "next": 0,
+    "prefetch": int(os.getenv("SCHEDULER_MAX_DEPTH_PREFETCH", "200")),
+    "bulk": int(os.getenv("SCHEDULER_MAX_DEPTH_BULK", "20")),
+}
+
+TIMING_SAMPLES = 1000  # per queue, newest first
+INFLIGHT_TTL = 3600    # safety net for counters of jobs whose callbacks never ran
+
+redis_conn = redis.Redis.from_url(REDIS_URL)
+
+
+class QueueFull(Exception):
+    """Raised when admission control refuses a job; callers map it to 503 or skip the work."""
+
+    def __init__(self, kind: str, priority: str, depth: int):
+        super().__init__(f"{kind} queue is saturated ({depth} jobs waiting), refusing {priority} work")
+        self.kind = kind
+        self.priority = priority
+        self.depth = depth
+
+
+def queue_name(kind: str, priority: str) -> str:
+    return f"{kind}_queue_{priority}"
+
+
+def worker_queue_names(kind: str) -> list[str]:
+    """Queue names a worker for `kind` should listen on, in priority order."""
+    return [queue_name(kind, p) for p in PRIORITY_CLASSES] + [f"{kind}_queue"]
+
+
+def get_queue(kind: str, priority: str) -> rq.Queue:
+    return rq.Queue(queue_name(kind, priority), connection=redis_conn)
+
+
+def queue_depth(kind: str) -> int:
+    pipe = redis_conn.pipeline(transaction=False)
+    for name in worker_queue_names(kind):
+        pipe.llen(f"rq:queue:{name}")
+    return sum(pipe.execute())
+
+
+def oldest_job_age(kind: str) -> float:
+    """Seconds the oldest still-queued job of `kind` has been waiting (0 when idle)."""
+    pipe = redis_conn.pipeline(transaction=False)
+    names = worker_queue_names(kind)
+    for name in names:
+        pipe.lindex(f"rq:queue:{name}", 0)
+    head_ids = [jid.decode() for jid in pipe.execute() if jid]
+
+    now = time.time()
+    oldest = 0.0
+    for job in Job.fetch_many(head_ids, connection=redis_conn):
+        if job is None:
+            continue
+        submitted = (job.meta or {}).get("submitted_at")
+        if submitted is None and job.enqueued_at is not None:
+            enqueued = job.enqueued_at
+            if enqueued.tzinfo is None:
+                enqueued = enqueued.replace(tzinfo=timezone.utc)
+            submitted = enqueued.timestamp()
+        if submitted is not None:
+            oldest = max(oldest, now - submitted)
+    return oldest
+
+
+def _inflight_key(kind: str, owner: str) -> str:
+    return f"sched:inflight:{kind}:{owner}"
+
+
+def _wait_key(name: str) -> str:
+    return f"sched:wait:{name}"
+
+
+def _duration_key(name: str) -> str:
+    return f"sched:duration:{name}"
+
+
+def _demote(priority: str) -> str:
+    i = PRIORITY_CLASSES.index(priority)
+    return PRIORITY_CLASSES[min(i + 1, len(PRIORITY_CLASSES) - 1)]
+
+
+# -------------------------------
+# Submission
+# -------------------------------
+def submit(kind: str, priority: str, func, *args, owner: str = None, job_id: str = None,
+           profile: bool = None, **kwargs) -> Job:
+    """
+    Enqueues `func` on the kind's queue for `priority`.
+    Owners over their fair share are demoted one class; classes with a depth
+    limit raise QueueFull when the kind's backlog is already too deep.
+    `profile` defaults to whether the submitting request asked for profiling.
+    """
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority}")
+
+    limit = MAX_QUEUE_DEPTH[priority]
+    if limit:
+        depth = queue_depth(kind)
+        if depth >= limit:
+            raise QueueFull(kind, priority, depth)
+
+    if owner:
+        key = _inflight_key(kind, owner)
+        pipe = redis_conn.pipeline(transaction=True)
+        pipe.incr(key)
+        pipe.expire(key, INFLIGHT_TTL)
+        inflight = pipe.execute()[0]
+        if inflight > USER_FAIR_SHARE:
+            demoted = _demote(priority)
+            if demoted != priority:
+                print(f"[Scheduler] {owner} has {inflight} {kind} jobs in flight, {priority} -> {demoted}")
+                priority = demoted
+
+    return get_queue(kind, priority).enqueue(
+        func, *args,
+        job_id=job_id,
+        meta={
+            "kind": kind, "owner": owner, "priority": priority, "submitted_at": time.time(),
+            "trace": current_context(), "profile": profile_request() if profile is None else profile,
+        },
+        on_success=Callback(job_succeeded),
+        on_failure=Callback(job_failed),
+        on_stopped=Callback(job_stopped),
+        **kwargs,
+    )
+
+
+def promote(job_id: str, priority: str) -> bool:
+    """
+    Moves a still-queued job up to `priority` (e.g. a prefetched TTS job the
+    user is now waiting on). A job that already ran and fanned out lists its
+    follow-up jobs in meta["follow_ups"]; those are promoted instead.
+    Returns True if any job was moved.
+    """
+    try:
+        job = Job.fetch(job_id, connection=redis_conn)
+    except Exception:
+        return False
+
+    kind = job.meta.get("kind")
+    current = job.meta.get("priority")
+    status = job.get_status()
+    if status not in (JobStatus.QUEUED, JobStatus.DEFERRED):
+        moved = [promote(follow_up, priority) for follow_up in job.meta.get("follow_ups", [])]
+        return any(moved)
+    if kind is None or current is None:
+        return False
+    if PRIORITY_CLASSES.index(priority) >= PRIORITY_CLASSES.index(current):
+        return False
+
+    if status == JobStatus.DEFERRED:
+        # Still waiting on its dependencies: RQ enqueues it on job.origin once they finish
+        target = queue_name(kind, priority)
+        DeferredJobRegistry(target, connection=redis_conn).add(job)
+        redis_conn.hset(job.key, "origin", target)
+        DeferredJobRegistry(job.origin, connection=redis_conn).remove(job)
+        job.meta["priority"] = priority
+        job.save_meta()
+        print(f"[Scheduler] Promoted deferred {job_id} {current} -> {priority}")
+        return True
+
+    # remove() returns how many entries it dropped; 0 means a worker just took it
+    if not rq.Queue(job.origin, connection=redis_conn).remove(job):
+        return False
+    job.meta["priority"] = priority
+    job.save_meta()
+    get_queue(kind, priority).enqueue_job(job, at_front=True)
+    print(f"[Scheduler] Promoted {job_id} {current} -> {priority}")
+    return True
+
+
+# -------------------------------
+# Worker-side callbacks
+# -------------------------------
+def _seconds_between(start, end) -> float:
+    if start is None or end is None:
+        return None
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return (end - start).total_seconds()
+
+
+def _record_finished(job: Job, connection, status: str):
+    meta = job.meta or {}
+    started = job.started_at
+    submitted = meta.get("submitted_at")
+    wait = None
+    if started is not None and submitted is not None:
+        wait = _seconds_between(datetime.fromtimestamp(submitted, tz=timezone.utc), started)
+    duration = _seconds_between(started, datetime.now(timezone.utc))
+
+    if wait is not None:
+        RQ_QUEUE_WAIT.observe(max(wait, 0.0), queue=job.origin)
+    if duration is not None:
+        RQ_JOB_DURATION.observe(max(duration, 0.0), queue=job.origin, status=status)
+
+    pipe = connection.pipeline(transaction=False)
+    if wait is not None:
+        pipe.lpush(_wait_key(job.origin), round(max(wait, 0.0), 4))
+        pipe.ltrim(_wait_key(job.origin), 0, TIMING_SAMPLES - 1)
+    if duration is not None:
+        pipe.lpush(_duration_key(job.origin), round(max(duration, 0.0), 4))
+        pipe.ltrim(_duration_key(job.origin), 0, TIMING_SAMPLES - 1)
+    if meta.get("owner") and meta.get("kind"):
+        pipe.decr(_inflight_key(meta["kind"], meta["owner"]))
+    pipe.execute()
+    # The work horse exits right after the callbacks, before the next periodic flush
+    flush_metrics()
+
+
+def job_succeeded(job, connection, result, *args, **kwargs):
+    _record_finished(job, connection, "ok")
+
+
+def job_failed(job, connection, exc_type, exc_value, traceback):
+    _record_finished(job, connection, "failed")
+
+
+def job_stopped(job, connection):
+    _record_finished(job, connection, "stopped")
+
+
+# -------------------------------
+# Stats
+# -------------------------------
+def timing_summary(key: str) -> dict:
+    values = sorted(float(v) for v in redis_conn.lrange(key, 0, -1))
+    if not values:
+        return {"samples": 0}
+    return {
+        "samples": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+def kind_duration_summary(kind: str) -> dict:
+    """Run time percentiles over recent jobs of every class of `kind`."""
+    values = []
+    for priority in PRIORITY_CLASSES:
+        values += [float(v) for v in redis_conn.lrange(_duration_key(queue_name(kind, priority)), 0, -1)]
+    values.sort()
+    if not values:
+        return {"samples": 0}
+    return {
+        "samples": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+@register_collector
+def _queue_depth_samples():
+    pipe = redis_conn.pipeline(transaction=False)
+    names = [name for kind in JOB_KINDS for name in worker_queue_names(kind)]
+    for name in names:
+        pipe.llen(f"rq:queue:{name}")
+    return [
+        ("rq_queue_depth", "Jobs waiting in each RQ queue", {"queue": name}, depth)
+        for name, depth in zip(names, pipe.execute())
+    ]
+
+
+def scheduler_stats() -> dict:
+    """Per kind and class: jobs waiting, queue wait and run time percentiles over recent jobs."""
+    stats = {}
+    for kind in JOB_KINDS:
+        stats[kind] = {}
+        for priority in PRIORITY_CLASSES:
+            name = queue_name(kind, priority)
+            stats[kind][priority] = {
+                "waiting": redis_conn.llen(f"rq:queue:{name}"),
+                "queue_wait": timing_summary(_wait_key(name)),
+                "duration": timing_summary(_duration_key(name)),
+            }
+    return stats
@@ -0,0 +1,157 @@
+# backend/services/scoring_progress.py
+"""
+Shared state of asynchronous attempt scoring (tasks/scoring_task.py).
+
+    scoring:claim:<attempt_id>    RQ job id of the attempt's scoring run; SET NX
+                                  makes /complete_attempt idempotent
+    scoring:events:<attempt_id>   append-only list of progress events, so an
+                                  SSE client can (re)connect at any point
+    scoring:result:<attempt_id>   final result, served by the result endpoint
+
+A failed run releases its claim, so completing the attempt again retries it.
+A claim whose job RQ reports as failed, stopped or gone (a killed work horse
+never releases it) is stale and is replaced the same way. An in-flight claim
+expires shortly after the job timeout; a finished run keeps its claim for
+SCORING_STATE_TTL.
+"""
+
+import os
+import json
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+import redis
+from rq.job import Job, JobStatus
+from rq.exceptions import NoSuchJobError
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SCORING_STATE_TTL = int(os.getenv("SCORING_STATE_TTL", "86400"))  # seconds, events and result
+SCORING_JOB_TIMEOUT = int(os.getenv("SCORING_JOB_TIMEOUT", "300"))  # transcript wait + LLM budget + feedback
+SCORING_CLAIM_TTL = SCORING_JOB_TIMEOUT + 60  # in-flight claim; covers a short queue wait
+CLAIM_GRACE_SECONDS = 30  # a claim younger than this may not have its job enqueued yet
+
+# Job states that can no longer produce a result
+DEAD_JOB_STATES = (JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED)
+
+# Event names that end a run
+FINAL_EVENTS = ("done", "error")
+
+redis_conn = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+rq_conn = redis.Redis.from_url(REDIS_URL)  # RQ needs undecoded replies
+
+
+def claim_key(attempt_id: str) -> str:
+    return f"scoring:claim:{attempt_id}"
+
+
+def events_key(attempt_id: str) -> str:
+    return f"scoring:events:{attempt_id}"
+
+
+def result_key(attempt_id: str) -> str:
+    return f"scoring:result:{attempt_id}"
+
+
+def claim_scoring(attempt_id: str) -> Tuple[str, bool]:
+    """(job_id, created). Only the first caller for an attempt gets created=True."""
+    job_id = f"scoring-{attempt_id}-{uuid.uuid4().hex[:8]}"
+    if redis_conn.set(claim_key(attempt_id), job_id, nx=True, ex=SCORING_CLAIM_TTL):
+        # Drop events of an earlier failed run so the stream starts clean
+        redis_conn.delete(events_key(attempt_id), result_key(attempt_id))
+        return job_id, True
+    existing = redis_conn.get(claim_key(attempt_id))
+    if existing is None:
+        # Released between SET and GET (a failed run): claim again
+        return claim_scoring(attempt_id)
+    if claim_is_stale(attempt_id, existing):
+        print(f"[Scoring] Claim {existing} for {attempt_id} is stale, starting a new run")
+        release_claim(attempt_id, existing)
+        return claim_scoring(attempt_id)
+    return existing, False
+
+
+def job_state(job_id: str) -> Optional[str]:
+    """RQ status of the job, or None when RQ no longer knows it."""
+    try:
+        return Job.fetch(job_id, connection=rq_conn).get_status()
+    except NoSuchJobError:
+        return None
+
+
+def claim_is_stale(attempt_id: str, job_id: str) -> bool:
+    """True when the claim's job died without releasing it."""
+    if load_result(attempt_id) is not None:
+        return False
+    state = job_state(job_id)
+    if state is None:
+        # Missing: fine right after the claim (not enqueued yet), stale later
+        age = SCORING_CLAIM_TTL - redis_conn.ttl(claim_key(attempt_id))
+        return age > CLAIM_GRACE_SECONDS
+    return state in DEAD_JOB_STATES
+
+
+def keep_claim(attempt_id: str, job_id: str):
+    """A finished run keeps its claim as long as its result, so repeats stay idempotent."""
+    if redis_conn.get(claim_key(attempt_id)) == job_id:
+        redis_conn.expire(claim_key(attempt_id), SCORING_STATE_TTL)
+
+
+def release_claim(attempt_id: str, job_id: str):
+    """Lets a later /complete_attempt start a new run, if `job_id` still holds the claim."""
+    if redis_conn.get(claim_key(attempt_id)) == job_id:
+        redis_conn.delete(claim_key(attempt_id))
+
+
+def current_job_id(attempt_id: str) -> Optional[str]:
+    return redis_conn.get(claim_key(attempt_id))
+
+
+# -------------------------------
+# Events
+# -------------------------------
+def publish_event(attempt_id: str, event: str, **data):
+    payload = json.dumps({"event": event, "ts": round(time.time(), 3), **data})
+    pipe = redis_conn.pipeline(transaction=False)
+    pipe.rpush(events_key(attempt_id), payload)
+    pipe.expire(events_key(attempt_id), SCORING_STATE_TTL)
+    pipe.execute()
+
+
+def read_events(attempt_id: str, start: int = 0) -> List[Dict]:
+    """Events from index `start` on; the index is the SSE event id."""
+    return [json.loads(e) for e in redis_conn.lrange(events_key(attempt_id), start, -1)]
+
+
+def last_event(attempt_id: str) -> Optional[Dict]:
+    raw = redis_conn.lindex(events_key(attempt_id), -1)
+    return json.loads(raw) if raw else None
+
+
+# -------------------------------
+# Result
+# -------------------------------
+def store_result(attempt_id: str, result: Dict):
+    redis_conn.set(result_key(attempt_id), json.dumps(result), ex=SCORING_STATE_TTL)
+
+
+def load_result(attempt_id: str) -> Optional[Dict]:
+    raw = redis_conn.get(result_key(attempt_id))
+    return json.loads(raw) if raw else None
+
+
+def scoring_status(attempt_id: str) -> Dict:
+    """queued / running / done / error (or unknown when no run was started, or its claim expired)."""
+    job_id = current_job_id(attempt_id)
+    latest = last_event(attempt_id)
+    if latest is None:
+        status = "queued" if job_id else "unknown"
+    elif latest["event"] == "done":
+        status = "done"
+    elif latest["event"] == "error":
+        status = "error"
+    else:
+        status = "running"
+    if status in ("queued", "running") and job_id and claim_is_stale(attempt_id, job_id):
+        # The work horse died mid-run; /complete_attempt starts a new one
+        return {"attemptId": attempt_id, "jobId": job_id, "status": "error", "stage": "stale"}
+    return {"attemptId": attempt_id, "jobId": job_id, "status": status, "stage": latest and latest["event"]}
@@ -1,48 +1,45 @@
 # backend/services/scoring_service.py
 
 import os
-import requests
 import json
 import re
+import time
+import asyncio
 from typing import List, Dict
-from supabase_client import supabase
+from services.db import aexecute
+from services.attempt_snapshot import fetch_attempt_snapshot, snapshot_to_scoring_items
+from services.tracing import traced
+from services.profiling import profiled
+from services.llm_gateway import chat, LLMError, LLMUnavailable
+from services.metrics import LLM_RETRIES, SCORING_FALLBACKS, SCORING_DETERMINISTIC
+from services.coverage import attach_coverage, compact_text, coverage_summary, triage
+from services.fallback_scorer import score_items as fallback_score_items, fallback_feedback, record_llm_sample
+from llm_clients import FAST_MODEL
 
 
 # -------------------------------
-# RAW GROQ API CONFIG
+# SCORING LLM CONFIG
 # -------------------------------
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
-MODEL = "llama-3.1-8b-instant"
+MODEL = FAST_MODEL
+SCORE_DEADLINE = float(os.getenv("SCORE_DEADLINE", "20"))        # per question, including retries
+FEEDBACK_DEADLINE = float(os.getenv("FEEDBACK_DEADLINE", "40"))
+SCORE_PARSE_ATTEMPTS = 3
 
+# Whole-attempt LLM budget; once spent (or the LLM is down) the rest is scored locally
+SCORING_LLM_BUDGET = float(os.getenv("SCORING_LLM_BUDGET", "30"))
+FALLBACK_SCORING = os.getenv("FALLBACK_SCORING", "auto")  # auto | off | always
 
-# =====================================================
-# RAW CLIENT
-# =====================================================
-def groq_raw(prompt: str, max_tokens=200):
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {GROQ_API_KEY}"
-    }
+# How triage reasons (services/coverage.py) are shown to the client and the feedback prompt
+ANSWER_STATUS = {"empty": "skipped", "silence": "no_speech"}
 
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0,
-        "max_tokens": max_tokens
-    }
-
-    response = requests.post(GROQ_URL, json=payload, headers=headers)
 
-    try:
-        data = response.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except Exception as e:
-        print("❌ RAW API ERROR:", e)
-        print("Response:", response.text)
-        return ""
+# =====================================================
+# GROQ CLIENT
+# =====================================================
+async def groq_raw(prompt: str, max_tokens=200, temperature=0, deadline=SCORE_DEADLINE, hedge=False):
+    """Single-prompt completion through the shared LLM gateway (retries, deadline, breaker)."""
+    return await chat(prompt, model=MODEL, client="scoring", max_tokens=max_tokens,
+                      temperature=temperature, deadline=deadline, hedge=hedge)
 
 
 # =====================================================
@@ -74,64 +71,18 @@ def safe_parse_llm_json(raw: str):
     return data
 
 
-# =====================================================
-# FETCH QUESTIONS
-# =====================================================
-async def fetch_questions(attempt_id: str) -> List[Dict]:
-
-    res = (
-        supabase.table("questions")
-        .select("id, question, ideal_answer, attempt_id, interview_id")
-        .eq("attempt_id", attempt_id)
-        .order("created_at", desc=False)
-        .execute()
-    )
-
-    return res.data or []
-
-
-# =====================================================
-# FETCH ANSWERS
-# =====================================================
-async def fetch_answers(attempt_id: str) -> List[Dict]:
-
-    res = (
-        supabase.table("answers")
-        .select("question_id, transcript, has_audio")
-        .eq("attempt_id", attempt_id)
-        .execute()
-    )
-
-    return res.data or []
-
-
-# =====================================================
-# MERGE Q & A
-# =====================================================
-def merge_questions_and_answers(questions, answers):
-
-    answer_map = {
-        a["question_id"]: (a.get("transcript") or "")
-        for a in answers
-    }
-
-    merged = []
-    for q in questions:
-        merged.append({
-            "attempt_id": q["attempt_id"],
-            "question_id": q["id"],
-            "question_text": q["question"],
-            "ideal_answer": q.get("ideal_answer", ""),
-            "user_transcript": answer_map.get(q["id"], "")
-        })
-
-    return merged
-
-
 # =====================================================
 # LLM SCORING
 # =====================================================
-async def llm_score_question(q_text, ideal_answer, user_answer):
+async def llm_score_question(q_text, ideal_answer, user_answer, coverage=None):
+
+    # With coverage computed, long texts are trimmed and the key-point analysis stands in for them
+    if coverage is not None:
+        ideal_answer = compact_text(ideal_answer)
+        user_answer = compact_text(user_answer)
+        analysis = f"\nCoverage analysis (embedding similarity, 0–1):\n{coverage_summary(coverage)}\n"
+    else:
+        analysis = ""
 
     prompt = f"""
 You are a strict scoring engine. 
@@ -153,15 +104,16 @@ Rules:
 Question: {q_text}
 Ideal Answer: {ideal_answer}
 User Answer: {user_answer}
-"""
-
-    raw = groq_raw(prompt)
+{analysis}"""
 
-    for _ in range(3):
+    # Transport retries live in the gateway; this only re-asks for malformed JSON,
+    # with a little temperature so the re-ask isn't the same deterministic output.
+    for attempt in range(SCORE_PARSE_ATTEMPTS):
+        raw = await groq_raw(prompt, temperature=0 if attempt == 0 else 0.3, hedge=True)
         try:
             return safe_parse_llm_json(raw)
-        except:
-            raw = groq_raw(prompt)
+        except ValueError:
+            LLM_RETRIES.inc(client="scoring_parse")
 
     raise ValueError("LLM failed to give valid JSON.")
 
@@ -169,50 +121,115 @@ User Answer: {user_answer}
 # =====================================================
 # SCORE ALL QUESTIONS — NOW WITH TOTALS
 # =====================================================
-async def score_all_llm(merged_data):
-
-    results = []
-    final_scores = []
-
-    total_clarity = 0
-    total_relevance = 0
-    total_depth = 0
-    total_structure = 0
-
-    for item in merged_data:
-        category_scores = await llm_score_question(
-            item["question_text"],
-            item["ideal_answer"],
-            item["user_transcript"]
-        )
-
-        # accumulate totals
-        total_clarity += category_scores["clarity"]
-        total_relevance += category_scores["relevance"]
-        total_depth += category_scores["depth"]
-        total_structure += category_scores["structure"]
-
-        item["category_scores"] = category_scores
-        results.append(item)
-        final_scores.append(category_scores["final_score"])
+async def score_all_llm(merged_data, on_scored=None):
+    """
+    Pre-scores key-point coverage for the whole attempt, settles skipped,
+    silent and verbatim answers deterministically, then scores the rest with the LLM while the
+    attempt's budget lasts. Answers the LLM can't score in time (or at all)
+    go to the local fallback scorer in one batch; each item records which
+    path scored it in `scored_by`. `on_scored(index, item)` is called as
+    each answer's scores become known.
+    """
+    notify = on_scored or (lambda index, item: None)
+    try:
+        await asyncio.to_thread(attach_coverage, merged_data)
+    except Exception as e:
+        # Coverage only sharpens the prompt; the LLM can still score without it
+        print(f"[Scoring] Coverage pre-scoring failed: {e}")
+
+    budget_end = time.monotonic() + SCORING_LLM_BUDGET
+    llm_down = FALLBACK_SCORING == "always"
+    fallback = []
+
+    for index, item in enumerate(merged_data):
+        coverage = item.get("coverage")
+        # Skipped and silent answers never reach the network
+        decided = coverage["deterministic"] if coverage else triage(item)
+        item["answer_status"] = ANSWER_STATUS.get(decided and decided["reason"], "answered")
+        if decided:
+            item["category_scores"] = dict(decided["scores"])
+            item["scored_by"] = "deterministic"
+            SCORING_DETERMINISTIC.inc(reason=decided["reason"])
+            notify(index, item)
+            continue
+
+        remaining = budget_end - time.monotonic()
+        if llm_down or remaining <= 0:
+            fallback.append((index, item))
+            SCORING_FALLBACKS.inc(reason="llm_unavailable" if llm_down else "budget")
+            continue
 
+        try:
+            item["category_scores"] = await asyncio.wait_for(
+                llm_score_question(item["question_text"], item["ideal_answer"], item["user_transcript"], coverage),
+                timeout=min(remaining, SCORE_DEADLINE),
+            )
+            item["scored_by"] = "llm"
+            record_llm_sample(item, item["category_scores"])
+            notify(index, item)
+        except (LLMUnavailable, TimeoutError, asyncio.TimeoutError) as e:
+            if FALLBACK_SCORING == "off":
+                raise
+            # Circuit open or too slow: don't spend more of the budget on this attempt
+            print(f"[Scoring] LLM unavailable, scoring the rest locally: {e!r}")
+            llm_down = True
+            fallback.append((index, item))
+            SCORING_FALLBACKS.inc(reason="llm_unavailable")
+        except (LLMError, ValueError) as e:
+            if FALLBACK_SCORING == "off":
+                raise
+            print(f"[Scoring] LLM scoring failed for question {item.get('question_id')}: {e}")
+            fallback.append((index, item))
+            SCORING_FALLBACKS.inc(reason="llm_error")
+
+    if fallback:
+        scores = await asyncio.to_thread(fallback_score_items, [item for _, item in fallback])
+        for (index, item), category_scores in zip(fallback, scores):
+            item["category_scores"] = category_scores
+            item["scored_by"] = "fallback"
+            notify(index, item)
+
+    results = merged_data
+    final_scores = [item["category_scores"]["final_score"] for item in results]
     overall_score = round(sum(final_scores) / len(final_scores), 2) if final_scores else 0
 
     return {
         "results": results,
         "overall_score": overall_score,
-        "total_clarity": total_clarity,
-        "total_relevance": total_relevance,
-        "total_depth": total_depth,
-        "total_structure": total_structure,
+        "total_clarity": sum(item["category_scores"]["clarity"] for item in results),
+        "total_relevance": sum(item["category_scores"]["relevance"] for item in results),
+        "total_depth": sum(item["category_scores"]["depth"] for item in results),
+        "total_structure": sum(item["category_scores"]["structure"] for item in results),
     }
 
 
 # =====================================================
 # FEEDBACK GENERATION
 # =====================================================
+def feedback_input(scored_items: List[Dict]) -> List[Dict]:
+    """What the feedback prompt sees per question: status, scores and a trimmed answer."""
+    rows = []
+    for item in scored_items:
+        row = {
+            "question": item["question_text"],
+            "answer_status": item.get("answer_status", "answered"),
+            "scores": item["category_scores"],
+        }
+        if row["answer_status"] == "answered":
+            row["answer"] = compact_text(item["user_transcript"], 60)
+            coverage = item.get("coverage")
+            if coverage and coverage["key_points"]:
+                row["missed_key_points"] = [k["point"] for k in coverage["key_points"] if not k["covered"]]
+        rows.append(row)
+    return rows
+
+
 async def generate_feedback(overall_score, scored_items):
 
+    if all(item.get("answer_status", "answered") != "answered" for item in scored_items):
+        # Nothing was answered: there is nothing for the LLM to analyse
+        return fallback_feedback(overall_score, scored_items)
+
     prompt = f"""
 # You are a professional interview evaluator.
 
@@ -248,20 +265,27 @@ async def generate_feedback(overall_score, scored_items):
 # - No emojis
 # - No JSON
 # - No markdown code blocks
+# - Questions whose answer_status is not "answered" were skipped or silent:
+#   mention how many in the summary and plan, but don't analyse their content
 
 # DATA:
 # Overall Score: {overall_score}
-# Question Scores: {json.dumps(scored_items, indent=2)}
+# Question Scores: {json.dumps(feedback_input(scored_items), indent=2)}
 # """
 
-    text = groq_raw(prompt, max_tokens=400)
+    try:
+        text = await groq_raw(prompt, max_tokens=400, deadline=FEEDBACK_DEADLINE)
+    except LLMError as e:
+        # Scores are still worth saving; fall back to feedback built from them
+        print(f"❌ Feedback generation failed: {e}")
+        return fallback_feedback(overall_score, scored_items)
     return text.replace("```", "").strip()
 
 
 # =====================================================
 # SAVE FEEDBACK
 # =====================================================
-def save_feedback_to_db(user_id, interview_id, attempt_id, overall_score, feedback_text, total_clarity, total_relevance, total_depth, total_structure):
+async def save_feedback_to_db(user_id, interview_id, attempt_id, overall_score, feedback_text, total_clarity, total_relevance, total_depth, total_structure):
 
     payload = {
         "user_id": user_id,
@@ -277,7 +301,7 @@ def save_feedback_to_db(user_id, interview_id, attempt_id, overall_score, feedba
     
     
     try:
-        res = supabase.table("feedback").insert(payload).execute()
+        res = await aexecute("feedback.insert", lambda db: db.table("feedback").insert(payload))
     except Exception as e:
         raise Exception(f"[Supabase] Failed to insert feedback: {e}")
 
@@ -295,14 +319,24 @@ def save_feedback_to_db(user_id, interview_id, attempt_id, overall_score, feedba
 # =====================================================
 # FULL SCORING PIPELINE
 # =====================================================
-async def run_full_scoring(attempt_id: str, user_id: str, interview_id: str):
+@traced("scoring.run_full_scoring")
+@profiled("scoring.run_full_scoring")
+async def run_full_scoring(attempt_id: str, user_id: str, interview_id: str, on_event=None):
+    """
+    Scores the attempt, writes feedback and saves it. `on_event(event, **data)`
+    receives progress ("scoring", one "question" per answer, "feedback").
+    """
+    emit = on_event or (lambda event, **data: None)
 
-    questions = await fetch_questions(attempt_id)
-    answers = await fetch_answers(attempt_id)
+    # One joined round trip (or a cache hit) instead of two queries + a Python join
+    merged = snapshot_to_scoring_items(await fetch_attempt_snapshot(attempt_id))
+    emit("scoring", questions=len(merged))
 
-    merged = merge_questions_and_answers(questions, answers)
+    def question_scored(index, item):
+        emit("question", index=index, questionId=item["question_id"], scores=item["category_scores"],
+             scoredBy=item["scored_by"], answerStatus=item["answer_status"])
 
-    scoring = await score_all_llm(merged)
+    scoring = await score_all_llm(merged, on_scored=question_scored)
 
     scored_items = scoring["results"]
     overall_score = scoring["overall_score"]
@@ -316,9 +350,10 @@ async def run_full_scoring(attempt_id: str, user_id: str, interview_id: str):
     }
 
 
+    emit("feedback", overall_score=overall_score)
     feedback_text = await generate_feedback(overall_score, scored_items)
 
-    save_feedback_to_db(
+    await save_feedback_to_db(
         user_id=user_id,
         interview_id=interview_id,
         attempt_id=attempt_id,
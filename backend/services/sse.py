@@ -0,0 +1,14 @@
+# backend/services/sse.py
+"""Server-sent event framing shared by the streaming endpoints."""
+
+import json
+from typing import Optional
+
+# Disables proxy buffering so each event reaches the client as it is written
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """One event frame; `event_id` lets a reconnecting client send Last-Event-ID."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
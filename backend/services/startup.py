@@ -0,0 +1,77 @@
+# backend/services/startup.py
+
+import os
+import sys
+import time
+import threading
+import functools
+from typing import Callable, Dict
+
+# Modules that should only ever appear in worker processes.
+HEAVY_MODULES = ["torch", "sentence_transformers", "sklearn", "kokoro", "kokoro_onnx", "onnxruntime", "faster_whisper"]
+
+PROCESS_START = time.perf_counter()
+
+_timings: Dict[str, float] = {}
+_timings_lock = threading.Lock()
+
+
+def record_timing(name: str, seconds: float):
+    with _timings_lock:
+        _timings[name] = round(seconds, 3)
+    print(f"[Startup] {name}: {seconds:.2f}s")
+
+
+def lazy_resource(name: str):
+    """
+    Decorator for zero-argument loader functions.
+    The first call builds the resource under a lock and records its load time;
+    every later call returns the same object.
+    """
+    def decorator(loader: Callable):
+        lock = threading.Lock()
+        holder = {}
+
+        @functools.wraps(loader)
+        def getter():
+            if "value" not in holder:
+                with lock:
+                    if "value" not in holder:
+                        start = time.perf_counter()
+                        holder["value"] = loader()
+                        record_timing(name, time.perf_counter() - start)
+            return holder["value"]
+
+        getter.is_loaded = lambda: "value" in holder
+        return getter
+
+    return decorator
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (Linux), falling back to peak RSS."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        return 0.0
+
+
+def startup_report() -> dict:
+    """Snapshot of load timings, memory and which heavy modules this process imported."""
+    with _timings_lock:
+        timings = dict(_timings)
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.perf_counter() - PROCESS_START, 3),
+        "rss_mb": _rss_mb(),
+        "timings": timings,
+        "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
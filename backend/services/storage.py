@@ -1,6 +1,11 @@
 import redis
 import os
-from supabase_client import supabase
+import hashlib
+from services.db import aexecute, execute
+from services.answer_buffer import buffer_answer_update
+from services.attempt_snapshot import invalidate_attempt_snapshot
+from services.tracing import span
+from services.metrics import TTS_CACHE_REQUESTS, TTS_CACHE_BYTES
 from uuid import UUID
 from typing import Optional, Union
 import uuid
@@ -17,27 +22,55 @@ def redis_key(interview_id: str, question_id: str):
     return f"tts:{interview_id}:{question_id}"
 
 
+def tts_job_id(interview_id: str, question_id: str):
+    """Stable RQ job id for a question's audio, so a queued job can be found and promoted."""
+    return f"tts-{interview_id}-{question_id}"
+
+
 def cache_audio(interview_id: str, question_id: str, wav_bytes: bytes):
     """Caches audio bytes in Redis with a 24-hour expiration."""
     # 86400 seconds = 24 hours
-    redis_client.setex(redis_key(interview_id, question_id), 86400, wav_bytes)
+    with span("redis.cache_audio", bytes=len(wav_bytes)):
+        redis_client.setex(redis_key(interview_id, question_id), 86400, wav_bytes)
+    TTS_CACHE_BYTES.inc(len(wav_bytes), op="write")
     print(f"[Redis] Cached audio for interview={interview_id}, question={question_id}")
 
 
 def get_cached_audio(interview_id: str, question_id: str):
     """Retrieves cached audio bytes from Redis."""
+    # Polled every second per waiting client: counted in metrics, not traced or printed
     audio = redis_client.get(redis_key(interview_id, question_id))
+    TTS_CACHE_REQUESTS.inc(result="hit" if audio else "miss")
     if audio:
-        print(f"[Redis] Cache hit for interview={interview_id}, question={question_id}")
-    else:
-        print(f"[Redis] Cache miss for interview={interview_id}, question={question_id}")
+        TTS_CACHE_BYTES.inc(len(audio), op="read")
     return audio
 
 
+# --- Sentence-level TTS cache (shared across questions) ---
+SENTENCE_AUDIO_TTL = int(os.getenv("SENTENCE_AUDIO_TTL", str(7 * 86400)))  # 7 days
+
+
+def sentence_audio_key(sentence: str, voice: str):
+    digest = hashlib.sha1(" ".join(sentence.split()).lower().encode("utf-8")).hexdigest()
+    return f"tts:sentence:{voice}:{digest}"
+
+
+def cache_sentence_audio(sentence: str, voice: str, pcm_bytes: bytes):
+    """Caches one sentence's int16 PCM so repeated intros/transitions are synthesized once."""
+    redis_client.setex(sentence_audio_key(sentence, voice), SENTENCE_AUDIO_TTL, pcm_bytes)
+
+
+def get_cached_sentence_audio(sentence: str, voice: str):
+    return redis_client.get(sentence_audio_key(sentence, voice))
+
+
 # --- Supabase Functions (Refactored for Robust Error Handling) ---
 
 def save_transcript_to_db(interview_id: str, question_id: str, text: str, user_id: str, attempt_id: str):
-    """Upserts transcript into Supabase 'answers' table."""
+    """
+    Upserts transcript into Supabase 'answers' table.
+    Goes through the write-behind buffer; writes directly if Redis is unavailable.
+    """
     data = {
         "interview_id": interview_id,
         "question_id": question_id,
@@ -47,10 +80,18 @@ def save_transcript_to_db(interview_id: str, question_id: str, text: str, user_i
     }
 
     try:
-        res = supabase.table("answers").upsert(
+        buffer_answer_update(attempt_id, question_id, interview_id=interview_id, user_id=user_id, transcript=text)
+        invalidate_attempt_snapshot(attempt_id)
+        return [data]
+    except redis.RedisError as e:
+        print(f"[AnswerBuffer] Buffer unavailable, writing transcript directly: {e}")
+
+    try:
+        res = execute("answers.upsert_transcript", lambda db: db.table("answers").upsert(
             data,
             on_conflict="attempt_id,question_id"
-        ).execute()
+        ))
+        invalidate_attempt_snapshot(attempt_id)
 
         return res.data
 
@@ -59,7 +100,7 @@ def save_transcript_to_db(interview_id: str, question_id: str, text: str, user_i
 
 
 
-def create_attempt_record_in_db(
+async def create_attempt_record_in_db(
     attempt_id: Union[str, UUID],
     interview_id: Union[str, UUID],
     user_id: Optional[Union[str, UUID]] = None
@@ -72,7 +113,7 @@ def create_attempt_record_in_db(
     }
 
     try:
-        res = supabase.table("attempts").insert(data).execute()
+        res = await aexecute("attempts.insert", lambda db: db.table("attempts").insert(data))
         print(f"[Supabase] Created new attempt record: {attempt_id}")
         return res.data
     except APIError as e:
@@ -80,14 +121,17 @@ def create_attempt_record_in_db(
         raise Exception(f"[Supabase] Failed to create attempt record: {e}")
 
 
-def update_attempt_status_to_completed(attempt_id: Union[str, UUID]):
+async def update_attempt_status_to_completed(attempt_id: Union[str, UUID]):
     """Mark attempt as completed in 'attempts' table."""
     update_data = {
         "status": "completed",
     }
 
     try:
-        res = supabase.table("attempts").update(update_data).eq("attempt_id", str(attempt_id)).execute()
+        res = await aexecute(
+            "attempts.update_status",
+            lambda db: db.table("attempts").update(update_data).eq("attempt_id", str(attempt_id)),
+        )
         print(f"[Supabase] Attempt {attempt_id} marked as completed")
         return res.data
     except APIError as e:
@@ -95,8 +139,8 @@ def update_attempt_status_to_completed(attempt_id: Union[str, UUID]):
         raise Exception(f"[Supabase] Failed to update attempt status: {e}")
 
 
-def save_chunks_to_supabase(chunks: list[str], user_id: str, pdf_upload_id: str, interview_id: Optional[str] = None):
-    """Save PDF chunks to Supabase 'pdf_chunks' table."""
+def save_chunks_to_supabase(chunks: list[str], user_id: str, pdf_upload_id: str, interview_id: Optional[str] = None, embeddings=None):
+    """Save PDF chunks (and their embeddings, when given) to Supabase 'pdf_chunks' table."""
     records = [
         {
             "id": str(uuid.uuid4()),
@@ -107,9 +151,12 @@ def save_chunks_to_supabase(chunks: list[str], user_id: str, pdf_upload_id: str,
         }
         for chunk in chunks
     ]
+    if embeddings is not None:
+        for record, vector in zip(records, embeddings):
+            record["embedding"] = [round(float(x), 6) for x in vector]
 
     try:
-        res = supabase.table("pdf_chunks").insert(records).execute()
+        res = execute("pdf_chunks.insert", lambda db: db.table("pdf_chunks").insert(records))
         print(f"[Supabase] Inserted {len(chunks)} chunks for pdf_upload_id={pdf_upload_id}")
         return res.data
     except APIError as e:
@@ -132,7 +179,7 @@ def save_chunk_metadata_to_supabase(metadata_list: list[dict], user_id: str, pdf
     ]
 
     try:
-        res = supabase.table("pdf_structured_data").insert(records).execute()
+        res = execute("pdf_structured_data.insert", lambda db: db.table("pdf_structured_data").insert(records))
         print(f"[Supabase] Inserted {len(metadata_list)} metadata rows for pdf_upload_id={pdf_upload_id}")
         return res.data
     except APIError as e:
@@ -140,15 +187,22 @@ def save_chunk_metadata_to_supabase(metadata_list: list[dict], user_id: str, pdf
     
     
 
-def mark_question_as_answered(attempt_id: str, question_id: str, interview_id: str, user_id: str):
+async def mark_question_as_answered(attempt_id: str, question_id: str, interview_id: str, user_id: str):
+    try:
+        buffer_answer_update(attempt_id, question_id, interview_id=interview_id, user_id=user_id, has_audio=True)
+        print("[DB] Marked answered (buffered)")
+        return
+    except redis.RedisError as e:
+        print(f"[AnswerBuffer] Buffer unavailable, writing has_audio directly: {e}")
+
     try:
-        supabase.table("answers").upsert({
+        await aexecute("answers.upsert_has_audio", lambda db: db.table("answers").upsert({
             "attempt_id": attempt_id,
             "interview_id": interview_id,
             "question_id": question_id,
             "user_id": user_id,
             "has_audio": True,
-        }, on_conflict="attempt_id,question_id").execute()
+        }, on_conflict="attempt_id,question_id"))
 
         print("[DB] Marked answered correctly")
 
@@ -158,14 +212,13 @@ def mark_question_as_answered(attempt_id: str, question_id: str, interview_id: s
 
 
 
-def get_previous_attempt_id(interview_id: str, user_id: str):
-    res = supabase.table("interview_attempts") \
+async def get_previous_attempt_id(interview_id: str, user_id: str):
+    res = await aexecute("interview_attempts.select_previous", lambda db: db.table("interview_attempts") \
         .select("attempt_id") \
         .eq("interview_id", interview_id) \
         .eq("user_id", user_id) \
         .order("created_at", desc=True) \
-        .limit(2) \
-        .execute()
+        .limit(2))
 
     # If user has less than 2 attempts → no previous attempt to reuse
     if not res.data or len(res.data) < 2:
@@ -0,0 +1,350 @@
+# backend/services/tracing.py
+"""
+Lightweight structured spans shared by the API and the RQ workers.
+
+    with span("whisper.transcribe", question_id=q):
+        ...
+
+The active span lives in a contextvar, so nested spans (including across
+awaits) get the right parent. scheduler.submit copies the current context
+into job.meta["trace"] and `job_span` continues it inside the worker, adding
+a synthetic "queue.wait" span for the time the job spent queued.
+
+Export is off by default. With TRACE_EXPORT=file, TRACE_SAMPLE_RATE of the
+new traces are kept (a client-supplied trace id is always kept), and
+finished spans are handed to a background writer thread that appends them
+as JSON lines to TRACE_EXPORT_PATH, one file shared by every local process
+and rotated to <path>.1 past TRACE_MAX_BYTES. Per-stage percentiles:
+
+    python -m services.tracing [path] [--root "POST /interview/answer"]
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import queue
+import atexit
+import random
+import secrets
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from services.latency import percentile
+
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "off")  # file | stdout | off
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces/spans.jsonl")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))  # share of new traces exported
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(64 * 1024 * 1024)))  # rotate past this size
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))  # spans waiting for the writer; more are dropped
+TRACE_REPORT_MAX_SPANS = int(os.getenv("TRACE_REPORT_MAX_SPANS", "50000"))
+
+_trace_id_re = re.compile(r"[0-9a-f]{32}")
+_current = contextvars.ContextVar("trace_span", default=None)  # (trace_id, span_id)
+# Active in traces that were not sampled: nested spans and jobs export nothing
+_UNSAMPLED = (None, None)
+
+_writer_lock = threading.Lock()
+_writer_pid = None
+_pending = None  # queue.Queue of JSON lines, one per process
+_dropped = 0
+
+
+def _new_id(nbytes: int) -> str:
+    return secrets.token_hex(nbytes)
+
+
+def valid_trace_id(value) -> bool:
+    """Trace ids are 32 lowercase hex chars; anything else (e.g. from a header) is rejected."""
+    return isinstance(value, str) and _trace_id_re.fullmatch(value) is not None
+
+
+def _write_lines(lines: list[str]):
+    if TRACE_EXPORT == "stdout":
+        for line in lines:
+            print(f"[Trace] {line}")
+        return
+    try:
+        directory = os.path.dirname(TRACE_EXPORT_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(TRACE_EXPORT_PATH) and os.path.getsize(TRACE_EXPORT_PATH) > TRACE_MAX_BYTES:
+            os.replace(TRACE_EXPORT_PATH, TRACE_EXPORT_PATH + ".1")
+        with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    except OSError as e:
+        print(f"[Trace] Export failed: {e}")
+
+
+def _writer_loop(pending: queue.Queue):
+    while True:
+        lines = [pending.get()]
+        while len(lines) < 500:
+            try:
+                lines.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        _write_lines(lines)
+        for _ in lines:
+            pending.task_done()
+
+
+def _writer_queue() -> queue.Queue:
+    """This process's span queue; started lazily, and again in a forked work horse."""
+    global _writer_pid, _pending
+    if _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer_pid != os.getpid():
+                _pending = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+                threading.Thread(target=_writer_loop, args=(_pending,), name="trace-writer", daemon=True).start()
+                _writer_pid = os.getpid()
+    return _pending
+
+
+def export_span(record: dict):
+    """Queues the span for the writer thread; never blocks the caller."""
+    global _dropped
+    if TRACE_EXPORT == "off":
+        return
+    try:
+        _writer_queue().put_nowait(json.dumps(record, default=str))
+    except queue.Full:
+        _dropped += 1
+        if _dropped % 1000 == 1:
+            print(f"[Trace] Writer behind, {_dropped} spans dropped so far")
+
+
+def flush_spans(timeout: float = 2.0):
+    """Waits for queued spans to be written (RQ work horses exit without atexit hooks)."""
+    if _pending is None or _writer_pid != os.getpid():
+        return
+    deadline = time.monotonic() + timeout
+    while _pending.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+atexit.register(flush_spans)
+
+
+def current_context():
+    """Serializable trace context of the active span (None outside a trace)."""
+    active = _current.get()
+    if active is None:
+        return None
+    if active is _UNSAMPLED:
+        return {"sampled": False}
+    return {"trace_id": active[0], "span_id": active[1]}
+
+
+def current_trace_id():
+    active = _current.get()
+    return active[0] if active else None
+
+
+@contextmanager
+def span(name: str, trace_id: str = None, **attrs):
+    """
+    Times the block as one span. Yields the attrs dict so the block can add
+    attributes (cache hit, bytes, token counts...) before the span closes.
+    """
+    parent = _current.get()
+    if TRACE_EXPORT == "off" or parent is _UNSAMPLED:
+        yield attrs
+        return
+    if parent is None and trace_id is None and random.random() >= TRACE_SAMPLE_RATE:
+        token = _current.set(_UNSAMPLED)
+        try:
+            yield attrs
+        finally:
+            _current.reset(token)
+        return
+
+    trace_id = trace_id or (parent[0] if parent else _new_id(16))
+    span_id = _new_id(8)
+    token = _current.set((trace_id, span_id))
+    start_wall = time.time()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attrs
+    except BaseException as e:
+        status = "error"
+        attrs["error"] = repr(e)[:200]
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current.reset(token)
+        export_span({
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent[1] if parent else None,
+            "name": name,
+            "start": round(start_wall, 6),
+            "duration_ms": round(duration * 1000, 3),
+            "status": status,
+            "pid": os.getpid(),
+            "attrs": attrs,
+        })
+
+
+def record_span(name: str, start_wall: float, duration: float, **attrs):
+    """Exports an already-measured span (e.g. queue wait) under the active span."""
+    parent = _current.get()
+    if TRACE_EXPORT == "off" or parent is None or parent is _UNSAMPLED:
+        return
+    export_span({
+        "trace_id": parent[0],
+        "span_id": _new_id(8),
+        "parent_id": parent[1],
+        "name": name,
+        "start": round(start_wall, 6),
+        "duration_ms": round(duration * 1000, 3),
+        "status": "ok",
+        "pid": os.getpid(),
+        "attrs": attrs,
+    })
+
+
+def traced(name: str):
+    """Decorator form of `span` for sync and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def job_span(name: str, **attrs):
+    """
+    Span for the body of an RQ job, continuing the trace of whoever enqueued it.
+    Also records how long the job waited in its queue.
+    """
+    from rq import get_current_job
+
+    if _current.get() is not None:
+        # Called inline from another job body: just a child span
+        with span(name, **attrs) as span_attrs:
+            yield span_attrs
+        return
+
+    job = get_current_job()
+    meta = (job.meta or {}) if job else {}
+    ctx = meta.get("trace") or {}
+    if ctx.get("sampled") is False:
+        token = _current.set(_UNSAMPLED)
+    else:
+        token = _current.set((ctx["trace_id"], ctx["span_id"])) if ctx.get("trace_id") else None
+    try:
+        if job is not None:
+            attrs.setdefault("queue", job.origin)
+            attrs.setdefault("job_id", job.id)
+            submitted = meta.get("submitted_at")
+            if ctx and submitted:
+                record_span("queue.wait", submitted, max(time.time() - submitted, 0.0), queue=job.origin)
+        with span(name, **attrs) as span_attrs:
+            yield span_attrs
+    finally:
+        if token is not None:
+            _current.reset(token)
+        flush_spans()
+
+
+def traced_job(name: str):
+    """Decorator form of `job_span` for RQ task functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with job_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# -------------------------------
+# Reporting
+# -------------------------------
+def load_spans(path: str = TRACE_EXPORT_PATH, limit: int = TRACE_REPORT_MAX_SPANS) -> list[dict]:
+    """The newest `limit` spans from the exporter file, reading only its tail."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        # Spans are a few hundred bytes; 1 KiB each leaves headroom
+        f.seek(max(size - limit * 1024, 0))
+        if f.tell():
+            f.readline()  # partial line
+        lines = deque((raw.decode("utf-8", "replace") for raw in f), maxlen=limit)
+    spans = []
+    for line in lines:
+        try:
+            spans.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # partially written line
+    return spans
+
+
+def _summary(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 1),
+        "p95_ms": round(percentile(values, 95), 1),
+        "p99_ms": round(percentile(values, 99), 1),
+        "max_ms": round(values[-1], 1),
+    }
+
+
+def stage_percentiles(spans: list[dict], root: str = None) -> dict:
+    """
+    p50/p95/p99 per span name. With `root`, only spans from traces that
+    contain a span of that name, plus the root-to-last-span total.
+    """
+    if root:
+        trace_ids = {s["trace_id"] for s in spans if s["name"] == root}
+        spans = [s for s in spans if s["trace_id"] in trace_ids]
+
+    by_name = defaultdict(list)
+    for s in spans:
+        by_name[s["name"]].append(s["duration_ms"])
+    report = {name: _summary(values) for name, values in sorted(by_name.items())}
+
+    if root:
+        bounds = {}
+        for s in spans:
+            end = s["start"] + s["duration_ms"] / 1000
+            lo, hi = bounds.get(s["trace_id"], (s["start"], end))
+            bounds[s["trace_id"]] = (min(lo, s["start"]), max(hi, end))
+        if bounds:
+            report["end_to_end"] = _summary([(hi - lo) * 1000 for lo, hi in bounds.values()])
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    root = None
+    if "--root" in args:
+        i = args.index("--root")
+        root = args[i + 1]
+        del args[i:i + 2]
+    path = args[0] if args else TRACE_EXPORT_PATH
+
+    report = stage_percentiles(load_spans(path), root)
+    print(f"{'stage':<40} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, s in report.items():
+        print(f"{name:<40} {s['count']:>7} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
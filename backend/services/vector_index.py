@@ -0,0 +1,120 @@
+# backend/services/vector_index.py
+"""
+In-process vector index over an interview's pdf_chunks.
+
+Embeddings are stored in pdf_chunks.embedding by the PDF worker; the API
+process only reads them (see API_INLINE_EMBEDDINGS). The first
+query for an interview loads them once (Redis blob, else Supabase) into a
+normalized float32 matrix that PDF context selection ranks chunks against.
+"""
+
+import os
+import json
+import asyncio
+import threading
+from collections import OrderedDict
+import numpy as np
+import redis
+from services.db import aexecute
+from services.embedding_cache import request_embeddings
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+INDEX_CACHE_SIZE = int(os.getenv("VECTOR_INDEX_CACHE_SIZE", "64"))  # interviews kept in memory
+INDEX_TTL = 7 * 86400
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=False)
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _blob_key(interview_id: str) -> str:
+    return f"vindex:{interview_id}"
+
+
+def _version_key(interview_id: str) -> str:
+    return f"vindex:version:{interview_id}"
+
+
+def invalidate_chunk_index(interview_id: str):
+    """Called when an interview's chunks change; every process reloads on its next query."""
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.incr(_version_key(interview_id))
+    pipe.delete(_blob_key(interview_id))
+    pipe.execute()
+
+
+def _parse_embedding(value):
+    # PostgREST returns pgvector columns as the string "[0.1,0.2,...]"
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def build_index(ids: list[str], matrix: np.ndarray) -> dict:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return {"ids": ids, "matrix": (matrix / np.maximum(norms, 1e-8)).astype(np.float32)}
+
+
+async def _load_from_db(interview_id: str) -> dict:
+    res = await aexecute("pdf_chunks.select_embeddings", lambda db: (
+        db.table("pdf_chunks").select("id, chunk_text, embedding").eq("interview_id", interview_id)
+    ))
+    rows = res.data or []
+    if not rows:
+        return build_index([], np.empty((0, 0), dtype=np.float32))
+
+    vectors = [_parse_embedding(r.get("embedding")) for r in rows]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        # Chunks saved before embeddings were persisted: embedding cache, or
+        # encoded in-process when API_INLINE_EMBEDDINGS is on
+        fresh = await asyncio.to_thread(request_embeddings, [rows[i].get("chunk_text") or "" for i in missing])
+        for i, vec in zip(missing, fresh):
+            vectors[i] = vec
+
+    kept = [i for i, v in enumerate(vectors) if v is not None]
+    if len(kept) < len(rows):
+        print(f"[VectorIndex] {len(rows) - len(kept)} chunks of {interview_id} have no embedding, left out")
+    if not kept:
+        return build_index([], np.empty((0, 0), dtype=np.float32))
+    return build_index([str(rows[i]["id"]) for i in kept], np.vstack([vectors[i] for i in kept]))
+
+
+async def load_chunk_index(interview_id: str) -> dict:
+    """Returns {"ids": [...], "matrix": normalized float32 [n, dim]} for an interview."""
+    version = redis_client.get(_version_key(interview_id)) or b"0"
+
+    with _indexes_lock:
+        entry = _indexes.get(interview_id)
+        if entry and entry["version"] == version:
+            _indexes.move_to_end(interview_id)
+            return entry["index"]
+
+    blob = redis_client.hgetall(_blob_key(interview_id))
+    if blob:
+        ids = json.loads(blob[b"ids"])
+        dim = int(blob[b"dim"])
+        matrix = np.frombuffer(blob[b"matrix"], dtype=np.float16).astype(np.float32).reshape(len(ids), dim)
+        index = {"ids": ids, "matrix": matrix}
+    else:
+        index = await _load_from_db(interview_id)
+        if index["ids"]:
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.hset(_blob_key(interview_id), mapping={
+                "ids": json.dumps(index["ids"]),
+                "dim": index["matrix"].shape[1],
+                "matrix": index["matrix"].astype(np.float16).tobytes(),
+            })
+            pipe.expire(_blob_key(interview_id), INDEX_TTL)
+            pipe.execute()
+
+    with _indexes_lock:
+        _indexes[interview_id] = {"version": version, "index": index}
+        _indexes.move_to_end(interview_id)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
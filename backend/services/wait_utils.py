@@ -1,27 +1,21 @@
 import asyncio
 
 async def wait_for_required_transcripts(attempt_id: str, timeout=60):
-    from services.scoring_service import fetch_answers, fetch_questions
+    from services.attempt_snapshot import fetch_attempt_snapshot
     
     for _ in range(timeout):
-        questions = await fetch_questions(attempt_id)
-        answers = await fetch_answers(attempt_id)
-
-        ans_map = {a["question_id"]: a for a in answers}
+        # Cached between transcript writes, so polling rarely hits the DB
+        rows = await fetch_attempt_snapshot(attempt_id)
 
         all_done = True
 
-        for q in questions:
-            qid = q["id"]
-
-            a = ans_map.get(qid)
-
+        for row in rows:
             # User skipped this question → don't wait
-            if not a or not a.get("has_audio"):
+            if not row.get("has_audio"):
                 continue
 
             # User answered but transcript not ready → wait
-            if not a.get("transcript"):
+            if not row.get("transcript"):
                 all_done = False
 
         if all_done:
@@ -0,0 +1,21 @@
+-- Questions joined with their answers, one row per question.
+-- Lets the scoring path load an attempt in a single PostgREST round trip:
+--   GET /rest/v1/attempt_snapshot?attempt_id=eq.<id>&order=created_at
+-- security_invoker keeps the RLS policies of the underlying tables in force.
+
+create or replace view public.attempt_snapshot
+with (security_invoker = true) as
+select
+    q.id            as question_id,
+    q.attempt_id,
+    q.interview_id,
+    q.question,
+    q.ideal_answer,
+    q.created_at,
+    a.transcript,
+    a.has_audio,
+    q.key_points    -- appended last: create or replace view can only add columns at the end
+from public.questions q
+left join public.answers a
+    on a.attempt_id = q.attempt_id
+   and a.question_id = q.id;
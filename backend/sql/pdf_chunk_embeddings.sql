@@ -0,0 +1,7 @@
+-- Persist chunk embeddings next to the text so nothing has to be re-embedded.
+-- all-MiniLM-L6-v2 produces 384-dimensional vectors.
+
+create extension if not exists vector;
+
+alter table public.pdf_chunks
+    add column if not exists embedding vector(384);
@@ -1,12 +1,25 @@
 import os
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient, ClientOptions, AsyncClientOptions
 from dotenv import load_dotenv
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Sync client — RQ workers and scripts
+supabase: Client = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT),
+)
 
 
+async def create_async_supabase() -> AsyncClient:
+    """Async client for code running on an event loop (FastAPI handlers)."""
+    return await acreate_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=AsyncClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT),
+    )
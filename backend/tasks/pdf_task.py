@@ -1,9 +1,13 @@
 # tasks.py
 import os
 import json
-from services.pdf_parser import parse_pdf_to_chunks
+from services.pdf_parser import parse_pdf_to_chunks_agglomerative, encode_texts, encode_documents
+from services.vector_index import invalidate_chunk_index
+from question_generation.context_selection import topic_query
 from services.llm_utils import generate_chunk_metadata
 from services.storage import save_chunks_to_supabase, save_chunk_metadata_to_supabase
+from services.tracing import traced_job
+from services.profiling import profiled
 import redis
 from supabase_client import supabase
 from postgrest.exceptions import APIError
@@ -11,17 +15,44 @@ from postgrest.exceptions import APIError
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/1")
 redis_conn = redis.Redis.from_url(REDIS_URL)
 
+def embedding_summary(stats: dict) -> dict:
+    """Cache hit rate and encode time for the status payload."""
+    hits = stats.get("cache_hits", 0)
+    misses = stats.get("cache_misses", 0)
+    total = hits + misses
+    return {
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "cache_hit_rate": round(hits / total, 3) if total else 0.0,
+        "encode_seconds": stats.get("encode_seconds", 0.0),
+    }
+
+@traced_job("pdf.parsing_task")
+@profiled("pdf.parsing_task")
 def pdf_parsing_task(temp_file_path: str, redis_key: str, user_id: str, pdf_upload_id: str, interview_id: str = None):
     try:
         print(f"[DEBUG] Starting PDF parsing task for file: {temp_file_path}")
         
         # Step 1: Parse PDF into chunks
-        chunks = parse_pdf_to_chunks(temp_file_path)
+        embed_stats = {}
+        chunks = parse_pdf_to_chunks_agglomerative(temp_file_path, stats=embed_stats)
         total_chunks = len(chunks)
-        print(f"[DEBUG] Total chunks extracted: {total_chunks}")
+
+        # Embeddings of the final chunks are persisted for the vector index; merged
+        # chunks run past the model's input window, so they are embedded in windows
+        chunk_embeddings = encode_documents(chunks, embed_stats) if chunks else None
+        embedding = embedding_summary(embed_stats)
+        print(f"[DEBUG] Total chunks extracted: {total_chunks}, embedding: {embedding}")
+        redis_conn.set(redis_key, json.dumps({
+            "status": "processing",
+            "progress": 0,
+            "embedding": embedding
+        }), ex=3600)
 
         # Step 2: Save raw chunks
-        save_chunks_to_supabase(chunks, user_id, pdf_upload_id, interview_id)
+        save_chunks_to_supabase(chunks, user_id, pdf_upload_id, interview_id, embeddings=chunk_embeddings)
+        if interview_id:
+            invalidate_chunk_index(interview_id)
         print(f"[DEBUG] Saved raw chunks to Supabase for user_id={user_id}")
 
         # Step 3: Generate metadata for each chunk
@@ -46,7 +77,8 @@ def pdf_parsing_task(temp_file_path: str, redis_key: str, user_id: str, pdf_uplo
             progress = round((idx + 1) / total_chunks * 100)
             redis_conn.set(redis_key, json.dumps({
                 "status": "processing",
-                "progress": progress
+                "progress": progress,
+                "embedding": embedding
             }), ex=3600)
             print(f"[DEBUG] Updated Redis progress: {progress}%")
 
@@ -54,8 +86,11 @@ def pdf_parsing_task(temp_file_path: str, redis_key: str, user_id: str, pdf_uplo
         save_chunk_metadata_to_supabase(metadata_data, user_id, pdf_upload_id, interview_id)
         print(f"[DEBUG] Saved metadata to Supabase for user_id={user_id}")
 
+        # Pre-embed the topic query so /pdf-questions finds it in the embedding cache
+        encode_texts([topic_query(metadata_data)])
+
         # Step 5: Mark task done
-        redis_conn.set(redis_key, json.dumps({"status": "done"}), ex=3600)
+        redis_conn.set(redis_key, json.dumps({"status": "done", "embedding": embedding}), ex=3600)
         print(f"[DEBUG] PDF parsing task completed successfully")
 
     except Exception as e:
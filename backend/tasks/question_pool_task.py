@@ -0,0 +1,40 @@
+# backend/tasks/question_pool_task.py
+import asyncio
+from question_generation.generate_questions import llm_generate_questions
+from question_generation.question_pool import add_to_pool, refill_done
+from services.pdf_parser import encode_texts
+from services.llm_gateway import aclose_client
+
+REFILL_BATCH_SIZE = 10
+
+
+async def _generate(role: str, techstack: list[str], interview_type: str):
+    try:
+        return await llm_generate_questions(role, techstack, interview_type, REFILL_BATCH_SIZE)
+    finally:
+        await aclose_client()  # the loop ends with this job
+
+
+def refill_question_pool_task(role: str, techstack: list[str], interview_type: str):
+    """
+    Generates one extra question set in the background and adds it to the pool.
+    Runs in RQ worker process.
+    """
+    try:
+        questions = asyncio.run(_generate(role, techstack, interview_type))
+        add_to_pool(role, techstack, interview_type, questions)
+        print(f"[RQ] Question pool refilled with {len(questions)} questions for {role} / {interview_type}")
+        # Embedded here so the API's near-duplicate filter finds them in the cache
+        encode_texts([q["question"] for q in questions])
+    except Exception as e:
+        print(f"[RQ] Question pool refill error: {e}")
+    finally:
+        refill_done(role, techstack, interview_type)
+
+
+def embed_questions_task(texts: list[str]):
+    """
+    Encodes question texts into the embedding cache for the API's near-duplicate filter.
+    Runs in RQ worker process, which already has the model loaded.
+    """
+    encode_texts(texts)
@@ -0,0 +1,51 @@
+# backend/tasks/scoring_task.py
+import asyncio
+from rq import get_current_job
+from services.scoring_service import run_full_scoring
+from services.scoring_progress import publish_event, store_result, release_claim, keep_claim
+from services.wait_utils import wait_for_required_transcripts
+from services.tracing import traced_job
+from services.llm_gateway import aclose_client
+
+TRANSCRIPT_WAIT_SECONDS = 60
+
+
+@traced_job("scoring.complete_attempt_task")
+def complete_attempt_task(attempt_id: str, user_id: str, interview_id: str):
+    """
+    Waits for outstanding transcripts, scores the attempt and stores the result.
+    Progress goes to scoring:events:<attempt_id> for the SSE endpoint.
+    Runs in RQ worker process.
+    """
+    def emit(event: str, **data):
+        publish_event(attempt_id, event, **data)
+
+    async def run():
+        try:
+            emit("waiting_transcripts")
+            ready = await wait_for_required_transcripts(attempt_id, timeout=TRANSCRIPT_WAIT_SECONDS)
+            if not ready:
+                print(f"[RQ] Transcripts still missing for attempt {attempt_id}, scoring what is there")
+            return await run_full_scoring(attempt_id=attempt_id, user_id=user_id, interview_id=interview_id, on_event=emit)
+        finally:
+            await aclose_client()
+
+    try:
+        result = asyncio.run(run())
+    except Exception as e:
+        print(f"[RQ] Scoring failed for attempt {attempt_id}: {e}")
+        emit("error", detail=str(e))
+        job = get_current_job()
+        if job is not None:
+            # A later /complete_attempt may retry
+            release_claim(attempt_id, job.id)
+        raise
+
+    result = {"attemptId": attempt_id, **result}
+    store_result(attempt_id, result)
+    job = get_current_job()
+    if job is not None:
+        keep_claim(attempt_id, job.id)
+    emit("done", overall_score=result["overall_score"])
+    print(f"[RQ] Scoring complete for attempt {attempt_id}: {result['overall_score']}")
+    return {"attemptId": attempt_id, "overall_score": result["overall_score"]}
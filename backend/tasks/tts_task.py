@@ -1,23 +1,148 @@
 # backend/tasks/tts_task.py
-from kokoro_local import tts_to_wav
-from services.storage import cache_audio
+import re
+import time
+import numpy as np
+from rq import get_current_job
+from rq.job import Dependency
+from kokoro_local import tts_to_pcm, pcm_to_wav, SAMPLE_RATE
+from services.storage import cache_audio, cache_sentence_audio, get_cached_sentence_audio
+from services.tracing import span, traced_job
+from services.scheduler import submit, QueueFull
+from services.profiling import profiled
+from services.metrics import TTS_AUDIO_SECONDS, TTS_SYNTH_SECONDS, TTS_SPEED
 import redis
 import os
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 redis_conn = redis.Redis.from_url(REDIS_URL)
 
+DEFAULT_VOICE = "af_heart"
+MIN_SENTENCE_CHARS = 25          # shorter fragments are merged into a neighbour
+SENTENCE_GAP_SECONDS = 0.12      # pause inserted between reassembled sentences
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split on sentence punctuation/newlines, merging fragments too short to be worth a job."""
+    parts = [p.strip() for p in re.split(r"(?<=[.!?])\s+|\n+", text) if p.strip()]
+
+    sentences = []
+    for part in parts:
+        if sentences and len(sentences[-1]) < MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def _pcm_to_bytes(audio: np.ndarray) -> bytes:
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def _bytes_to_pcm(raw: bytes) -> np.ndarray:
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32767
+
+
+def synthesize_sentence(sentence: str, voice: str = DEFAULT_VOICE) -> bytes:
+    """Returns cached int16 PCM for a sentence, synthesizing and caching it on a miss."""
+    cached = get_cached_sentence_audio(sentence, voice)
+    if cached:
+        return cached
+
+    start = time.perf_counter()
+    with span("tts.synthesize", chars=len(sentence)):
+        audio = tts_to_pcm(sentence, voice)
+    synth_seconds = time.perf_counter() - start
+    audio_seconds = len(audio) / SAMPLE_RATE
+
+    TTS_AUDIO_SECONDS.inc(audio_seconds)
+    TTS_SYNTH_SECONDS.inc(synth_seconds)
+    if synth_seconds > 0:
+        TTS_SPEED.observe(audio_seconds / synth_seconds)
+
+    pcm_bytes = _pcm_to_bytes(audio)
+    cache_sentence_audio(sentence, voice, pcm_bytes)
+    return pcm_bytes
+
+
+@traced_job("tts.sentence_task")
+def synthesize_sentence_task(sentence: str, voice: str = DEFAULT_VOICE):
+    """Sub-job: synthesize one sentence into the sentence cache."""
+    synthesize_sentence(sentence, voice)
+
+
+@traced_job("tts.assemble_task")
+def assemble_audio_task(sentences: list[str], interview_id: str, question_id: str, voice: str = DEFAULT_VOICE):
+    """
+    Concatenates cached sentence audio in order and caches the question WAV.
+    Sentences whose sub-job failed are synthesized inline.
+    """
+    try:
+        gap = np.zeros(int(SAMPLE_RATE * SENTENCE_GAP_SECONDS), dtype=np.float32)
+        pieces = []
+        for idx, sentence in enumerate(sentences):
+            if idx:
+                pieces.append(gap)
+            pieces.append(_bytes_to_pcm(synthesize_sentence(sentence, voice)))
+
+        cache_audio(interview_id, question_id, pcm_to_wav(np.concatenate(pieces)))
+        print(f"[RQ] Audio assembled for {interview_id}-{question_id} ({len(sentences)} sentences)")
+    except Exception as e:
+        print(f"[RQ] TTS assembly error: {e}")
+
+
+@traced_job("tts.task")
+@profiled("tts.task")
 def generate_audio_task(text: str, interview_id: str, question_id: str):
     """
     Heavy TTS task for Kokoro 82M.
     Runs in RQ worker process.
+
+    Multi-sentence texts are fanned out: this job synthesizes the first
+    uncached sentence itself, enqueues the rest as sub-jobs on the same
+    queue, and an assemble job stitches the audio once they finish.
     """
     try:
-        wav_bytes = tts_to_wav(text)
-        cache_audio(interview_id, question_id, wav_bytes)
-        print(f"[RQ] Audio generated for {interview_id}-{question_id}")
-    except Exception as e:
-        print(f"[RQ] TTS generation error: {e}")
+        sentences = split_sentences(text) or [text]
+        missing = [s for s in dict.fromkeys(sentences) if not get_cached_sentence_audio(s, DEFAULT_VOICE)]
 
+        job = get_current_job()
+        if len(missing) <= 1 or job is None:
+            # Nothing worth parallelising (or not running under RQ)
+            assemble_audio_task(sentences, interview_id, question_id)
+            return
 
+        # Sub-jobs keep the parent's class and jump the queue, so this question's
+        # remaining sentences aren't stuck behind other questions' parent jobs.
+        # No owner: the parent already counts against the interview's fair share.
+        priority = (job.meta or {}).get("priority", "live")
+        try:
+            sub_jobs = [
+                submit("tts", priority, synthesize_sentence_task, sentence, DEFAULT_VOICE, at_front=True)
+                for sentence in reversed(missing[1:])
+            ][::-1]
+        except QueueFull as e:
+            print(f"[RQ] Sentence fan-out refused ({e}), synthesizing inline")
+            assemble_audio_task(sentences, interview_id, question_id)
+            return
+        # Recorded under this job's id so /ws can still promote the work once this job is done
+        job.meta["follow_ups"] = [sub.id for sub in sub_jobs]
+        job.save_meta()
+        synthesize_sentence(missing[0], DEFAULT_VOICE)
 
+        try:
+            assemble = submit(
+                "tts", priority, assemble_audio_task,
+                sentences, interview_id, question_id,
+                depends_on=Dependency(jobs=sub_jobs, allow_failure=True, enqueue_at_front=True),
+                at_front=True,
+            )
+        except QueueFull as e:
+            # The sub-jobs filled the queue; waiting on them inline still caches the WAV
+            print(f"[RQ] Assembly refused ({e}), assembling inline")
+            assemble_audio_task(sentences, interview_id, question_id)
+            return
+        job.meta["follow_ups"].append(assemble.id)
+        job.save_meta()
+        print(f"[RQ] Fanned out {len(sub_jobs)} sentence jobs for {interview_id}-{question_id}")
+    except Exception as e:
+        print(f"[RQ] TTS generation error: {e}")
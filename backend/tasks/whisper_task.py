@@ -1,39 +1,57 @@
 # tasks/whisper_task.py
 
 import os
-from faster_whisper import WhisperModel
 from services.WhisperModel import transcribe_with_model
 from services.storage import save_transcript_to_db
+from services.startup import lazy_resource
+from services.tracing import span, traced_job
+from services.profiling import profiled
+from services.metrics import WHISPER_RTF, WHISPER_AUDIO_SECONDS
 
 # -----------------------------------------------------
-# LOAD WHISPER MODEL ONCE WHEN THE WORKER STARTS
+# LOAD WHISPER MODEL ONCE PER WORKER (ON FIRST USE)
 # -----------------------------------------------------
 
-print("🎤 Loading Whisper Model in worker...")
-
 model_size = os.getenv("WHISPER_MODEL_SIZE", "medium") 
 device = os.getenv("WHISPER_DEVICE", "cpu")        
 compute_type = os.getenv("WHISPER_COMPUTE_TYPE", "int8") 
+cpu_threads = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2 default
+
 
-model = WhisperModel(
-    model_size,
-    device=device,
-    compute_type=compute_type
-)
+@lazy_resource(f"model:whisper-{model_size}")
+def get_whisper_model():
+    from faster_whisper import WhisperModel
 
-print("✅ Whisper Model Loaded in worker.")
+    print("🎤 Loading Whisper Model in worker...")
+    model = WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads
+    )
+    print("✅ Whisper Model Loaded in worker.")
+    return model
 
 # -----------------------------------------------------
 # TASK: TRANSCRIBE AUDIO FILE
 # -----------------------------------------------------
 
+@traced_job("whisper.task")
+@profiled("whisper.task")
 def whisper_transcribe_task(file_path, interview_id, question_id, user_id, attempt_id):
     """
-    Runs Whisper ASR using the preloaded model.
+    Runs Whisper ASR using the worker's cached model.
     Saves transcript to the DB.
     """
     try:
-        transcript = transcribe_with_model(model, file_path)
+        model = get_whisper_model()
+        stats = {}
+        with span("whisper.transcribe", model=model_size, question_id=question_id, attempt_id=attempt_id) as attrs:
+            transcript = transcribe_with_model(model, file_path, stats)
+            attrs.update(stats)
+        if stats.get("audio_seconds"):
+            WHISPER_AUDIO_SECONDS.inc(stats["audio_seconds"])
+            WHISPER_RTF.observe(stats["transcribe_seconds"] / stats["audio_seconds"], model=model_size)
         save_transcript_to_db(interview_id, question_id, transcript, user_id, attempt_id)
         print(f"[RQ] Whisper transcription complete for Q:{question_id}")
         return transcript
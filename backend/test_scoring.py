@@ -89,4 +89,6 @@ async def run_batch_test():
     print("\n🔥 Test Complete!")
 
 
-asyncio.run(run_batch_test())
+# Live Groq calls: only when run as a script, never on import (e.g. test collection)
+if __name__ == "__main__":
+    asyncio.run(run_batch_test())
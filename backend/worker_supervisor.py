@@ -0,0 +1,239 @@
+# backend/worker_supervisor.py
+"""
+Local supervisor for the Whisper / TTS / PDF worker pools.
+
+    python worker_supervisor.py
+
+Keeps between WORKERS_<KIND>_MIN and WORKERS_<KIND>_MAX preloaded workers
+(run_worker.py) per kind. Every SUPERVISOR_INTERVAL seconds it reads queue
+depth, oldest job age and job durations, checks CPU and memory headroom,
+and adds or retires at most one worker per kind. Each decision and the
+signals behind it are published to Redis (see GET /worker-pool).
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import subprocess
+import redis
+from rq import Worker
+from services.scheduler import JOB_KINDS, queue_depth, oldest_job_age, kind_duration_summary
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_worker.py")
+
+SUPERVISOR_INTERVAL = float(os.getenv("SUPERVISOR_INTERVAL", "5"))
+SCALE_COOLDOWN = float(os.getenv("SUPERVISOR_COOLDOWN", "20"))         # seconds between changes per kind
+SCALE_DOWN_IDLE = float(os.getenv("SUPERVISOR_SCALE_DOWN_IDLE", "60"))  # empty queue this long before retiring
+CPU_HIGH = float(os.getenv("SUPERVISOR_CPU_HIGH", "0.85"))              # 1-min load per core
+MEMORY_RESERVE_MB = float(os.getenv("SUPERVISOR_MEMORY_RESERVE_MB", "512"))
+BACKLOG_PER_WORKER = int(os.getenv("SUPERVISOR_BACKLOG_PER_WORKER", "2"))
+
+# Per kind: pool bounds, queue wait we try to stay under, and RSS of one preloaded worker
+POOL_CONFIG = {
+    kind: {
+        "min": int(os.getenv(f"WORKERS_{kind.upper()}_MIN", "1")),
+        "max": int(os.getenv(f"WORKERS_{kind.upper()}_MAX", str(default_max))),
+        "target_wait": float(os.getenv(f"WORKERS_{kind.upper()}_TARGET_WAIT", str(target_wait))),
+        "worker_mb": float(os.getenv(f"WORKERS_{kind.upper()}_MB", str(worker_mb))),
+    }
+    for kind, default_max, target_wait, worker_mb in [
+        ("tts", 4, 2.0, 900),
+        ("whisper", 3, 3.0, 1500),
+        ("pdf", 2, 60.0, 700),
+        ("scoring", 3, 5.0, 600),
+        ("question", 1, 120.0, 300),
+    ]
+}
+
+STATE_KEY = "supervisor:state"
+DECISIONS_KEY = "supervisor:decisions"
+DECISION_HISTORY = 200
+
+redis_conn = redis.Redis.from_url(REDIS_URL)
+
+
+# -------------------------------
+# Host headroom
+# -------------------------------
+def cpu_load() -> float:
+    """1-minute load average per core."""
+    try:
+        return round(os.getloadavg()[0] / (os.cpu_count() or 1), 3)
+    except OSError:
+        return 0.0
+
+
+def memory_available_mb() -> float:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return float("inf")
+
+
+# -------------------------------
+# Scaling policy
+# -------------------------------
+def decide(kind: str, signals: dict, current: int, idle_for: float) -> tuple[int, str]:
+    """Returns (target pool size, reason). Moves by at most one worker."""
+    cfg = POOL_CONFIG[kind]
+
+    if current < cfg["min"]:
+        return cfg["min"], "below minimum"
+    if current > cfg["max"]:
+        return cfg["max"], "above maximum"
+
+    behind = signals["oldest_job_age_s"] > cfg["target_wait"] or signals["waiting"] > current * BACKLOG_PER_WORKER
+    if signals["waiting"] and behind:
+        if current >= cfg["max"]:
+            return current, "backlog but at maximum"
+        if signals["memory_available_mb"] < cfg["worker_mb"] + MEMORY_RESERVE_MB:
+            return current, "backlog but no memory headroom"
+        if signals["cpu_load"] > CPU_HIGH:
+            return current, "backlog but no cpu headroom"
+        return current + 1, "backlog"
+
+    if not signals["waiting"] and signals["busy"] < current and idle_for >= SCALE_DOWN_IDLE and current > cfg["min"]:
+        return current - 1, f"queue empty for {int(idle_for)}s"
+
+    return current, "steady"
+
+
+# -------------------------------
+# Worker pool
+# -------------------------------
+class WorkerPool:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.procs: dict[str, subprocess.Popen] = {}
+        self.serial = 0
+        self.last_change = 0.0
+        self.idle_since = time.monotonic()
+
+    def _worker_state(self, name: str) -> str:
+        worker = Worker.find_by_key(Worker.redis_worker_namespace_prefix + name, connection=redis_conn)
+        return worker.get_state() if worker else "starting"
+
+    def reap(self):
+        """Forgets workers that exited; the next tick's minimum check replaces them."""
+        for name, proc in list(self.procs.items()):
+            if proc.poll() is not None:
+                print(f"[Supervisor] {name} exited with code {proc.returncode}")
+                del self.procs[name]
+
+    def busy_count(self) -> int:
+        return sum(1 for name in self.procs if self._worker_state(name) == "busy")
+
+    def spawn(self):
+        self.serial += 1
+        name = f"{self.kind}-{socket.gethostname()}-{os.getpid()}-{self.serial}"
+        env = {**os.environ, "RQ_WORKER_NAME": name}
+        self.procs[name] = subprocess.Popen([sys.executable, WORKER_SCRIPT, self.kind], env=env, cwd=os.path.dirname(WORKER_SCRIPT))
+        print(f"[Supervisor] Started {name}")
+
+    def retire(self):
+        """Warm-stops an idle worker (newest first); RQ finishes any current job before exiting."""
+        for name in reversed(list(self.procs)):
+            if self._worker_state(name) != "busy":
+                self.procs.pop(name).send_signal(signal.SIGTERM)
+                print(f"[Supervisor] Retiring {name}")
+                return True
+        return False
+
+    def stop_all(self):
+        for proc in self.procs.values():
+            proc.send_signal(signal.SIGTERM)
+        for proc in self.procs.values():
+            proc.wait()
+
+
+def collect_signals(pool: WorkerPool) -> dict:
+    return {
+        "waiting": queue_depth(pool.kind),
+        "oldest_job_age_s": round(oldest_job_age(pool.kind), 2),
+        "busy": pool.busy_count(),
+        "durations": kind_duration_summary(pool.kind),
+        "cpu_load": cpu_load(),
+        "memory_available_mb": memory_available_mb(),
+    }
+
+
+def tick(pools: dict) -> dict:
+    state = {"timestamp": time.time(), "pools": {}}
+    now = time.monotonic()
+
+    for kind, pool in pools.items():
+        pool.reap()
+        signals = collect_signals(pool)
+        if signals["waiting"] or signals["busy"]:
+            pool.idle_since = now
+
+        current = len(pool.procs)
+        target, reason = decide(kind, signals, current, now - pool.idle_since)
+
+        # Bounds are enforced immediately; demand-driven changes respect the cooldown
+        cooling = now - pool.last_change < SCALE_COOLDOWN
+        if target != current and cooling and POOL_CONFIG[kind]["min"] <= current <= POOL_CONFIG[kind]["max"]:
+            target, reason = current, f"cooldown ({reason})"
+
+        while len(pool.procs) < target:
+            pool.spawn()
+        while len(pool.procs) > target and pool.retire():
+            pass
+        if len(pool.procs) != current:
+            pool.last_change = now
+
+        decision = {"kind": kind, "workers": current, "target": target, "reason": reason, **signals}
+        state["pools"][kind] = decision
+        if target != current:
+            print(f"[Supervisor] {kind}: {current} -> {target} ({reason})")
+            redis_conn.lpush(DECISIONS_KEY, json.dumps({"timestamp": state["timestamp"], **decision}))
+            redis_conn.ltrim(DECISIONS_KEY, 0, DECISION_HISTORY - 1)
+
+    redis_conn.set(STATE_KEY, json.dumps(state), ex=int(SUPERVISOR_INTERVAL * 6))
+    return state
+
+
+def main():
+    pools = {kind: WorkerPool(kind) for kind in JOB_KINDS}
+    running = True
+
+    def _stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    bounds = ", ".join(f"{kind}[{cfg['min']}-{cfg['max']}]" for kind, cfg in POOL_CONFIG.items())
+    print(f"[Supervisor] Managing {bounds}")
+    try:
+        while running:
+            try:
+                tick(pools)
+            except redis.RedisError as e:
+                print(f"[Supervisor] Redis unavailable, keeping current pools: {e}")
+            time.sleep(SUPERVISOR_INTERVAL)
+    finally:
+        for pool in pools.values():
+            pool.stop_all()
+
+
+def read_state() -> dict:
+    """Latest published pool state plus recent scaling decisions."""
+    raw = redis_conn.get(STATE_KEY)
+    return {
+        "state": json.loads(raw) if raw else None,
+        "decisions": [json.loads(d) for d in redis_conn.lrange(DECISIONS_KEY, 0, 19)],
+    }
+
+
+if __name__ == "__main__":
+    main()